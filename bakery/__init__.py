@@ -0,0 +1,13 @@
+# coding: utf-8
+"""
+Generate projects from this template in-process, without going through the
+cookiecutter command line for every project.
+"""
+
+from pathlib import Path
+
+#: Root of the template, the directory holding cookiecutter.json.
+TEMPLATE_DIR: Path = Path(__file__).resolve().parents[1]
+
+#: Name of the directory, relative to TEMPLATE_DIR, every project renders from.
+PROJECT_TEMPLATE: str = "{{cookiecutter.project_slug}}"
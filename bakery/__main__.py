@@ -0,0 +1,11 @@
+# coding: utf-8
+"""
+Entrypoint module, in case you use `python -m bakery`.
+"""
+
+import sys
+
+from bakery.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# coding: utf-8
+"""
+Generate many projects in one go, from a stream of contexts in JSON lines or
+CSV, spreading them over a pool of long-lived worker processes that each keep
+a single Renderer (and thereby its compiled templates) around.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import IO, Any, Iterable, Iterator, Optional
+
+from bakery import TEMPLATE_DIR
+from bakery.generate import InvalidContextException, Renderer
+from bakery.trace import Trace, TraceEvent
+from bakery.validate import ContextValidator
+
+FORMATS: tuple[str, ...] = ("jsonl", "csv")
+
+
+@dataclass(frozen=True)
+class BulkRecord:
+    """Outcome of generating one project of the stream"""
+
+    index: int
+    context: Optional[dict[str, Any]]
+    project_dir: Optional[str]
+    error: Optional[str]
+    duration: float
+    # Only traced when asked for, and left out of the JSON.
+    events: tuple[TraceEvent, ...] = field(default=(), repr=False)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_json(self) -> str:
+        record = asdict(self)
+        del record["events"]
+        return json.dumps(record, sort_keys=True)
+
+
+def read_contexts(
+    stream: IO[str], format: str = "jsonl"
+) -> Iterator[tuple[Optional[dict[str, Any]], Optional[str]]]:
+    """
+    Parse the contexts of a stream lazily, yielding (context, error) pairs
+    where exactly one of the two is None
+    :param stream: The text stream to read the contexts from.
+    :param format: Either "jsonl", one JSON object per line, or "csv", with
+        one column per cookiecutter variable. Blank lines and empty cells are
+        skipped, so the defaults of cookiecutter.json apply.
+    """
+    if format == "csv":
+        for row in csv.DictReader(stream):
+            yield {k: v for k, v in row.items() if k and v not in (None, "")}, None
+        return
+
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            context = json.loads(line)
+        except ValueError as err:
+            yield None, f"line {number}: {err}"
+            continue
+        if not isinstance(context, dict):
+            yield None, f"line {number}: expected a JSON object"
+            continue
+        yield context, None
+
+
+_renderer: Optional[Renderer] = None
+
+
+def _init_worker(template_dir: str) -> None:
+    global _renderer
+    _renderer = Renderer(template_dir)
+
+
+def _generate(
+    job: tuple[int, Optional[dict[str, Any]], Optional[str], str, bool, bool],
+) -> BulkRecord:
+    index, context, error, output_dir, overwrite_if_exists, traced = job
+    start = time.perf_counter()
+    project_dir: Optional[str] = None
+    trace: Optional[Trace] = Trace() if traced else None
+    if error is None:
+        assert _renderer is not None
+        try:
+            project_dir = _renderer.generate(
+                context,
+                output_dir,
+                overwrite_if_exists=overwrite_if_exists,
+                timings=trace,
+            )
+        except Exception as err:
+            error = f"{type(err).__name__}: {err}"
+    return BulkRecord(
+        index=index,
+        context=context,
+        project_dir=project_dir,
+        error=error,
+        duration=time.perf_counter() - start,
+        events=tuple(trace.events) if trace is not None else (),
+    )
+
+
+def generate_bulk(
+    contexts: Iterable[tuple[Optional[dict[str, Any]], Optional[str]]],
+    output_dir: str = ".",
+    jobs: Optional[int] = None,
+    template_dir: str = str(TEMPLATE_DIR),
+    overwrite_if_exists: bool = False,
+    trace: bool = False,
+) -> Iterator[BulkRecord]:
+    """
+    Generate a project per context, yielding a record as each one finishes
+    :param contexts: (context, error) pairs, as yielded by read_contexts.
+        Pairs carrying an error are reported without rendering anything, and
+        so are the contexts ContextValidator finds problems with, before they
+        reach a worker.
+    :param output_dir: String, directory the projects get generated into.
+    :param jobs: Number of worker processes, defaults to the CPU count. With a
+        single job everything runs in the calling process.
+    :param template_dir: String, path of the template directory.
+    :param overwrite_if_exists: Render into project directories even if they
+        already exist.
+    :param trace: Record the time spent on every file and hook in the events
+        of the records, see bakery.trace.
+    """
+    validator = ContextValidator(template_dir)
+
+    def validated(
+        context: Optional[dict[str, Any]], error: Optional[str]
+    ) -> Optional[str]:
+        if error is None:
+            errors = validator.validate(context)
+            if errors:
+                error = f"{InvalidContextException.__name__}: " + "\n".join(errors)
+        return error
+
+    work = (
+        (
+            index,
+            context,
+            validated(context, error),
+            output_dir,
+            overwrite_if_exists,
+            trace,
+        )
+        for index, (context, error) in enumerate(contexts)
+    )
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        _init_worker(template_dir)
+        yield from map(_generate, work)
+        return
+
+    with multiprocessing.Pool(
+        jobs, initializer=_init_worker, initargs=(template_dir,)
+    ) as pool:
+        yield from pool.imap_unordered(_generate, work, chunksize=8)
@@ -0,0 +1,69 @@
+# coding: utf-8
+"""
+Opt-in on-disk cache of the compiled template files, shared between processes.
+
+Setting the BAKERY_BYTECODE_CACHE environment variable to a directory makes
+every Jinja environment of the template, the ones plain cookiecutter creates
+included (through bakery.extensions.BytecodeCacheExtension), load the compiled
+templates from there instead of parsing and compiling them again.
+"""
+
+import os
+from typing import Optional
+
+from jinja2 import Environment
+from jinja2.bccache import Bucket, FileSystemBytecodeCache
+
+ENVIRONMENT_VARIABLE: str = "BAKERY_BYTECODE_CACHE"
+
+
+class SourceHashBytecodeCache(FileSystemBytecodeCache):
+    """
+    Stores the compiled templates keyed by the hash of their source, so
+    changing a template file can never load stale code, and counts how often
+    the compiled code was found.
+    """
+
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory, "%s.jinja.cache")
+        self.hits = 0
+        self.misses = 0
+
+    def get_bucket(
+        self,
+        environment: Environment,
+        name: str,
+        filename: Optional[str],
+        source: str,
+    ) -> Bucket:
+        checksum = self.get_source_checksum(source)
+        bucket = Bucket(environment, self.get_cache_key(name, checksum), checksum)
+        self.load_bytecode(bucket)
+        if bucket.code is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return bucket
+
+
+_caches: dict[str, SourceHashBytecodeCache] = {}
+
+
+def get_bytecode_cache(
+    directory: Optional[str] = None,
+) -> Optional[SourceHashBytecodeCache]:
+    """
+    Return the cache of a directory, shared by every environment of the process
+    :param directory: String, directory of the cache. Defaults to the value of
+        the BAKERY_BYTECODE_CACHE environment variable, without which there is
+        no cache and None is returned.
+    """
+    directory = directory or os.environ.get(ENVIRONMENT_VARIABLE)
+    if not directory:
+        return None
+
+    directory = os.path.abspath(directory)
+    if directory not in _caches:
+        _caches[directory] = SourceHashBytecodeCache(directory)
+    return _caches[directory]
@@ -0,0 +1,233 @@
+# coding: utf-8
+"""
+Command line interface of the bakery, run it with ``python -m bakery``.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Optional, Sequence
+
+from bakery.bulk import FORMATS, BulkRecord, generate_bulk, read_contexts
+from bakery.bytecode_cache import ENVIRONMENT_VARIABLE
+from bakery.trace import slowest_files, write_trace
+from bakery.update import update_bulk
+from bakery.validate import ContextValidator
+
+
+def _construct_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="bakery", description="Generate projects from this template."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser(
+        "generate",
+        help="Generate a project per context of a JSON lines or CSV stream.",
+        description="Generate a project per context of a JSON lines or CSV "
+        "stream, printing a JSON record per project as it finishes.",
+    )
+    generate.add_argument(
+        "contexts",
+        type=argparse.FileType("r", encoding="utf-8"),
+        help="File to read the contexts from, - for stdin.",
+    )
+    generate.add_argument(
+        "-f",
+        "--format",
+        choices=FORMATS,
+        default=None,
+        help="Format of the contexts, guessed from the file extension by "
+        "default and jsonl when that does not work.",
+    )
+    generate.add_argument(
+        "-o",
+        "--output-dir",
+        default=".",
+        help="Directory to generate the projects into.",
+    )
+    generate.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes, the CPU count by default.",
+    )
+    generate.add_argument(
+        "--overwrite-if-exists",
+        action="store_true",
+        help="Render into project directories even if they already exist.",
+    )
+    generate.add_argument(
+        "--bytecode-cache",
+        metavar="DIR",
+        default=None,
+        help="Directory to keep the compiled templates in between runs, "
+        f"${ENVIRONMENT_VARIABLE} by default.",
+    )
+    generate.add_argument(
+        "--trace",
+        metavar="FILE",
+        type=argparse.FileType("w", encoding="utf-8"),
+        default=None,
+        help="Write the time spent rendering every file and in every hook to "
+        "a Chrome trace event file, which chrome://tracing and Perfetto open.",
+    )
+    generate.add_argument(
+        "--top",
+        metavar="N",
+        type=int,
+        default=0,
+        help="Print the N template files that took the longest to render to "
+        "stderr once done.",
+    )
+
+    validate = subparsers.add_parser(
+        "validate",
+        help="Check every context of a JSON lines or CSV stream.",
+        description="Check every context of a JSON lines or CSV stream "
+        "without rendering anything, printing a JSON record with all the "
+        "problems of every invalid context.",
+    )
+    validate.add_argument(
+        "contexts",
+        type=argparse.FileType("r", encoding="utf-8"),
+        help="File to read the contexts from, - for stdin.",
+    )
+    validate.add_argument(
+        "-f",
+        "--format",
+        choices=FORMATS,
+        default=None,
+        help="Format of the contexts, guessed from the file extension by "
+        "default and jsonl when that does not work.",
+    )
+
+    update = subparsers.add_parser(
+        "update",
+        help="Merge the changes of the template into generated projects.",
+        description="Re-render projects from the context they recorded and "
+        "three-way merge the changes of the template since they were "
+        "rendered into them, printing a JSON record per project as it "
+        "finishes. Files changed on both sides get conflict markers.",
+    )
+    update.add_argument(
+        "projects", nargs="+", metavar="PROJECT", help="Projects to update."
+    )
+    update.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes, the CPU count by default.",
+    )
+    update.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="Only report the files that would be written, deleted or conflict.",
+    )
+    update.add_argument(
+        "--base-commit",
+        metavar="COMMIT",
+        default=None,
+        help="Template commit the projects were rendered from when they do not "
+        "record it, e.g. when generated before the template recorded it.",
+    )
+    update.add_argument(
+        "--contexts",
+        type=argparse.FileType("r", encoding="utf-8"),
+        default=None,
+        help="JSON file mapping project paths to the contexts to render them "
+        "with, for the projects without a .cookiecutter.json. A context may "
+        "hold the _commit of its project.",
+    )
+    return parser
+
+
+def main(args: Optional[Sequence[str]] = None) -> int:
+    options = _construct_parser().parse_args(args=args)
+    if options.command == "update":
+        return _update(options)
+    if options.command == "validate":
+        return _validate(options)
+
+    if options.bytecode_cache:
+        # Through the environment so the worker processes pick it up too.
+        os.environ[ENVIRONMENT_VARIABLE] = options.bytecode_cache
+
+    format: str = options.format or (
+        "csv" if options.contexts.name.endswith(".csv") else "jsonl"
+    )
+    traced: bool = options.trace is not None or options.top > 0
+    traces: list[BulkRecord] = []
+    failures = 0
+    with options.contexts:
+        for record in generate_bulk(
+            read_contexts(options.contexts, format),
+            output_dir=options.output_dir,
+            jobs=options.jobs,
+            overwrite_if_exists=options.overwrite_if_exists,
+            trace=traced,
+        ):
+            failures += not record.ok
+            print(record.to_json(), flush=True)
+            if record.events:
+                traces.append(record)
+
+    if options.trace is not None:
+        with options.trace:
+            write_trace(
+                options.trace,
+                (
+                    (record.project_dir or str(record.index), record.events)
+                    for record in sorted(traces, key=lambda record: record.index)
+                ),
+            )
+    if options.top > 0:
+        print(f"Slowest {options.top} template files:", file=sys.stderr)
+        for profile in slowest_files(
+            (event for record in traces for event in record.events), options.top
+        ):
+            print(profile, file=sys.stderr)
+    return 1 if failures else 0
+
+
+def _validate(options: argparse.Namespace) -> int:
+    format: str = options.format or (
+        "csv" if options.contexts.name.endswith(".csv") else "jsonl"
+    )
+    validator = ContextValidator()
+    failures = 0
+    with options.contexts:
+        for index, (context, error) in enumerate(
+            read_contexts(options.contexts, format)
+        ):
+            errors = [error] if error is not None else validator.validate(context)
+            if errors:
+                failures += 1
+                print(json.dumps({"index": index, "errors": errors}), flush=True)
+    return 1 if failures else 0
+
+
+def _update(options: argparse.Namespace) -> int:
+    contexts: Optional[dict[str, dict[str, Any]]] = None
+    if options.contexts is not None:
+        with options.contexts:
+            contexts = json.load(options.contexts)
+    failures = 0
+    for record in update_bulk(
+        options.projects,
+        jobs=options.jobs,
+        dry_run=options.dry_run,
+        base_commit=options.base_commit,
+        contexts=contexts,
+    ):
+        failures += not record.ok or bool(record.conflicts)
+        print(record.to_json(), flush=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# coding: utf-8
+"""
+Jinja extensions loaded through the ``_extensions`` key of cookiecutter.json, so
+they are available to plain cookiecutter runs as well.
+"""
+
+import json
+from typing import Any, Mapping
+
+from jinja2 import Environment
+from jinja2.ext import Extension
+
+from bakery.bytecode_cache import get_bytecode_cache
+from bakery.manifest import excluded_paths
+from bakery.update import recorded_context
+from bakery.validate import validate_context
+
+
+def python_string(text: str) -> str:
+    """
+    Escape text for the inside of a double-quoted Python string literal, which
+    is what a JSON string is without its quotes. Non-ASCII characters are left
+    as they are, an escaped astral character would be a surrogate pair to Python.
+    """
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+class LiteralExtension(Extension):
+    """Add the ``python_string`` filter the hooks embed their data with"""
+
+    def __init__(self, environment: Environment) -> None:
+        super().__init__(environment)
+        environment.filters["python_string"] = python_string
+
+
+class ManifestExtension(Extension):
+    """Add the ``excluded_paths`` filter the post-gen hook prunes with"""
+
+    def __init__(self, environment: Environment) -> None:
+        super().__init__(environment)
+
+        def _excluded_paths(cookiecutter: Mapping[str, Any]) -> list[str]:
+            return excluded_paths(cookiecutter, environment)
+
+        environment.filters["excluded_paths"] = _excluded_paths
+
+
+class ValidationExtension(Extension):
+    """Add the ``validation_errors`` filter the pre-gen hook checks with"""
+
+    def __init__(self, environment: Environment) -> None:
+        super().__init__(environment)
+        environment.filters["validation_errors"] = validate_context
+
+
+class RecordExtension(Extension):
+    """Add the ``recorded_context`` filter the project records its context with"""
+
+    def __init__(self, environment: Environment) -> None:
+        super().__init__(environment)
+        environment.filters["recorded_context"] = recorded_context
+
+
+class BytecodeCacheExtension(Extension):
+    """Share the on-disk cache of compiled templates, when it is enabled"""
+
+    def __init__(self, environment: Environment) -> None:
+        super().__init__(environment)
+        bytecode_cache = get_bytecode_cache()
+        if bytecode_cache is not None:
+            environment.bytecode_cache = bytecode_cache
@@ -0,0 +1,253 @@
+# coding: utf-8
+"""
+Render projects from the template, consulting the inclusion manifest before
+rendering anything so excluded paths are never rendered nor written.
+
+The logic of the hook scripts lives in bakery.validate and bakery.manifest and
+runs in-process here, so the hook scripts themselves are never started.
+"""
+
+import os
+import stat
+import time
+from typing import Any, Optional
+
+from binaryornot.check import is_binary
+from cookiecutter.environment import StrictEnvironment
+from cookiecutter.exceptions import OutputDirExistsException
+from cookiecutter.generate import generate_context
+from cookiecutter.prompt import prompt_for_config
+from jinja2 import FileSystemLoader, Template
+
+from bakery import PROJECT_TEMPLATE, TEMPLATE_DIR
+from bakery.manifest import is_included
+from bakery.timing import Timings
+from bakery.tree import DiskTree, Tree
+from bakery.validate import validate_context
+
+
+class InvalidContextException(Exception):
+    """Raised when a context fails the checks of the pre-gen hook"""
+
+    def __init__(self, errors: list[str]) -> None:
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+
+def resolve_context(
+    extra_context: Optional[dict[str, Any]] = None,
+    output_dir: str = ".",
+    template_dir: str = str(TEMPLATE_DIR),
+) -> dict[str, Any]:
+    """
+    Build the full context cookiecutter would build without prompting
+    :param extra_context: Values overriding the defaults of cookiecutter.json.
+    :param output_dir: String, directory the project gets generated into.
+    :param template_dir: String, path of the template directory.
+    """
+    context: dict[str, Any] = generate_context(
+        context_file=os.path.join(template_dir, "cookiecutter.json"),
+        extra_context=extra_context,
+    )
+    context["_cookiecutter"] = {
+        k: v for k, v in context["cookiecutter"].items() if not k.startswith("_")
+    }
+    context["cookiecutter"].update(prompt_for_config(context, no_input=True))
+    context["cookiecutter"]["_template"] = template_dir
+    context["cookiecutter"]["_output_dir"] = os.path.abspath(output_dir)
+    context["cookiecutter"]["_repo_dir"] = template_dir
+    context["cookiecutter"]["_checkout"] = None
+    return context
+
+
+def create_environment(
+    context: dict[str, Any], template_dir: str = str(TEMPLATE_DIR)
+) -> StrictEnvironment:
+    """Create the Jinja environment cookiecutter renders the project with"""
+    environment = StrictEnvironment(context=context, keep_trailing_newline=True)
+    environment.loader = FileSystemLoader(
+        [
+            os.path.join(template_dir, PROJECT_TEMPLATE),
+            os.path.join(template_dir, "templates"),
+        ]
+    )
+    return environment
+
+
+class Renderer:
+    """
+    Renders any number of projects through a single Jinja environment, so every
+    template file is only parsed and compiled once per process.
+
+    The environment only depends on the ``_extensions`` of cookiecutter.json,
+    which is the same for every context.
+    """
+
+    def __init__(self, template_dir: str = str(TEMPLATE_DIR)) -> None:
+        """
+        :param template_dir: String, path of the template directory.
+        """
+        self.template_dir = template_dir
+        self.project_template = os.path.join(template_dir, PROJECT_TEMPLATE)
+        self.environment: StrictEnvironment = create_environment(
+            resolve_context(template_dir=template_dir), template_dir
+        )
+        self._path_templates: dict[str, Template] = {}
+
+    def render_path(self, path: str, context: dict[str, Any]) -> str:
+        """Render a path of the project template for a context"""
+        template = self._path_templates.get(path)
+        if template is None:
+            template = self.environment.from_string(path)
+            self._path_templates[path] = template
+        return template.render(**context)
+
+    def _render_file(self, infile: str, context: dict[str, Any]) -> bytes:
+        source = os.path.join(self.project_template, infile)
+        if is_binary(source):
+            with open(source, "rb") as binary_file:
+                return binary_file.read()
+
+        rendered: str = self.environment.get_template(infile).render(**context)
+
+        newline: Optional[str] = context["cookiecutter"].get("_new_lines")
+        if not newline:
+            # Keep the newlines of the template file, like cookiecutter does.
+            with open(source, encoding="utf-8") as template_file:
+                template_file.readline()
+            newlines = template_file.newlines
+            newline = newlines[0] if isinstance(newlines, tuple) else newlines
+
+        # Translate the newlines the way writing in text mode would.
+        newline = os.linesep if newline is None else newline
+        if newline not in ("", "\n"):
+            rendered = rendered.replace("\n", newline)
+        return rendered.encode("utf-8")
+
+    def render_project(
+        self,
+        context: dict[str, Any],
+        output_dir: str,
+        overwrite_if_exists: bool = False,
+        accept_hooks: bool = True,
+        tree: Optional[Tree] = None,
+        timings: Optional[Timings] = None,
+    ) -> str:
+        """
+        Render the project for an already resolved context, returning its path
+        :param context: The context, as returned by resolve_context.
+        :param output_dir: String, directory the project gets generated into.
+        :param overwrite_if_exists: Render into the project directory even if it
+            already exists.
+        :param accept_hooks: Run the checks of the pre-gen hook first.
+        :param tree: Where to write the project to, the filesystem by default.
+        :param timings: Accumulates the time spent in each phase when given, a
+            bakery.trace.Trace also records every file and hook.
+        """
+        cookiecutter: dict[str, Any] = context["cookiecutter"]
+        tree = tree or DiskTree()
+        timings = timings or Timings()
+
+        if accept_hooks:
+            with timings.phase("pre_gen"):
+                errors: list[str] = validate_context(cookiecutter)
+            if errors:
+                raise InvalidContextException(errors)
+
+        project_dir = os.path.abspath(
+            os.path.join(output_dir, self.render_path(PROJECT_TEMPLATE, context))
+        )
+        if tree.exists(project_dir) and not overwrite_if_exists:
+            raise OutputDirExistsException(
+                f'Error: "{project_dir}" directory already exists'
+            )
+        tree.makedirs(project_dir)
+
+        for root, dirs, files in os.walk(self.project_template):
+            relative_root = os.path.relpath(root, self.project_template)
+            relative_root = (
+                "" if relative_root == "." else relative_root.replace(os.sep, "/") + "/"
+            )
+
+            # Pruning dirs here keeps os.walk out of the excluded directories.
+            with timings.phase("post_gen"):
+                dirs[:] = [
+                    d
+                    for d in sorted(dirs)
+                    if is_included(relative_root + d, cookiecutter)
+                ]
+                infiles = [
+                    relative_root + f
+                    for f in sorted(files)
+                    if is_included(relative_root + f, cookiecutter)
+                ]
+
+            with timings.phase("render"):
+                for d in dirs:
+                    rendered_dir = self.render_path(relative_root + d, context)
+                    tree.makedirs(os.path.join(project_dir, rendered_dir))
+
+                for infile in infiles:
+                    start = time.perf_counter()
+                    outfile = self.render_path(infile, context)
+                    if not outfile or outfile.endswith(("/", os.sep)):
+                        # The file name rendered empty, cookiecutter skips those.
+                        continue
+                    data = self._render_file(infile, context)
+                    tree.write(
+                        os.path.join(project_dir, outfile),
+                        data,
+                        stat.S_IMODE(
+                            os.stat(os.path.join(self.project_template, infile)).st_mode
+                        ),
+                    )
+                    timings.file(infile, start, len(data))
+
+        return project_dir
+
+    def generate(
+        self,
+        extra_context: Optional[dict[str, Any]] = None,
+        output_dir: str = ".",
+        overwrite_if_exists: bool = False,
+        accept_hooks: bool = True,
+        tree: Optional[Tree] = None,
+        timings: Optional[Timings] = None,
+    ) -> str:
+        """Resolve the context of a project and render it, see generate_project"""
+        timings = timings or Timings()
+        with timings.phase("context"):
+            context = resolve_context(extra_context, output_dir, self.template_dir)
+        return self.render_project(
+            context,
+            output_dir,
+            overwrite_if_exists=overwrite_if_exists,
+            accept_hooks=accept_hooks,
+            tree=tree,
+            timings=timings,
+        )
+
+
+def generate_project(
+    extra_context: Optional[dict[str, Any]] = None,
+    output_dir: str = ".",
+    template_dir: str = str(TEMPLATE_DIR),
+    overwrite_if_exists: bool = False,
+    accept_hooks: bool = True,
+) -> str:
+    """
+    Generate a project the way ``cookiecutter --no-input`` does, returning its
+    path. Only the paths the manifest includes for the context get rendered.
+    :param extra_context: Values overriding the defaults of cookiecutter.json.
+    :param output_dir: String, directory the project gets generated into.
+    :param template_dir: String, path of the template directory.
+    :param overwrite_if_exists: Render into the project directory even if it
+        already exists.
+    :param accept_hooks: Run the checks of the pre-gen hook first.
+    """
+    return Renderer(template_dir).generate(
+        extra_context,
+        output_dir,
+        overwrite_if_exists=overwrite_if_exists,
+        accept_hooks=accept_hooks,
+    )
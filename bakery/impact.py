@@ -0,0 +1,208 @@
+# coding: utf-8
+"""
+Work out which contexts a change to the template can affect.
+
+Every file of the project template depends on the cookiecutter variables its
+name and its Jinja source reference, plus the variables of the manifest rules
+(bakery/manifest.py, which is also what the post-gen hook prunes with) that
+decide whether it is rendered at all. A change to a file only affects the
+contexts the file is rendered for, and two such contexts agreeing on every
+variable the file depends on render it identically.
+"""
+
+import os
+import subprocess
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+from jinja2 import Environment, nodes
+
+from bakery import PROJECT_TEMPLATE, TEMPLATE_DIR
+from bakery.manifest import MANIFEST, _matches, is_included
+
+#: Stands for every variable, for sources using the context as a whole.
+ALL: str = "*"
+
+#: Paths outside the project template that have no effect on the projects.
+UNRELATED: tuple[str, ...] = (
+    "README.markdown",
+    "LICENSE",
+    ".gitignore",
+    ".gitattributes",
+    "docs/",
+    "tests/",
+    "requests.jsonl",
+)
+
+
+def _is_cookiecutter(node: nodes.Node) -> bool:
+    return isinstance(node, nodes.Name) and node.name == "cookiecutter"
+
+
+def referenced_variables(source: str, environment: Environment) -> frozenset[str]:
+    """
+    The cookiecutter variables a Jinja source references, with ALL among them
+    when it uses ``cookiecutter`` in any other way than to look a variable up
+    :param source: The Jinja source, a template file or path.
+    :param environment: The environment to parse the source with.
+    """
+    tree = environment.parse(source)
+    variables: set[str] = set()
+    lookups = 0
+    for getattr_node in tree.find_all(nodes.Getattr):
+        if _is_cookiecutter(getattr_node.node):
+            variables.add(getattr_node.attr)
+            lookups += 1
+    for getitem_node in tree.find_all(nodes.Getitem):
+        key = getitem_node.arg
+        if (
+            _is_cookiecutter(getitem_node.node)
+            and isinstance(key, nodes.Const)
+            and isinstance(key.value, str)
+        ):
+            variables.add(key.value)
+            lookups += 1
+
+    names = sum(1 for name in tree.find_all(nodes.Name) if _is_cookiecutter(name))
+    if names > lookups:
+        variables.add(ALL)
+    return frozenset(variables)
+
+
+def manifest_variables(path: str) -> frozenset[str]:
+    """The variables of the manifest rules deciding whether a path is rendered"""
+    return frozenset(
+        variable
+        for rule, conditions in MANIFEST.items()
+        if _matches(path, rule)
+        for variable in conditions
+    )
+
+
+def dependency_index(
+    environment: Environment, template_dir: str = str(TEMPLATE_DIR)
+) -> dict[str, frozenset[str]]:
+    """
+    Map every path of the project template, relative to it with / separators
+    and unrendered, to the cookiecutter variables it depends on
+    :param environment: The environment to parse the template files with.
+    :param template_dir: String, path of the template directory.
+    """
+    project_template = os.path.join(template_dir, PROJECT_TEMPLATE)
+    index: dict[str, frozenset[str]] = {}
+    for root, dirs, files in os.walk(project_template):
+        relative_root = os.path.relpath(root, project_template).replace(os.sep, "/")
+        relative_root = "" if relative_root == "." else relative_root + "/"
+        for name in dirs:
+            path = relative_root + name
+            index[path] = referenced_variables(path, environment).union(
+                manifest_variables(path)
+            )
+        for name in files:
+            path = relative_root + name
+            variables = referenced_variables(path, environment).union(
+                manifest_variables(path)
+            )
+            try:
+                with open(os.path.join(root, name), encoding="utf-8") as f:
+                    variables |= referenced_variables(f.read(), environment)
+            except UnicodeDecodeError:
+                pass  # Binary files are copied as they are.
+            index[path] = variables
+    return index
+
+
+def changed_files(base: str, template_dir: str = str(TEMPLATE_DIR)) -> list[str]:
+    """
+    The files changed since a git revision, including uncommitted and untracked
+    ones, relative to the template directory with / separators
+    :param base: The git revision to compare to, e.g. "origin/main".
+    :param template_dir: String, path of the template directory.
+    """
+
+    def git(*args: str) -> list[str]:
+        output = subprocess.check_output(["git", *args], cwd=template_dir, text=True)
+        return [line for line in output.splitlines() if line]
+
+    return sorted(
+        set(git("diff", "--name-only", "--relative", base, "--"))
+        | set(git("ls-files", "--others", "--exclude-standard"))
+    )
+
+
+@dataclass(frozen=True)
+class Impact:
+    """What a set of changed files can affect"""
+
+    #: Every context is affected, e.g. because cookiecutter.json changed.
+    everything: bool
+    #: Changed paths of the project template, relative to it.
+    template_paths: frozenset[str]
+    #: The variables the changed template paths depend on.
+    variables: frozenset[str]
+
+    def affects(self, cookiecutter: Mapping[str, Any]) -> bool:
+        """Tell whether the project of a context renders any changed file"""
+        return self.everything or any(
+            is_included(path, cookiecutter) for path in self.template_paths
+        )
+
+    def key(self, cookiecutter: Mapping[str, Any]) -> Optional[tuple[Any, ...]]:
+        """
+        Contexts with the same key render the changed files identically, so
+        testing one of them is enough. None when every context is different.
+        """
+        if self.everything or ALL in self.variables:
+            return None
+        return tuple(str(cookiecutter.get(v)) for v in sorted(self.variables))
+
+    def select(self, contexts: Sequence[Mapping[str, Any]]) -> list[Mapping[str, Any]]:
+        """
+        The resolved contexts that are affected, one per key
+        :param contexts: The cookiecutter variables of the contexts.
+        """
+        selected: list[Mapping[str, Any]] = []
+        keys: set[tuple[Any, ...]] = set()
+        for cookiecutter in contexts:
+            if not self.affects(cookiecutter):
+                continue
+            key = self.key(cookiecutter)
+            if key is None or key not in keys:
+                selected.append(cookiecutter)
+                if key is not None:
+                    keys.add(key)
+        return selected
+
+
+def impact_of(
+    paths: Iterable[str],
+    environment: Environment,
+    template_dir: str = str(TEMPLATE_DIR),
+) -> Impact:
+    """
+    Work out what changing some files can affect
+    :param paths: The changed files, relative to the template directory with /
+        separators, as returned by changed_files.
+    :param environment: The environment to parse the template files with.
+    :param template_dir: String, path of the template directory.
+    """
+    prefix = PROJECT_TEMPLATE + "/"
+    index: Optional[dict[str, frozenset[str]]] = None
+    everything = False
+    template_paths: set[str] = set()
+    variables: set[str] = set()
+    for path in paths:
+        if path.startswith(prefix):
+            if index is None:
+                index = dependency_index(environment, template_dir)
+            relative = path[len(prefix) :]
+            template_paths.add(relative)
+            # Deleted files are no longer in the index, they depend on
+            # whatever decides whether they are rendered.
+            variables |= index.get(relative, manifest_variables(relative) | {ALL})
+        elif not path.startswith(UNRELATED) and path not in UNRELATED:
+            # cookiecutter.json, the hooks, bakery and the packaging all
+            # change every project.
+            everything = True
+
+    return Impact(everything, frozenset(template_paths), frozenset(variables))
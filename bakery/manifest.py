@@ -0,0 +1,128 @@
+# coding: utf-8
+"""
+Declarative list of the template paths that only make it into some projects.
+
+Every rule maps a path of the project template, relative to
+``{{cookiecutter.project_slug}}`` and in its unrendered form, to the values the
+cookiecutter variables must take for that path to be included. Rules for a
+directory cover everything below it, and ``*`` in a rule matches across
+directories. Paths without a rule are always included.
+"""
+
+import os
+from fnmatch import fnmatchcase
+from typing import Any, Mapping
+
+from jinja2 import Environment
+
+from bakery import PROJECT_TEMPLATE, TEMPLATE_DIR
+
+MANIFEST: dict[str, dict[str, list[str]]] = {
+    "tox.ini": {"test_automation_tool": ["Tox"]},
+    "noxfile.py": {"test_automation_tool": ["Nox"]},
+    "src/{{cookiecutter.project_slug}}/cli.py": {
+        "command_line_interface": ["Click", "Argparse", "Asyncio"],
+    },
+    "src/{{cookiecutter.project_slug}}/__main__.py": {
+        "command_line_interface": ["Click", "Argparse", "Asyncio"],
+    },
+    "src/{{cookiecutter.project_slug}}/profiling.py": {
+        "command_line_interface": ["Click", "Argparse", "Asyncio"],
+    },
+    "src/{{cookiecutter.project_slug}}/streams.py": {
+        "command_line_interface": ["Click", "Argparse", "Asyncio"],
+    },
+    "src/{{cookiecutter.project_slug}}/mapped.py": {
+        "command_line_interface": ["Click", "Argparse", "Asyncio"],
+    },
+    "src/{{cookiecutter.project_slug}}/tasks.py": {
+        "command_line_interface": ["Asyncio"],
+    },
+    "src/{{cookiecutter.project_slug}}/commands/run.py": {
+        "command_line_interface": ["Asyncio"],
+    },
+    "src/{{cookiecutter.project_slug}}/parallel.py": {"have_parallel_map": ["y"]},
+    "src/{{cookiecutter.project_slug}}/commands/digest.py": {
+        "have_parallel_map": ["y"],
+    },
+    "src/{{cookiecutter.project_slug}}/cache.py": {"have_cache": ["y"]},
+    "src/{{cookiecutter.project_slug}}/commands": {
+        "command_line_interface": ["Click", "Argparse", "Asyncio"],
+    },
+    "tests/test_cli.py": {"command_line_interface": ["Click", "Argparse", "Asyncio"]},
+    "tests/test_profiling.py": {
+        "command_line_interface": ["Click", "Argparse", "Asyncio"],
+    },
+    "tests/test_streams.py": {
+        "command_line_interface": ["Click", "Argparse", "Asyncio"],
+    },
+    "tests/test_mapped.py": {
+        "command_line_interface": ["Click", "Argparse", "Asyncio"],
+    },
+    "tests/test_tasks.py": {"command_line_interface": ["Asyncio"]},
+    "tests/test_parallel.py": {"have_parallel_map": ["y"]},
+    "tests/test_cache.py": {"have_cache": ["y"]},
+    "scripts": {"command_line_interface": ["Click", "Argparse", "Asyncio"]},
+    "pytest.ini": {"have_tests": ["y"]},
+    "src/conftest.py": {"have_tests": ["y"]},
+    "tests": {"have_tests": ["y"]},
+    "benchmarks": {"have_benchmarks": ["y"]},
+    "benchmarks/test_bench_parallel.py": {"have_parallel_map": ["y"]},
+    "LICENSE": {"license": ["MIT License", "Apache 2.0 License"]},
+    # "AUTHORS.rst": {"create_author_file": ["y"]},
+    # "docs/authors.rst": {"create_author_file": ["y"]},
+    "docs": {"documentation_framework": ["Sphinx", "MkDocs"]},
+    "docs/mkdocs.yml": {"documentation_framework": ["MkDocs"]},
+    "docs/source/conf.py": {"documentation_framework": ["Sphinx"]},
+    "docs/source/*.rst": {"documentation_framework": ["Sphinx"]},
+    "docs/source/*.markdown": {"documentation_framework": ["MkDocs"]},
+}
+
+
+def _matches(path: str, rule: str) -> bool:
+    return path == rule or path.startswith(rule + "/") or fnmatchcase(path, rule)
+
+
+def is_included(path: str, cookiecutter: Mapping[str, Any]) -> bool:
+    """
+    Tell whether a path of the project template gets rendered for a context
+    :param path: Path relative to the project template, with / separators.
+    :param cookiecutter: The cookiecutter variables of the context.
+    """
+    return all(
+        str(cookiecutter[variable]) in values
+        for rule, conditions in MANIFEST.items()
+        if _matches(path, rule)
+        for variable, values in conditions.items()
+    )
+
+
+def excluded_paths(
+    cookiecutter: Mapping[str, Any],
+    environment: Environment,
+    template_dir: str = str(TEMPLATE_DIR),
+) -> list[str]:
+    """
+    List the rendered paths, relative to the project, left out for a context.
+    Only the topmost excluded directory is listed, not what is below it.
+    :param cookiecutter: The cookiecutter variables of the context.
+    :param environment: Jinja environment to render the path names with.
+    :param template_dir: String, path of the template directory.
+    """
+    project_template = os.path.join(template_dir, PROJECT_TEMPLATE)
+    excluded: list[str] = []
+    for root, dirs, files in os.walk(project_template):
+        relative_root = os.path.relpath(root, project_template).replace(os.sep, "/")
+        relative_root = "" if relative_root == "." else relative_root + "/"
+
+        excluded_here = [
+            relative_root + name
+            for name in sorted(dirs) + sorted(files)
+            if not is_included(relative_root + name, cookiecutter)
+        ]
+        dirs[:] = [d for d in dirs if relative_root + d not in excluded_here]
+        excluded.extend(
+            environment.from_string(path).render(cookiecutter=cookiecutter)
+            for path in excluded_here
+        )
+    return excluded
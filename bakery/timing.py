@@ -0,0 +1,39 @@
+# coding: utf-8
+"""
+Wall time spent in each phase of generating a project, for benchmarking the
+template as it grows.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+#: The phases of generating a project, in the order they happen.
+#: ``pre_gen`` and ``post_gen`` are the work of the hook scripts, which run
+#: in-process in bakery: validating the context and pruning excluded paths.
+PHASES: tuple[str, ...] = ("context", "pre_gen", "render", "post_gen")
+
+
+class Timings:
+    """Seconds spent in each phase, accumulated over every time it is entered"""
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = dict.fromkeys(PHASES, 0.0)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def file(self, name: str, start: float, size: int) -> None:
+        """
+        Called after writing each file, with the time.perf_counter() from
+        before rendering it and the bytes written. Only traces keep those.
+        """
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
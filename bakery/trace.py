@@ -0,0 +1,133 @@
+# coding: utf-8
+"""
+Opt-in tracing of where the time of a bake goes: the wall time and bytes
+written of every rendered file and the time spent in each hook.
+
+Traces are written in the Chrome trace event format, which chrome://tracing
+and https://ui.perfetto.dev open, with one lane per generated project.
+"""
+
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Any, Iterable, Iterator, Sequence
+
+from bakery.timing import Timings
+
+#: The phases that do the work of the hook scripts.
+HOOK_PHASES: tuple[str, ...] = ("pre_gen", "post_gen")
+
+
+@dataclass(frozen=True)
+class TraceEvent:
+    """A rendered file, or a stretch of time spent in a hook"""
+
+    #: Template-relative path of the file, or name of the hook phase.
+    name: str
+    #: Either "file" or "hook".
+    category: str
+    #: time.perf_counter() at the start, comparable between processes.
+    start: float
+    duration: float
+    #: Bytes written, for files.
+    size: int = 0
+
+
+class Trace(Timings):
+    """Timings of a bake that also keep an event per rendered file and hook"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.events: list[TraceEvent] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        with super().phase(name):
+            yield
+        if name in HOOK_PHASES:
+            self.events.append(
+                TraceEvent(name, "hook", start, time.perf_counter() - start)
+            )
+
+    def file(self, name: str, start: float, size: int) -> None:
+        self.events.append(
+            TraceEvent(name, "file", start, time.perf_counter() - start, size)
+        )
+
+
+def write_trace(
+    stream: IO[str], traces: Iterable[tuple[str, Sequence[TraceEvent]]]
+) -> None:
+    """
+    Write the traces of some projects as a Chrome trace event file
+    :param stream: The text stream to write the JSON to.
+    :param traces: (project, events) pairs, one lane per project.
+    """
+    traces = list(traces)
+    origin: float = min(
+        (event.start for _, events in traces for event in events), default=0.0
+    )
+    trace_events: list[dict[str, Any]] = []
+    for lane, (project, events) in enumerate(traces, start=1):
+        trace_events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": lane,
+                "args": {"name": project},
+            }
+        )
+        trace_events.extend(
+            {
+                "name": event.name,
+                "cat": event.category,
+                "ph": "X",
+                "pid": 1,
+                "tid": lane,
+                "ts": (event.start - origin) * 1e6,
+                "dur": event.duration * 1e6,
+                "args": {"bytes": event.size} if event.category == "file" else {},
+            }
+            for event in events
+        )
+    json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, stream)
+
+
+@dataclass(frozen=True)
+class FileProfile:
+    """Time spent rendering a template file, over every project that has it"""
+
+    name: str
+    total: float
+    count: int
+    size: int
+
+    def __str__(self) -> str:
+        return (
+            f"{self.total * 1000:9.3f}ms {self.count:5d}x "
+            f"{self.size / max(self.count, 1):10.0f}B  {self.name}"
+        )
+
+
+def slowest_files(events: Iterable[TraceEvent], top: int = 10) -> list[FileProfile]:
+    """
+    The template files that took the longest to render, in total
+    :param events: The events of any number of traces.
+    :param top: How many files to return.
+    """
+    totals: dict[str, list[float]] = defaultdict(lambda: [0.0, 0, 0])
+    for event in events:
+        if event.category == "file":
+            total = totals[event.name]
+            total[0] += event.duration
+            total[1] += 1
+            total[2] += event.size
+    profiles = [
+        FileProfile(name, total, int(count), int(size))
+        for name, (total, count, size) in totals.items()
+    ]
+    return sorted(profiles, key=lambda profile: profile.total, reverse=True)[:top]
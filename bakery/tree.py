@@ -0,0 +1,136 @@
+# coding: utf-8
+"""
+Trees a Renderer can write a project into: the real filesystem, or memory for
+callers that only want to look at the rendered files.
+"""
+
+import io
+import os
+import posixpath
+import stat
+from typing import Protocol
+
+
+class Tree(Protocol):
+    """What a Renderer needs from the place it writes the project into"""
+
+    def exists(self, path: str) -> bool: ...
+
+    def makedirs(self, path: str) -> None: ...
+
+    def write(self, path: str, data: bytes, mode: int) -> None: ...
+
+
+class DiskTree:
+    """Writes straight to the filesystem"""
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def makedirs(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, path: str, data: bytes, mode: int) -> None:
+        with open(path, "wb") as f:
+            f.write(data)
+        os.chmod(path, mode)
+
+
+class MemoryTree:
+    """Keeps the written files in a dictionary, keyed by normalized path"""
+
+    def __init__(self) -> None:
+        self.files: dict[str, bytes] = {}
+        self.modes: dict[str, int] = {}
+        self.dirs: set[str] = set()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return posixpath.normpath(path.replace(os.sep, "/"))
+
+    def exists(self, path: str) -> bool:
+        key = self._key(path)
+        return key in self.files or key in self.dirs
+
+    def isdir(self, path: str) -> bool:
+        return self._key(path) in self.dirs
+
+    def makedirs(self, path: str) -> None:
+        key = self._key(path)
+        while key not in self.dirs and key not in ("/", "."):
+            self.dirs.add(key)
+            key = posixpath.dirname(key) or "."
+
+    def write(self, path: str, data: bytes, mode: int) -> None:
+        key = self._key(path)
+        self.makedirs(posixpath.dirname(key))
+        self.files[key] = data
+        self.modes[key] = stat.S_IMODE(mode)
+
+    def listdir(self, path: str) -> list[str]:
+        key = self._key(path)
+        if key not in self.dirs:
+            raise NotADirectoryError(path)
+        return sorted(
+            posixpath.basename(entry)
+            for entry in self.dirs.union(self.files)
+            if posixpath.dirname(entry) == key
+        )
+
+    def read_bytes(self, path: str) -> bytes:
+        key = self._key(path)
+        if key not in self.files:
+            raise FileNotFoundError(path)
+        return self.files[key]
+
+
+class MemoryPath:
+    """
+    Path into a MemoryTree offering the part of the py.path.local interface
+    the tests use (join, listdir, basename, read, isdir, isfile and exists).
+    """
+
+    def __init__(self, tree: MemoryTree, path: str) -> None:
+        self.tree = tree
+        self.strpath = MemoryTree._key(path)
+
+    def __str__(self) -> str:
+        return self.strpath
+
+    def __repr__(self) -> str:
+        return f"MemoryPath({self.strpath!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, MemoryPath) and (self.tree, self.strpath) == (
+            other.tree,
+            other.strpath,
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.strpath)
+
+    @property
+    def basename(self) -> str:
+        return posixpath.basename(self.strpath)
+
+    def join(self, *parts: str) -> "MemoryPath":
+        return MemoryPath(self.tree, posixpath.join(self.strpath, *parts))
+
+    def listdir(self) -> list["MemoryPath"]:
+        return [self.join(name) for name in self.tree.listdir(self.strpath)]
+
+    def exists(self) -> bool:
+        return self.tree.exists(self.strpath)
+
+    def isdir(self) -> bool:
+        return self.tree.isdir(self.strpath)
+
+    def isfile(self) -> bool:
+        return self.strpath in self.tree.files
+
+    def read_binary(self) -> bytes:
+        return self.tree.read_bytes(self.strpath)
+
+    def read(self) -> str:
+        # Universal newlines, like reading a file opened in text mode.
+        return io.StringIO(self.read_binary().decode("utf-8"), newline=None).read()
@@ -0,0 +1,449 @@
+# coding: utf-8
+"""
+Bring projects generated from an older version of the template up to date.
+
+Every project records its context and the template commit it was rendered
+from in ``.cookiecutter.json``. Updating renders the project twice, from that
+commit (the base) and from the current template, and merges the difference
+into the project file by file:
+
+* files the template did not change are left alone,
+* files the project did not change take the new render,
+* files both changed are merged with ``git merge-file``, leaving conflict
+  markers behind where the changes overlap.
+
+Only files whose content changes are written. The base is rendered with the
+bakery of that commit, so its manifest, extensions and validators apply.
+Projects rendered from uncommitted changes to the template record ``_dirty``
+along with the commit, and have no base to update from. Those, and projects
+generated before the template recorded anything, update from a context and a
+base commit given to update_bulk instead.
+"""
+
+import json
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+from bakery import TEMPLATE_DIR
+from bakery.generate import Renderer
+from bakery.tree import MemoryTree
+
+#: File of the project holding its recorded context.
+RECORD_FILE: str = ".cookiecutter.json"
+
+
+@lru_cache(maxsize=None)
+def template_commit(template_dir: str) -> Optional[str]:
+    """The commit checked out in the template directory, None outside git"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=template_dir,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def template_dirty(template_dir: str) -> bool:
+    """
+    Tell whether the template directory has uncommitted changes, untracked
+    files included: a project rendered from it differs from its commit's
+    """
+    try:
+        return bool(
+            subprocess.check_output(
+                ["git", "status", "--porcelain", "--", "."],
+                cwd=template_dir,
+                stderr=subprocess.DEVNULL,
+            ).strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+
+def recorded_context(cookiecutter: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    The part of a context worth recording in the project to update it later:
+    the variables, and the template commit as ``_commit``. A template with
+    uncommitted changes also records ``_dirty``, the commit then being no
+    base to update from.
+    :param cookiecutter: The cookiecutter variables of the context.
+    """
+    record: dict[str, Any] = {
+        key: value for key, value in cookiecutter.items() if not key.startswith("_")
+    }
+    template_dir = cookiecutter.get("_repo_dir") or cookiecutter.get("_template")
+    record["_commit"] = template_commit(str(template_dir)) if template_dir else None
+    if record["_commit"] and template_dirty(str(template_dir)):
+        record["_dirty"] = True
+    return record
+
+
+def read_record(project_dir: str) -> dict[str, Any]:
+    """The recorded context of a project, see recorded_context"""
+    with open(os.path.join(project_dir, RECORD_FILE), encoding="utf-8") as f:
+        record: dict[str, Any] = json.load(f)
+    return record
+
+
+def recorded_variables(project_dir: str) -> dict[str, Any]:
+    """The variables of the recorded context of a project, to render it with"""
+    return {k: v for k, v in read_record(project_dir).items() if not k.startswith("_")}
+
+
+def checkout_template(
+    commit: str, directory: str, template_dir: str = str(TEMPLATE_DIR)
+) -> str:
+    """
+    Extract the template as of a commit into a directory, returning its path.
+    The files are extracted as committed, with their modes: unlike git archive,
+    the export-ignore and eol attributes of the template do not apply.
+    :param commit: The commit, as recorded in the projects.
+    :param directory: String, directory to extract the template into.
+    :param template_dir: String, path of the current template directory, in
+        the git repository holding the commit.
+    """
+    prefix = subprocess.check_output(
+        ["git", "rev-parse", "--show-prefix"], cwd=template_dir, text=True
+    ).strip()
+    listing = subprocess.check_output(
+        ["git", "ls-tree", "-r", "-z", f"{commit}:{prefix}"], cwd=template_dir
+    )
+    entries: list[tuple[str, str, str]] = []
+    for line in listing.split(b"\0"):
+        if line:
+            info, raw_path = line.split(b"\t", 1)
+            mode, kind, name = info.decode().split()
+            # Submodules are commits, not blobs, and are left out.
+            if kind == "blob":
+                entries.append((mode, name, os.fsdecode(raw_path)))
+
+    blobs = subprocess.run(
+        ["git", "cat-file", "--batch"],
+        cwd=template_dir,
+        input="".join(name + "\n" for _, name, _ in entries).encode(),
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    offset = 0
+    for mode, _, path in entries:
+        # Every blob is "<name> blob <size>\n<data>\n".
+        header_end = blobs.index(b"\n", offset)
+        size = int(blobs[offset:header_end].split()[2])
+        data = blobs[header_end + 1 : header_end + 1 + size]
+        offset = header_end + size + 2
+
+        full_path = os.path.join(directory, *path.split("/"))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if mode == "120000":
+            os.symlink(os.fsdecode(data), full_path)
+        else:
+            with open(full_path, "wb") as f:
+                f.write(data)
+            os.chmod(full_path, 0o755 if mode == "100755" else 0o644)
+    return directory
+
+
+# Run by render_base in the template checkout, where "bakery" is the checkout's.
+_RENDER_BASE: str = """\
+import json, pickle, sys
+from bakery.generate import Renderer
+from bakery.update import render_files
+renderer = Renderer(sys.argv[1])
+results = []
+for context in json.load(sys.stdin):
+    try:
+        results.append((render_files(renderer, context)[0], None))
+    except Exception as err:
+        results.append((None, f"{type(err).__name__}: {err}"))
+pickle.dump(results, sys.stdout.buffer)
+"""
+
+
+def render_base(
+    base_template_dir: str, contexts: list[dict[str, Any]]
+) -> list[tuple[Optional[dict[str, bytes]], Optional[str]]]:
+    """
+    Render the files of projects from a template checkout in another Python
+    process, which imports the bakery of the checkout: the manifest, extensions
+    and validators of this process may differ from the ones it rendered with.
+    A checkout without a bakery of its own renders with this one.
+    Returns the files, or the error, of every context.
+    :param base_template_dir: String, path of the template checkout, see
+        checkout_template.
+    :param contexts: The recorded contexts of the projects.
+    """
+    path = [base_template_dir, str(TEMPLATE_DIR), os.environ.get("PYTHONPATH", "")]
+    output = subprocess.run(
+        [sys.executable, "-c", _RENDER_BASE, base_template_dir],
+        cwd=base_template_dir,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, path))),
+        input=json.dumps(contexts).encode(),
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    results: list[tuple[Optional[dict[str, bytes]], Optional[str]]] = pickle.loads(
+        output
+    )
+    return results
+
+
+def render_files(
+    renderer: Renderer, context: dict[str, Any]
+) -> tuple[dict[str, bytes], dict[str, int]]:
+    """
+    Render a project in memory, returning its files and their modes keyed by
+    path relative to the project, with / separators
+    """
+    tree = MemoryTree()
+    project_dir = renderer.generate(context, "/", tree=tree)
+    prefix = MemoryTree._key(project_dir) + "/"
+    files = {path[len(prefix) :]: data for path, data in tree.files.items()}
+    modes = {path[len(prefix) :]: mode for path, mode in tree.modes.items()}
+    return files, modes
+
+
+def merge_file(current: bytes, base: bytes, new: bytes) -> tuple[bytes, bool]:
+    """
+    Three-way merge the changes from base to new into current with
+    ``git merge-file``, returning the result and whether it has conflicts
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for name, data in (("current", current), ("base", base), ("new", new)):
+            path = os.path.join(directory, name)
+            with open(path, "wb") as f:
+                f.write(data)
+            paths.append(path)
+        merge = subprocess.run(
+            ["git", "merge-file", "-p", "-L", "project", "-L", "base", "-L", "template"]
+            + paths,
+            stdout=subprocess.PIPE,
+        )
+    if merge.returncode < 0:
+        raise RuntimeError(f"git merge-file failed with {merge.returncode}")
+    return merge.stdout, merge.returncode > 0
+
+
+@dataclass(frozen=True)
+class UpdateRecord:
+    """Outcome of updating one project"""
+
+    project_dir: str
+    error: Optional[str]
+    duration: float
+    written: list[str] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+    # Files left with conflict markers, or kept as they are when they cannot
+    # be merged (binary files, or files the template removed).
+    conflicts: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), sort_keys=True)
+
+
+def update_project(
+    project_dir: str,
+    renderer: Renderer,
+    base: dict[str, bytes],
+    dry_run: bool = False,
+    context: Optional[dict[str, Any]] = None,
+) -> UpdateRecord:
+    """
+    Merge the changes of the template since a project was rendered into it
+    :param project_dir: String, path of the project to update.
+    :param renderer: Renderer of the current template.
+    :param base: The files of the project as rendered from the template it was
+        rendered from, see render_base.
+    :param dry_run: Only report what would be written, deleted or conflict.
+    :param context: The variables to render the project with, by default the
+        ones it recorded.
+    """
+    start = time.perf_counter()
+    if context is None:
+        context = recorded_variables(project_dir)
+    new, modes = render_files(renderer, context)
+
+    written: list[str] = []
+    deleted: list[str] = []
+    conflicts: list[str] = []
+    for path in sorted(set(base).union(new)):
+        before, after = base.get(path), new.get(path)
+        if before == after:
+            continue
+
+        full_path = os.path.join(project_dir, *path.split("/"))
+        current: Optional[bytes] = None
+        if os.path.isfile(full_path):
+            with open(full_path, "rb") as f:
+                current = f.read()
+        if current == after:
+            continue
+
+        result: Optional[bytes] = after
+        # The record always takes the new render, to record the new commit.
+        if current != before and path != RECORD_FILE:
+            if after is None or current is None or b"\0" in current + after:
+                # Removed from the template but changed in the project, or
+                # deleted from the project, or binary: keep the project's.
+                conflicts.append(path)
+                continue
+            result, conflicted = merge_file(current, before or b"", after)
+            if conflicted:
+                conflicts.append(path)
+
+        if result is None:
+            deleted.append(path)
+            if not dry_run:
+                os.remove(full_path)
+        else:
+            written.append(path)
+            if not dry_run:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, "wb") as f:
+                    f.write(result)
+                os.chmod(full_path, modes[path])
+
+    return UpdateRecord(
+        project_dir=project_dir,
+        error=None,
+        duration=time.perf_counter() - start,
+        written=written,
+        deleted=deleted,
+        conflicts=conflicts,
+    )
+
+
+_renderers: dict[str, Renderer] = {}
+
+
+def _renderer(template_dir: str) -> Renderer:
+    if template_dir not in _renderers:
+        _renderers[template_dir] = Renderer(template_dir)
+    return _renderers[template_dir]
+
+
+def _update(
+    job: tuple[str, dict[str, Any], dict[str, bytes], str, bool],
+) -> UpdateRecord:
+    project_dir, context, base, template_dir, dry_run = job
+    start = time.perf_counter()
+    try:
+        return update_project(
+            project_dir, _renderer(template_dir), base, dry_run, context
+        )
+    except Exception as err:
+        return UpdateRecord(
+            project_dir=project_dir,
+            error=f"{type(err).__name__}: {err}",
+            duration=time.perf_counter() - start,
+        )
+
+
+def update_bulk(
+    project_dirs: Iterable[str],
+    jobs: Optional[int] = None,
+    template_dir: str = str(TEMPLATE_DIR),
+    dry_run: bool = False,
+    base_commit: Optional[str] = None,
+    contexts: Optional[Mapping[str, Mapping[str, Any]]] = None,
+) -> Iterator[UpdateRecord]:
+    """
+    Update many projects, yielding a record as each one finishes
+    :param project_dirs: Paths of the projects to update.
+    :param jobs: Number of worker processes, defaults to the CPU count. With a
+        single job everything runs in the calling process.
+    :param template_dir: String, path of the template directory.
+    :param dry_run: Only report what would be written, deleted or conflict.
+    :param base_commit: The template commit the projects not recording a clean
+        one were rendered from, e.g. those generated before the template
+        recorded its commit.
+    :param contexts: Contexts to use instead of the recorded ones, keyed by
+        project path, for the projects without a record. They may hold the
+        ``_commit`` of their project, which takes precedence over base_commit.
+    """
+    overrides: dict[str, Mapping[str, Any]] = {
+        os.path.abspath(path): context for path, context in (contexts or {}).items()
+    }
+    # The template may have moved on since this process last looked.
+    template_commit.cache_clear()
+    template_dirty.cache_clear()
+
+    # The projects by the template commit they were rendered from.
+    projects: dict[str, list[tuple[str, dict[str, Any]]]] = {}
+    for project_dir in project_dirs:
+        try:
+            record = overrides.get(os.path.abspath(project_dir))
+            if record is None:
+                if not os.path.isfile(os.path.join(project_dir, RECORD_FILE)):
+                    raise ValueError(
+                        f"the project has no {RECORD_FILE}: give its context"
+                    )
+                record = read_record(project_dir)
+            commit: Optional[str] = record.get("_commit")
+            if record.get("_dirty"):
+                if not base_commit:
+                    raise ValueError(
+                        "the project was rendered from uncommitted changes to "
+                        f"the template at {commit}, which are no base to merge "
+                        "from: give the base commit"
+                    )
+                commit = None
+            commit = commit or base_commit
+            if not commit:
+                raise ValueError(
+                    f"{RECORD_FILE} does not record the template commit the "
+                    "project was rendered from: give the base commit"
+                )
+            projects.setdefault(commit, []).append(
+                (
+                    project_dir,
+                    {k: v for k, v in record.items() if not k.startswith("_")},
+                )
+            )
+        except Exception as err:
+            yield UpdateRecord(project_dir, f"{type(err).__name__}: {err}", 0.0)
+
+    # Every commit is checked out and rendered once, up front, for all of its
+    # projects at once.
+    work: list[tuple[str, dict[str, Any], dict[str, bytes], str, bool]] = []
+    with tempfile.TemporaryDirectory(prefix="bakery-update-") as checkouts:
+        for index, (commit, commit_projects) in enumerate(projects.items()):
+            try:
+                bases = render_base(
+                    # Named by index: a base commit given may be any revision.
+                    checkout_template(
+                        commit, os.path.join(checkouts, str(index)), template_dir
+                    ),
+                    [context for _, context in commit_projects],
+                )
+            except Exception as err:
+                bases = [(None, f"{type(err).__name__}: {err}")] * len(commit_projects)
+            for (project_dir, context), (base, error) in zip(commit_projects, bases):
+                if base is None:
+                    yield UpdateRecord(project_dir, error, 0.0)
+                else:
+                    work.append((project_dir, context, base, template_dir, dry_run))
+
+    jobs = min(jobs or os.cpu_count() or 1, max(len(work), 1))
+    if jobs == 1:
+        yield from map(_update, work)
+        return
+
+    with multiprocessing.Pool(jobs) as pool:
+        yield from pool.imap_unordered(_update, work)
@@ -0,0 +1,178 @@
+# coding: utf-8
+"""
+Checks a context has to pass before a project is generated from it. The
+pre-gen hook runs them for plain cookiecutter runs, bakery runs them in-process.
+
+ContextValidator runs the same checks over many unresolved contexts at once,
+before anything gets rendered, reporting every problem of every context instead
+of stopping at the first one.
+"""
+
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Iterable, Mapping, Optional
+
+from cookiecutter.environment import StrictEnvironment
+from jinja2 import Template, TemplateError
+
+from bakery import TEMPLATE_DIR
+from bakery.manifest import is_included
+
+MODULE_REGEX: str = r'^[_a-zA-Z][_a-zA-Z0-9]+$'
+
+#: Canonical public version identifiers of PEP 440, e.g. 1.0, 2.1.0rc1.
+VERSION_REGEX: str = (
+    r'^([1-9][0-9]*!)?(0|[1-9][0-9]*)(\.(0|[1-9][0-9]*))*'
+    r'((a|b|rc)(0|[1-9][0-9]*))?(\.post(0|[1-9][0-9]*))?(\.dev(0|[1-9][0-9]*))?$'
+)
+
+#: Characters YAML does not accept at the start of a plain scalar.
+YAML_INDICATORS: str = "-?:,[]{}#&*!|>'\"%@`"
+
+_MODULE_PATTERN = re.compile(MODULE_REGEX)
+_VERSION_PATTERN = re.compile(VERSION_REGEX)
+_CONTROL_PATTERN = re.compile(r'[\x00-\x1f\x7f]')
+
+
+def _full_name_errors(full_name: str, cookiecutter: Mapping[str, Any]) -> list[str]:
+    """The ways a full name would break the files it is rendered into"""
+    errors: list[str] = []
+    if _CONTROL_PATTERN.search(full_name):
+        errors.append(
+            f"The full name ({full_name!r}) contains a newline or another "
+            "control character."
+        )
+    if is_included("docs/source/conf.py", cookiecutter):
+        # conf.py quotes it with whichever quote it does not contain.
+        if '"' in full_name and "'" in full_name:
+            errors.append(
+                f"The full name ({full_name}) contains both ' and \", so it "
+                "cannot be quoted in docs/source/conf.py."
+            )
+        if "\\" in full_name:
+            errors.append(
+                f"The full name ({full_name}) contains a \\, which would be read "
+                "as an escape sequence in docs/source/conf.py."
+            )
+    if is_included("docs/mkdocs.yml", cookiecutter) and (
+        full_name.startswith(tuple(YAML_INDICATORS))
+        or full_name != full_name.strip()
+        or ": " in full_name
+        or " #" in full_name
+        or full_name.endswith(":")
+    ):
+        errors.append(
+            f"The full name ({full_name}) is not a plain YAML scalar, so it "
+            "cannot be written unquoted to docs/mkdocs.yml."
+        )
+    return errors
+
+
+def validate_context(cookiecutter: Mapping[str, Any]) -> list[str]:
+    """
+    Return every problem found with a context, an empty list if there is none
+    :param cookiecutter: The cookiecutter variables of the context.
+    """
+    errors: list[str] = []
+
+    module_name = str(cookiecutter["project_slug"])
+    if not _MODULE_PATTERN.match(module_name):
+        errors.append(
+            f"The project slug ({module_name}) is not a valid Python module name. "
+            "Please do not use a - and use _ instead."
+        )
+
+    version = str(cookiecutter["version"])
+    if not _VERSION_PATTERN.match(version):
+        errors.append(f"The version ({version}) is not a PEP 440 version, e.g. 0.1.0.")
+
+    errors.extend(_full_name_errors(str(cookiecutter["full_name"]), cookiecutter))
+    return errors
+
+
+class ContextValidator:
+    """
+    Validates unresolved contexts, as given to generate_project, without
+    resolving them through cookiecutter: cookiecutter.json is read and its
+    defaults compiled once, and a choice outside of its options is reported
+    instead of raised.
+    """
+
+    def __init__(self, template_dir: str = str(TEMPLATE_DIR)) -> None:
+        """
+        :param template_dir: String, path of the template directory.
+        """
+        with open(
+            os.path.join(template_dir, "cookiecutter.json"), encoding="utf-8"
+        ) as context_file:
+            self.defaults: dict[str, Any] = json.load(
+                context_file, object_pairs_hook=OrderedDict
+            )
+        self.environment = StrictEnvironment(context={"cookiecutter": self.defaults})
+        self._templates: dict[str, Template] = {}
+
+    def _render(self, raw: Any, cookiecutter: dict[str, Any]) -> Any:
+        if raw is None or isinstance(raw, bool):
+            return raw
+        raw = str(raw)
+        if "{" not in raw and not raw.endswith("\n"):
+            # Renders to itself, which most values given for a context do.
+            return raw
+        template = self._templates.get(raw)
+        if template is None:
+            template = self.environment.from_string(raw)
+            self._templates[raw] = template
+        return template.render(cookiecutter=cookiecutter)
+
+    def resolve(
+        self, extra_context: Optional[Mapping[str, Any]] = None
+    ) -> tuple[dict[str, Any], list[str]]:
+        """
+        Work out the cookiecutter variables of a context the way
+        ``cookiecutter --no-input`` does, returning them and the problems met
+        :param extra_context: Values overriding the defaults of cookiecutter.json.
+        """
+        extra_context = extra_context or {}
+        cookiecutter: dict[str, Any] = {}
+        errors: list[str] = []
+        for key, raw in self.defaults.items():
+            if key.startswith("_"):
+                continue
+            value = extra_context.get(key, raw[0] if isinstance(raw, list) else raw)
+            if isinstance(raw, list) and value not in raw:
+                errors.append(
+                    f"The {key} ({value}) is not one of the choices: "
+                    + ", ".join(map(str, raw))
+                    + "."
+                )
+            try:
+                cookiecutter[key] = self._render(value, cookiecutter)
+            except TemplateError as err:
+                errors.append(f"The {key} ({value}) cannot be rendered: {err}")
+                cookiecutter[key] = str(value)
+        return cookiecutter, errors
+
+    def validate(self, extra_context: Optional[Mapping[str, Any]] = None) -> list[str]:
+        """
+        Return every problem found with an unresolved context
+        :param extra_context: Values overriding the defaults of cookiecutter.json.
+        """
+        cookiecutter, errors = self.resolve(extra_context)
+        return errors + validate_context(cookiecutter)
+
+    def validate_all(
+        self, contexts: Iterable[Optional[Mapping[str, Any]]]
+    ) -> dict[int, list[str]]:
+        """
+        Validate many contexts in one pass, returning the problems of the
+        invalid ones by their index
+        :param contexts: The unresolved contexts.
+        """
+        found: dict[int, list[str]] = {}
+        for index, extra_context in enumerate(contexts):
+            errors = self.validate(extra_context)
+            if errors:
+                found[index] = errors
+        return found
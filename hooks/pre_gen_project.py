@@ -1,17 +1,21 @@
 #!/usr/bin/env python
 # vim: set fileencoding=utf-8 :
-import re
-import sys
+"""
+Cancel the project when its context fails the checks of bakery/validate.py,
+which bakery runs in-process instead.
+"""
 
-MODULE_REGEX = r'^[_a-zA-Z][_a-zA-Z0-9]+$'
+import json
+import sys
 
-module_name = '{{ cookiecutter.project_slug }}'
+# A string literal, so that the hook still parses and type checks unrendered.
+ERRORS: list[str] = json.loads(
+    "{{ cookiecutter | validation_errors | jsonify | python_string }}"
+)
 
-if not re.match(MODULE_REGEX, module_name):
-    print(
-        f"ERROR: The project slug ({module_name}) is not a valid Python module name.",
-        "Please do not use a - and use _ instead.",
-    )
+if ERRORS:
+    for error in ERRORS:
+        print(f"ERROR: {error}")
 
     # Exit to cancel project
     sys.exit(1)
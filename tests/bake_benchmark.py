@@ -0,0 +1,114 @@
+# coding: utf-8
+"""
+Time bakes of the template, phase by phase, and compare them to a baseline.
+
+The bakes go through bakery in memory, so the numbers are those of the
+template itself (resolving the context, the checks of the pre-gen hook,
+rendering the files and the pruning of the post-gen hook) without disk noise.
+"""
+
+import json
+import math
+import statistics
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable, Optional, Sequence
+
+from bakery.generate import Renderer
+from bakery.timing import PHASES, Timings
+from bakery.tree import MemoryTree
+
+
+@dataclass(frozen=True)
+class BakeStats:
+    """Statistics of the wall time of many bakes, in seconds"""
+
+    bakes: int
+    median: float
+    p95: float
+    # Median seconds of every phase.
+    phases: dict[str, float]
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=4, sort_keys=True) + "\n"
+
+    @classmethod
+    def from_json(cls, text: str) -> "BakeStats":
+        return cls(**json.loads(text))
+
+    def __str__(self) -> str:
+        phases = ", ".join(
+            f"{phase} {seconds * 1000:.2f}ms" for phase, seconds in self.phases.items()
+        )
+        return (
+            f"{self.bakes} bakes: median {self.median * 1000:.2f}ms, "
+            f"p95 {self.p95 * 1000:.2f}ms ({phases})"
+        )
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of some values"""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(timings: Sequence[Timings]) -> BakeStats:
+    """Statistics of the timings of many bakes"""
+    totals: list[float] = [t.total for t in timings]
+    return BakeStats(
+        bakes=len(timings),
+        median=statistics.median(totals),
+        p95=percentile(totals, 95),
+        phases={
+            phase: statistics.median(t.phases[phase] for t in timings)
+            for phase in PHASES
+        },
+    )
+
+
+def time_bakes(
+    renderer: Renderer, contexts: Iterable[dict[str, Any]], rounds: int = 5
+) -> list[Timings]:
+    """
+    Bake every context a number of times, returning the timings of every bake
+    :param renderer: bakery.generate.Renderer, rendering the template.
+    :param contexts: Extra contexts to bake.
+    :param rounds: How many times to bake each context. Every context is baked
+        once more beforehand, untimed, to compile the templates it uses.
+    """
+    contexts = list(contexts)
+    for context in contexts:
+        renderer.generate(context, "/", tree=MemoryTree())
+
+    timings: list[Timings] = []
+    for _ in range(rounds):
+        for context in contexts:
+            timing = Timings()
+            renderer.generate(context, "/", tree=MemoryTree(), timings=timing)
+            timings.append(timing)
+    return timings
+
+
+def regressions(
+    current: BakeStats, baseline: Optional[BakeStats], threshold: float
+) -> list[str]:
+    """
+    Describe how the median or p95 bake time regressed past a baseline
+    :param current: The statistics of the bakes just timed.
+    :param baseline: The statistics to compare to, nothing regressed without.
+    :param threshold: Allowed slowdown as a fraction, 0.25 allows 25% slower.
+    """
+    if baseline is None:
+        return []
+
+    found: list[str] = []
+    for name in ("median", "p95"):
+        now: float = getattr(current, name)
+        before: float = getattr(baseline, name)
+        if now > before * (1 + threshold):
+            found.append(
+                f"{name} bake time regressed from {before * 1000:.2f}ms to "
+                f"{now * 1000:.2f}ms (+{now / before - 1:.0%}, allowed "
+                f"+{threshold:.0%})"
+            )
+    return found
@@ -0,0 +1,232 @@
+# coding: utf-8
+"""
+Content addressed cache of baked projects.
+
+A baked project only depends on the template tree, the hooks, the defaults in
+cookiecutter.json, the bakery package and the extra context it was baked with
+(plus the current date, which the LICENSE and the Sphinx configuration render,
+and the template commit, which .cookiecutter.json records). Hashing those gives
+a key under which the baked tree is stored once; later bakes of the same
+context get a read-only copy of the stored tree instead of running cookiecutter
+again.
+
+Only the tests baking to disk go through it, with --bake-target=disk: the
+default target renders into memory, which is faster than copying a stored tree.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+import uuid
+from typing import Any, Optional
+
+from bakery.update import template_commit, template_dirty
+from pytest_cookies.plugin import Cookies, Result
+
+# From <linux/fs.h>, clones the extents of a file on filesystems with reflinks.
+_FICLONE: int = 0x40049409
+
+_TEMPLATE_INPUTS: tuple[str, ...] = (
+    "{{cookiecutter.project_slug}}",
+    "hooks",
+    "cookiecutter.json",
+    # The hooks and the _extensions of cookiecutter.json use the bakery.
+    "bakery",
+)
+
+
+def template_digest(template: str) -> str:
+    """
+    Hash every file the template renders from, including names and modes
+    :param template: String, path of the template directory.
+    """
+    digest = hashlib.sha256()
+    for name in _TEMPLATE_INPUTS:
+        top = os.path.join(template, name)
+        paths: list[str] = [top] if os.path.isfile(top) else []
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [d for d in dirnames if d != "__pycache__"]
+            paths.extend(os.path.join(dirpath, f) for f in filenames)
+
+        for path in sorted(paths):
+            digest.update(os.path.relpath(path, template).encode('utf-8'))
+            digest.update(oct(stat.S_IMODE(os.stat(path).st_mode)).encode())
+            with open(path, 'rb') as source:
+                digest.update(hashlib.sha256(source.read()).digest())
+    return digest.hexdigest()
+
+
+def _clone_file(source: str, destination: str) -> None:
+    """
+    Reflink the file if possible, copy it otherwise. Never hardlink it: a test
+    writing to its project would write to the stored one, file modes or not.
+    """
+    try:
+        import fcntl
+
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        shutil.copystat(source, destination)
+        return
+    except (ImportError, OSError):
+        if os.path.exists(destination):
+            os.remove(destination)
+
+    shutil.copy2(source, destination)
+
+
+def _tree_size(root: str) -> int:
+    return sum(
+        os.lstat(os.path.join(dirpath, f)).st_size
+        for dirpath, _, filenames in os.walk(root)
+        for f in filenames
+    )
+
+
+class BakeCache:
+    """
+    Store of baked projects keyed by template digest and extra context, with
+    least recently used entries evicted once the store grows over max_bytes.
+    """
+
+    def __init__(
+        self, root: str, template: str, checkout_root: str, max_bytes: int
+    ) -> None:
+        """
+        :param root: String, directory the cache entries are stored in.
+        :param template: String, path of the template directory.
+        :param checkout_root: String, directory cache hits are copied into.
+        :param max_bytes: Size the entries are allowed to take up on disk.
+        """
+        self.root = root
+        self.checkout_root = checkout_root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._template_digest = template_digest(template)
+        # Recorded by every project, see bakery.update.recorded_context.
+        self._template_state = json.dumps(
+            [template_commit(template), template_dirty(template)]
+        )
+        os.makedirs(os.path.join(root, "entries"), exist_ok=True)
+
+    def key(self, extra_context: Optional[dict[str, Any]]) -> str:
+        """Normalize the extra context and hash it with the template digest"""
+        normalized: dict[str, str] = {
+            str(k): str(v) for k, v in (extra_context or {}).items()
+        }
+        digest = hashlib.sha256(self._template_digest.encode())
+        digest.update(self._template_state.encode())
+        digest.update(datetime.date.today().isoformat().encode())
+        digest.update(json.dumps(normalized, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, "entries", key)
+
+    def get(self, extra_context: Optional[dict[str, Any]]) -> Optional[Result]:
+        """
+        Return a read-only copy of the cached project, None on a cache miss
+        :param extra_context: The extra context the project was baked with.
+        """
+        entry = self._entry(self.key(extra_context))
+        try:
+            with open(os.path.join(entry, "meta.json"), 'r') as meta_file:
+                meta: dict[str, Any] = json.load(meta_file)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        # Mark the entry as recently used.
+        os.utime(entry)
+
+        stored_project = os.path.join(entry, meta["project"])
+        project_dir = os.path.join(
+            tempfile.mkdtemp(dir=self.checkout_root), meta["project"]
+        )
+        for dirpath, _, filenames in os.walk(stored_project):
+            target_dir = os.path.join(
+                project_dir, os.path.relpath(dirpath, stored_project)
+            )
+            os.makedirs(target_dir, exist_ok=True)
+            for f in filenames:
+                _clone_file(os.path.join(dirpath, f), os.path.join(target_dir, f))
+
+        self.hits += 1
+        return Result(project_dir=project_dir, context=meta["context"])
+
+    def put(self, extra_context: Optional[dict[str, Any]], result: Result) -> None:
+        """
+        Store a successfully baked project, then evict entries if needed
+        :param extra_context: The extra context the project was baked with.
+        :param result: pytest_cookies.Result, the result of the bake.
+        """
+        if result.exit_code != 0 or result.project_path is None:
+            return
+
+        entry = self._entry(self.key(extra_context))
+        if os.path.isdir(entry):
+            return
+
+        project_name = result.project_path.name
+        staging = os.path.join(self.root, f"staging-{uuid.uuid4().hex}")
+        shutil.copytree(str(result.project_path), os.path.join(staging, project_name))
+
+        # Files are shared with every checkout, so nobody gets to write to them.
+        for dirpath, _, filenames in os.walk(staging):
+            for f in filenames:
+                path = os.path.join(dirpath, f)
+                os.chmod(path, stat.S_IMODE(os.stat(path).st_mode) & ~0o222)
+
+        with open(os.path.join(staging, "meta.json"), 'w') as meta_file:
+            json.dump(
+                {
+                    "project": project_name,
+                    "context": result.context,
+                    "size": _tree_size(staging),
+                },
+                meta_file,
+            )
+
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another session stored the same entry first.
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits"""
+        entries_dir = os.path.join(self.root, "entries")
+        entries: list[tuple[float, int, str]] = []
+        for key in os.listdir(entries_dir):
+            entry = os.path.join(entries_dir, key)
+            try:
+                with open(os.path.join(entry, "meta.json"), 'r') as meta_file:
+                    size: int = json.load(meta_file)["size"]
+                entries.append((os.stat(entry).st_mtime, size, entry))
+            except (OSError, ValueError, KeyError):
+                shutil.rmtree(entry, ignore_errors=True)
+
+        total: int = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def bake(
+        self, cookies: Cookies, extra_context: Optional[dict[str, Any]] = None
+    ) -> Result:
+        """Bake through the cache, only running cookiecutter on a cache miss"""
+        cached: Optional[Result] = self.get(extra_context)
+        if cached is not None:
+            return cached
+
+        result: Result = cookies.bake(extra_context=extra_context)
+        self.put(extra_context, result)
+        return result
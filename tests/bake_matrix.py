@@ -0,0 +1,166 @@
+# coding: utf-8
+"""
+Bake a whole matrix of contexts at once by spreading them over a process pool.
+
+Every worker process gets its own output root (and its own cookiecutter user
+config, so replay files do not collide either), which lets the combinations
+run side by side without stepping on each other's project directories.
+"""
+
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Sequence, Union
+
+from pytest_cookies.plugin import Cookies
+
+_cookies: Optional[Cookies] = None
+
+
+@dataclass(frozen=True)
+class MatrixResult:
+    """Outcome of baking a single combination of the matrix"""
+
+    context: dict[str, Any]
+    exit_code: Union[int, str, None]
+    exception: Optional[BaseException]
+    project_path: Optional[str]
+    tree: tuple[str, ...]
+    duration: float
+
+
+def get_choices(template: str, axes: Iterable[str]) -> dict[str, list[str]]:
+    """
+    Read the possible values of the given axes from the cookiecutter.json file
+    :param template: String, path of the template directory.
+    :param axes: Names of the cookiecutter variables to read the choices of.
+        Yes/no variables expand to both "y" and "n".
+    """
+    with open(os.path.join(template, "cookiecutter.json"), 'r') as context_file:
+        defaults: dict[str, Any] = json.load(context_file)
+
+    choices: dict[str, list[str]] = {}
+    for axis in axes:
+        value = defaults[axis]
+        if isinstance(value, list):
+            choices[axis] = value
+        elif value in ("y", "n"):
+            choices[axis] = ["y", "n"]
+        else:
+            choices[axis] = [value]
+    return choices
+
+
+def get_defaults(template: str, axes: Iterable[str]) -> dict[str, str]:
+    """
+    Read the default values of the given axes from the cookiecutter.json file,
+    the first choice of the variables with several
+    :param template: String, path of the template directory.
+    :param axes: Names of the cookiecutter variables to read the defaults of.
+    """
+    with open(os.path.join(template, "cookiecutter.json"), 'r') as context_file:
+        defaults: dict[str, Any] = json.load(context_file)
+
+    return {
+        axis: defaults[axis][0] if isinstance(defaults[axis], list) else defaults[axis]
+        for axis in axes
+    }
+
+
+def list_tree(root: str) -> tuple[str, ...]:
+    """Return every file and directory below root, relative to it and sorted"""
+    tree: list[str] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        relative_dir = os.path.relpath(dirpath, root)
+        for name in dirnames + filenames:
+            tree.append(os.path.normpath(os.path.join(relative_dir, name)))
+    return tuple(sorted(tree))
+
+
+def _init_worker(template: str, output_root: str) -> None:
+    global _cookies
+
+    worker_root = os.path.join(output_root, f"worker{os.getpid()}")
+    user_dir = os.path.join(worker_root, "user_dir")
+    cookiecutters_dir = os.path.join(user_dir, "cookiecutters")
+    replay_dir = os.path.join(user_dir, "cookiecutter_replay")
+    os.makedirs(cookiecutters_dir)
+    os.makedirs(replay_dir)
+
+    config_file = os.path.join(user_dir, "config")
+    with open(config_file, 'w', encoding='utf-8') as config:
+        # JSON is a subset of YAML, which is what cookiecutter reads.
+        json.dump(
+            {"cookiecutters_dir": cookiecutters_dir, "replay_dir": replay_dir},
+            config,
+        )
+
+    def output_factory(dirname: str) -> str:
+        output_dir = os.path.join(worker_root, dirname)
+        os.mkdir(output_dir)
+        return output_dir
+
+    _cookies = Cookies(template, output_factory, config_file)
+
+
+def _picklable(exception: Optional[BaseException]) -> Optional[BaseException]:
+    if exception is None:
+        return None
+    try:
+        pickle.dumps(exception)
+    except Exception:
+        return RuntimeError(repr(exception))
+    return exception
+
+
+def _bake(context: dict[str, Any]) -> MatrixResult:
+    assert _cookies is not None
+
+    start = time.perf_counter()
+    result = _cookies.bake(extra_context=context)
+    duration = time.perf_counter() - start
+
+    project_path: Optional[str] = None
+    tree: tuple[str, ...] = ()
+    if result.project_path is not None:
+        project_path = str(result.project_path)
+        tree = list_tree(project_path)
+
+    return MatrixResult(
+        context=context,
+        exit_code=result.exit_code,
+        exception=_picklable(result.exception),
+        project_path=project_path,
+        tree=tree,
+        duration=duration,
+    )
+
+
+def bake_matrix(
+    template: str,
+    contexts: Sequence[dict[str, Any]],
+    output_root: str,
+    max_workers: Optional[int] = None,
+) -> list[MatrixResult]:
+    """
+    Bake every context in a process pool, returning the results in input order
+    :param template: String, path of the template directory.
+    :param contexts: Extra contexts to bake, one project per context.
+    :param output_root: String, directory under which every worker creates its
+        own output root.
+    :param max_workers: Size of the process pool, defaults to the CPU count.
+    """
+    if not contexts:
+        return []
+
+    workers: int = min(max_workers or os.cpu_count() or 1, len(contexts))
+    chunksize: int = max(1, len(contexts) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(os.path.abspath(template), output_root),
+    ) as pool:
+        return list(pool.map(_bake, contexts, chunksize=chunksize))
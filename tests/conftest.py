@@ -0,0 +1,275 @@
+# coding: utf-8
+import os
+from typing import Any, Callable, ContextManager, Iterator, Optional, Sequence
+
+from _pytest.config import Config
+from _pytest.config.argparsing import Parser
+from _pytest.terminal import TerminalReporter
+from bake_cache import BakeCache
+from bake_matrix import get_choices, get_defaults
+from bakery.bytecode_cache import ENVIRONMENT_VARIABLE, get_bytecode_cache
+from bakery.generate import Renderer
+from helper_functions import (
+    bake_in_memory,
+    bake_in_temp_dir,
+    bake_in_tmpfs,
+    get_all_possble_combinations,
+)
+from impact_selection import ImpactSelection
+from project_index import ProjectIndexes
+from session_envs import DEPENDENCY_OPTIONS, SessionEnvironments, session_environments
+from pytest import FixtureRequest, Item, StashKey, TempPathFactory, fixture
+from pytest_cookies.plugin import Cookies
+
+BAKE_TARGETS: tuple[str, ...] = ("memory", "tmpfs", "disk")
+IMPACT_SELECTION = StashKey[ImpactSelection]()
+
+
+def pytest_addoption(parser: Parser) -> None:
+    group = parser.getgroup("bake cache")
+    group.addoption(
+        "--no-bake-cache",
+        action="store_true",
+        default=False,
+        dest="no_bake_cache",
+        help="Always render the template instead of reusing cached bakes. Only "
+        "--bake-target=disk bakes through the cache.",
+    )
+    group.addoption(
+        "--bake-cache-size",
+        action="store",
+        default=256,
+        dest="bake_cache_size",
+        help="Disk space in MiB the cached bakes may take up (default: 256).",
+        type=int,
+    )
+    group.addoption(
+        "--jinja-bytecode-cache",
+        action="store_true",
+        default=False,
+        dest="jinja_bytecode_cache",
+        help="Keep the compiled template files in the pytest cache directory.",
+    )
+    group.addoption(
+        "--no-session-reuse",
+        action="store_true",
+        default=False,
+        dest="no_session_reuse",
+        help="Let nox and tox create fresh environments from the package index "
+        "instead of reusing shared ones fed from a local wheelhouse.",
+    )
+    group.addoption(
+        "--session-jobs",
+        action="store",
+        default=None,
+        dest="session_jobs",
+        help="Number of nox/tox runs of the slow tests running at once "
+        "(default: the CPU count).",
+        type=int,
+    )
+    group.addoption(
+        "--session-timeout",
+        action="store",
+        default=1800.0,
+        dest="session_timeout",
+        help="Seconds after which a nox/tox run of the slow tests is killed "
+        "(default: 1800).",
+        type=float,
+    )
+    group.addoption(
+        "--bake-target",
+        action="store",
+        choices=BAKE_TARGETS,
+        default="memory",
+        dest="bake_target",
+        help="Where the tests that only read the rendered files bake into: "
+        "memory (default), a tmpfs directory, or disk through pytest-cookies.",
+    )
+
+    group = parser.getgroup("bake benchmark")
+    group.addoption(
+        "--benchmark-rounds",
+        action="store",
+        default=None,
+        dest="benchmark_rounds",
+        help="Times the benchmark bakes every context (default: 5). The "
+        "benchmark only runs with this option or --benchmark-save.",
+        type=int,
+    )
+    group.addoption(
+        "--benchmark-baseline",
+        action="store",
+        default=os.path.join(os.path.dirname(__file__), "bake_baseline.json"),
+        dest="benchmark_baseline",
+        help="JSON file with the bake times to compare to "
+        "(default: tests/bake_baseline.json, nothing is compared without it).",
+    )
+    group.addoption(
+        "--benchmark-save",
+        action="store_true",
+        default=False,
+        dest="benchmark_save",
+        help="Save the bake times as the new baseline instead of comparing.",
+    )
+    group.addoption(
+        "--benchmark-threshold",
+        action="store",
+        default=0.25,
+        dest="benchmark_threshold",
+        help="Fraction the median or p95 bake time may grow over the baseline "
+        "before the benchmark fails (default: 0.25).",
+        type=float,
+    )
+
+    group = parser.getgroup("impact selection")
+    group.addoption(
+        "--impact-base",
+        action="store",
+        default=None,
+        dest="impact_base",
+        metavar="REVISION",
+        help="Only run the tests and contexts the changes since this git "
+        "revision, committed or not, can affect.",
+    )
+
+
+def pytest_configure(config: Config) -> None:
+    cache = getattr(config, "cache", None)
+    if config.option.jinja_bytecode_cache and cache is not None:
+        # Through the environment so the bake processes pick it up too.
+        os.environ[ENVIRONMENT_VARIABLE] = str(cache.mkdir("jinja_bytecode_cache"))
+
+
+def pytest_collection_modifyitems(config: Config, items: list[Item]) -> None:
+    if config.option.impact_base is None:
+        return
+
+    selection = ImpactSelection(config.option.impact_base, config.option.template)
+    config.stash[IMPACT_SELECTION] = selection
+    selected, deselected = selection.deselect(items)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+def pytest_terminal_summary(terminalreporter: TerminalReporter) -> None:
+    bytecode_cache = get_bytecode_cache()
+    if bytecode_cache is None:
+        return
+
+    lookups: int = bytecode_cache.hits + bytecode_cache.misses
+    terminalreporter.write_line(
+        f"Jinja bytecode cache: {bytecode_cache.hits} hits out of {lookups} "
+        "template loads in the test process"
+        + (f" ({bytecode_cache.hits / lookups:.1%})" if lookups else "")
+    )
+
+
+@fixture(scope="session")
+def bake_cache(
+    request: FixtureRequest, tmp_path_factory: TempPathFactory
+) -> Iterator[Optional[BakeCache]]:
+    """
+    Cache of baked projects shared by every test run, None when disabled. Only
+    the disk --bake-target bakes through it, so it is only set up for that one.
+    """
+    cache = getattr(request.config, "cache", None)
+    if request.config.option.no_bake_cache or cache is None:
+        yield None
+        return
+
+    yield BakeCache(
+        root=str(cache.mkdir("bake_cache")),
+        template=request.config.option.template,
+        checkout_root=str(tmp_path_factory.mktemp("bake_cache_checkouts")),
+        max_bytes=request.config.option.bake_cache_size * 1024 * 1024,
+    )
+
+
+@fixture(scope="session")
+def renderer(request: FixtureRequest) -> Renderer:
+    """Renderer of the template shared by every test of the session"""
+    return Renderer(request.config.option.template)
+
+
+@fixture(scope="session")
+def project_index(request: FixtureRequest, renderer: Renderer) -> ProjectIndexes:
+    """
+    Parsed projects shared by every test of the session, see ProjectIndexes.
+    Baked into memory, or into a tmpfs directory for the other --bake-target.
+    """
+    return ProjectIndexes(renderer, request.config.option.bake_target)
+
+
+@fixture
+def bake(
+    request: FixtureRequest,
+    cookies: Cookies,
+    renderer: Renderer,
+) -> Callable[..., ContextManager[Any]]:
+    """
+    Bake a project into the target picked with --bake-target, for tests that
+    only read the rendered files. Returns a context manager factory taking the
+    extra context, whose result has the exception, exit_code, project and
+    context attributes of pytest_cookies.Result.
+    """
+    target: str = request.config.option.bake_target
+    # Requested lazily: hashing the template is wasted on the other targets.
+    bake_cache: Optional[BakeCache] = (
+        request.getfixturevalue("bake_cache") if target == "disk" else None
+    )
+
+    def factory(extra_context: Optional[dict[str, Any]] = None) -> ContextManager[Any]:
+        if target == "memory":
+            return bake_in_memory(renderer, extra_context)
+        if target == "tmpfs":
+            return bake_in_tmpfs(renderer, extra_context)
+        return bake_in_temp_dir(cookies, extra_context, cache=bake_cache)
+
+    return factory
+
+
+@fixture(scope="session")
+def session_envs(
+    request: FixtureRequest, project_index: ProjectIndexes
+) -> Optional[SessionEnvironments]:
+    """
+    Wheelhouse and environments the nox and tox runs of the slow tests share,
+    kept in the pytest cache directory, None when disabled. Building the
+    wheelhouse the first time is the only step that needs the package index.
+    It holds the requirements of every combination of DEPENDENCY_OPTIONS, so
+    any context of the slow tests installs offline.
+    """
+    cache = getattr(request.config, "cache", None)
+    if request.config.option.no_session_reuse or cache is None:
+        return None
+
+    template: str = request.config.option.template
+    projects = [
+        project_index(context)
+        for context in get_all_possble_combinations(
+            get_choices(template, DEPENDENCY_OPTIONS)
+        )
+    ]
+    return session_environments(
+        str(cache.mkdir("session_envs")),
+        get_defaults(template, DEPENDENCY_OPTIONS),
+        (project.pipfile for project in projects),
+        (project.pyproject for project in projects),
+    )
+
+
+@fixture(scope="session")
+def affected_contexts(
+    request: FixtureRequest,
+) -> Callable[[Sequence[dict[str, Any]]], list[dict[str, Any]]]:
+    """
+    Filter a list of contexts down to those the changes since --impact-base can
+    affect, one per group of equivalent contexts. Keeps them all without it.
+    """
+    selection: Optional[ImpactSelection] = request.config.stash.get(
+        IMPACT_SELECTION, None
+    )
+    if selection is None:
+        return list
+    return selection.filter
@@ -1,16 +1,22 @@
 # coding: utf-8
 
 import os
+import random
 import shlex
 import subprocess
+import tempfile
 from contextlib import contextmanager
+from dataclasses import dataclass
 from importlib import util
 from importlib.machinery import ModuleSpec
 from types import ModuleType
-from typing import Any, Iterator, cast
-from itertools import product
+from typing import Any, Iterator, Optional, cast
+from itertools import combinations, product
 
 # import yaml
+from bake_cache import BakeCache
+from bakery.generate import Renderer
+from bakery.tree import MemoryPath, MemoryTree
 from cookiecutter.utils import rmtree
 from pytest_cookies.plugin import Cookies, Result
 
@@ -30,13 +36,25 @@ def inside_dir(dirpath: str) -> Iterator[None]:
 
 
 @contextmanager
-def bake_in_temp_dir(cookies: Cookies, *args: Any, **kwargs: dict[str, str]) -> Result:
+def bake_in_temp_dir(
+    cookies: Cookies,
+    *args: Any,
+    cache: Optional[BakeCache] = None,
+    **kwargs: dict[str, str],
+) -> Result:
     """
     Delete the temporal directory that is created when executing the tests
     :param cookies: pytest_cookies.Cookies,
         cookie to be baked and its temporal files will be removed
+    :param cache: BakeCache, hand back a copy of a previous bake of the same
+        context instead of baking again. Only for tests that do not write into
+        the project.
     """
-    result = cookies.bake(*args, **kwargs)
+    result = (
+        cookies.bake(*args, **kwargs)
+        if cache is None
+        else cache.bake(cookies, *args, **kwargs)
+    )
     # print('=' * 80 + '\n', "Result info:", repr(result), '\n' + ('=' * 80))
     try:
         yield result
@@ -44,20 +62,99 @@ def bake_in_temp_dir(cookies: Cookies, *args: Any, **kwargs: dict[str, str]) ->
         rmtree(str(result.project))
 
 
-def run_inside_dir(command: str, dirpath: str) -> int:
+@dataclass(frozen=True)
+class MemoryResult:
+    """Result of a bake that only exists in memory, shaped like Result"""
+
+    exception: Optional[BaseException]
+    exit_code: int
+    project: Optional[MemoryPath]
+    context: Optional[dict[str, Any]]
+
+
+@contextmanager
+def bake_in_memory(
+    renderer: Renderer, extra_context: Optional[dict[str, Any]] = None
+) -> Iterator[MemoryResult]:
+    """
+    Render a project into memory, for tests that only look at the rendered
+    files. Nothing touches the filesystem, so there is nothing to clean up.
+    :param renderer: bakery.generate.Renderer, rendering the template.
+    :param extra_context: Values overriding the defaults of cookiecutter.json.
+    """
+    tree = MemoryTree()
+    try:
+        project_dir = renderer.generate(extra_context, "/", tree=tree)
+    except Exception as err:
+        yield MemoryResult(err, -1, None, None)
+    else:
+        yield MemoryResult(None, 0, MemoryPath(tree, project_dir), extra_context or {})
+
+
+def tmpfs_dir() -> str:
+    """
+    Find a writable directory backed by memory (a tmpfs mount), falling back
+    to the temporary directory of the system when there is none
+    """
+    try:
+        with open("/proc/mounts") as mounts:
+            tmpfs = {
+                fields[1]
+                for fields in (line.split() for line in mounts)
+                if len(fields) > 2 and fields[2] == "tmpfs"
+            }
+    except OSError:
+        tmpfs = set()
+
+    for candidate in ("/dev/shm", os.environ.get("XDG_RUNTIME_DIR"), "/tmp"):
+        if candidate in tmpfs and os.access(candidate, os.W_OK):
+            return candidate
+    return tempfile.gettempdir()
+
+
+@contextmanager
+def bake_in_tmpfs(
+    renderer: Renderer, extra_context: Optional[dict[str, Any]] = None
+) -> Iterator[Result]:
+    """
+    Render a project into a fresh directory on a tmpfs, see tmpfs_dir, and
+    delete it afterwards
+    :param renderer: bakery.generate.Renderer, rendering the template.
+    :param extra_context: Values overriding the defaults of cookiecutter.json.
+    """
+    output_dir = tempfile.mkdtemp(prefix="bake-", dir=tmpfs_dir())
+    try:
+        try:
+            project_dir = renderer.generate(extra_context, output_dir)
+        except Exception as err:
+            yield Result(exception=err, exit_code=-1)
+        else:
+            yield Result(
+                project_dir=project_dir, context=extra_context or {}, exit_code=0
+            )
+    finally:
+        rmtree(output_dir)
+
+
+def run_inside_dir(
+    command: str, dirpath: str, env: Optional[dict[str, str]] = None
+) -> int:
     """
     Run a command from inside a given directory, returning the exit status
     :param command: Command that will be executed
     :param dirpath: String, path of the directory the command is being run.
+    :param env: Environment variables of the command, defaults to ours.
     """
-    with inside_dir(dirpath):
-        return subprocess.check_call(shlex.split(command))
+    return subprocess.check_call(shlex.split(command), cwd=dirpath, env=env)
 
 
-def check_output_inside_dir(command: str, dirpath: str) -> str:
+def check_output_inside_dir(
+    command: str, dirpath: str, env: Optional[dict[str, str]] = None
+) -> str:
     "Run a command from inside a given directory, returning the command output"
-    with inside_dir(dirpath):
-        return subprocess.check_output(shlex.split(command), text=True)
+    return subprocess.check_output(
+        shlex.split(command), cwd=dirpath, text=True, env=env
+    )
 
 
 def project_info(result: Result) -> tuple[str, str, str]:
@@ -68,7 +165,125 @@ def project_info(result: Result) -> tuple[str, str, str]:
     return project_path, project_slug, project_dir
 
 
-def get_all_possble_combinations(options: dict[str, Any]) -> list[dict[str, Any]]:
+@dataclass(frozen=True)
+class CoveringArray:
+    """Contexts that together cover every t-way interaction of option values"""
+
+    combinations: list[dict[str, Any]]
+    strength: int
+    covered: int
+    total: int
+
+    @property
+    def coverage(self) -> float:
+        return self.covered / self.total if self.total else 1.0
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.combinations)} contexts covering {self.coverage:.1%} "
+            f"of {self.total} {self.strength}-way interactions"
+        )
+
+
+# An interaction is a tuple of option indices and the value index of each.
+_Interaction = tuple[tuple[int, ...], tuple[int, ...]]
+
+
+def _interactions(row: list[int], strength: int) -> Iterator[_Interaction]:
+    for options in combinations(range(len(row)), strength):
+        yield options, tuple(row[i] for i in options)
+
+
+def get_covering_array(
+    options: dict[str, Any],
+    strength: int = 2,
+    max_size: Optional[int] = None,
+    candidates: int = 32,
+    seed: int = 0,
+) -> CoveringArray:
+    """
+    Greedily build a small set of contexts covering every t-way interaction
+    :param options: Possible values of every option, like for
+        get_all_possble_combinations.
+    :param strength: The t in t-way, 2 (pairwise) by default.
+    :param max_size: Stop after this many contexts even if some interactions
+        are left uncovered, the coverage tells how many were.
+    :param candidates: Number of candidate contexts to pick each context from.
+    :param seed: Seed of the tie breaking, the result is deterministic for it.
+    """
+    keys, values = zip(*options.items()) if options else ((), ())
+    sizes: list[int] = [len(v) for v in values]
+    strength = min(strength, len(keys))
+    rng = random.Random(seed)
+
+    uncovered: set[_Interaction] = {
+        (opts, vals)
+        for opts in combinations(range(len(keys)), strength)
+        for vals in product(*(range(sizes[i]) for i in opts))
+    }
+    total: int = len(uncovered)
+
+    def gain(row: list[Optional[int]], option: int, value: int) -> int:
+        """Count the uncovered interactions completed by setting option"""
+        assigned = [i for i, v in enumerate(row) if v is not None and i != option]
+        count = 0
+        for others in combinations(assigned, strength - 1):
+            opts = tuple(sorted(others + (option,)))
+            vals = tuple(value if i == option else row[i] for i in opts)
+            count += (opts, cast(tuple[int, ...], vals)) in uncovered
+        return count
+
+    rows: list[list[int]] = []
+    while uncovered and (max_size is None or len(rows) < max_size):
+        best_row: list[int] = []
+        best_gain = 0
+        # Seed every candidate with an uncovered interaction so each new
+        # context covers at least one of them.
+        pool = sorted(uncovered)
+        for _ in range(candidates):
+            opts, vals = rng.choice(pool)
+            row: list[Optional[int]] = [None] * len(keys)
+            for i, v in zip(opts, vals):
+                row[i] = v
+
+            rest = [i for i in range(len(keys)) if row[i] is None]
+            rng.shuffle(rest)
+            for option in rest:
+                gains = [gain(row, option, v) for v in range(sizes[option])]
+                top = max(gains)
+                row[option] = rng.choice([v for v, g in enumerate(gains) if g == top])
+
+            complete = cast(list[int], row)
+            row_gain = sum(i in uncovered for i in _interactions(complete, strength))
+            if row_gain > best_gain:
+                best_row, best_gain = complete, row_gain
+
+        rows.append(best_row)
+        uncovered.difference_update(_interactions(best_row, strength))
+
+    return CoveringArray(
+        combinations=[
+            {key: values[i][v] for i, (key, v) in enumerate(zip(keys, row))}
+            for row in rows
+        ],
+        strength=strength,
+        covered=total - len(uncovered),
+        total=total,
+    )
+
+
+def get_all_possble_combinations(
+    options: dict[str, Any], strength: Optional[int] = None
+) -> list[dict[str, Any]]:
+    """
+    Expand the options into contexts
+    :param options: Possible values of every option.
+    :param strength: Only return enough contexts to cover every t-way
+        interaction of option values, see get_covering_array. Every
+        combination is returned when not given.
+    """
+    if strength is not None:
+        return get_covering_array(options, strength).combinations
     keys, values = zip(*options.items())
     return [dict(zip(keys, v)) for v in product(*values)]
 
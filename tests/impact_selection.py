@@ -0,0 +1,89 @@
+# coding: utf-8
+"""
+Select the tests, and the contexts within them, that the changes since a git
+revision can affect (see bakery.impact), for running with --impact-base.
+
+Tests declare the contexts they bake with ``@mark.bake_context(*contexts)`` or
+a ``context`` parameter. Tests declaring neither always run, and so does
+everything when a change reaches beyond the project template.
+"""
+
+import json
+import os
+from typing import Any, Optional, Sequence
+
+from bakery.generate import Renderer, resolve_context
+from bakery.impact import Impact, changed_files, impact_of
+from pytest import Item
+
+
+class ImpactSelection:
+    """The tests and contexts affected by the changes since a revision"""
+
+    def __init__(self, base: str, template: str) -> None:
+        """
+        :param base: The git revision to compare to.
+        :param template: String, path of the template directory.
+        """
+        self.template = os.path.abspath(template)
+        self.changed: list[str] = changed_files(base, self.template)
+        self.impact: Impact = impact_of(
+            self.changed, Renderer(self.template).environment, self.template
+        )
+        self._resolved: dict[str, dict[str, Any]] = {}
+
+    def resolve(self, context: dict[str, Any]) -> dict[str, Any]:
+        key = json.dumps(context, sort_keys=True)
+        if key not in self._resolved:
+            self._resolved[key] = resolve_context(context, template_dir=self.template)[
+                "cookiecutter"
+            ]
+        return self._resolved[key]
+
+    def filter(self, contexts: Sequence[dict[str, Any]]) -> list[dict[str, Any]]:
+        """The contexts that are affected, leaving out equivalent ones"""
+        selected = self.impact.select([self.resolve(c) for c in contexts])
+        return [c for c in contexts if any(self.resolve(c) is s for s in selected)]
+
+    def _contexts(self, item: Item) -> Optional[list[dict[str, Any]]]:
+        contexts: list[dict[str, Any]] = []
+        for marker in item.iter_markers("bake_context"):
+            contexts.extend(marker.args)
+        callspec = getattr(item, "callspec", None)
+        if callspec is not None and isinstance(callspec.params.get("context"), dict):
+            contexts.append(callspec.params["context"])
+        return contexts or None
+
+    def deselect(self, items: list[Item]) -> tuple[list[Item], list[Item]]:
+        """Split the items into the selected and the deselected ones"""
+        changed_tests = {
+            os.path.join(self.template, path)
+            for path in self.changed
+            if path.startswith("tests/")
+        }
+        test_modules = {str(item.path) for item in items}
+        if self.impact.everything or changed_tests - test_modules:
+            # A helper or conftest.py changed, any test could be affected.
+            return items, []
+
+        selected: list[Item] = []
+        deselected: list[Item] = []
+        seen: dict[str, set[tuple[Any, ...]]] = {}
+        for item in items:
+            contexts = self._contexts(item)
+            if str(item.path) in changed_tests or contexts is None:
+                selected.append(item)
+                continue
+
+            affected = self.filter(contexts)
+            keys = [self.impact.key(self.resolve(c)) for c in affected]
+            # Parameters of the same test function baking equivalent contexts.
+            function_keys = seen.setdefault(item.nodeid.split("[")[0], set())
+            if not affected or all(
+                key is not None and key in function_keys for key in keys
+            ):
+                deselected.append(item)
+            else:
+                function_keys.update(key for key in keys if key is not None)
+                selected.append(item)
+        return selected, deselected
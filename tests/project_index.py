@@ -0,0 +1,171 @@
+# coding: utf-8
+"""
+Parse a baked project once into an index of its files and the settings the
+tests look at, so assertions are dictionary lookups instead of rescanning the
+lines of the same files test after test.
+"""
+
+import ast
+import configparser
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, ContextManager, Iterator, Optional
+
+import yaml
+from bakery.generate import Renderer
+from helper_functions import bake_in_memory, bake_in_tmpfs
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+
+@dataclass(frozen=True)
+class ProjectIndex:
+    """The parsed files of a baked project, empty for the missing ones"""
+
+    slug: str
+    # Paths relative to the project, with forward slashes, of every file and
+    # directory.
+    files: frozenset[str]
+    pipfile: dict[str, Any]
+    pyproject: dict[str, Any]
+    # The keyword arguments of setup(), as values when they are literals and as
+    # their source code otherwise.
+    setup: dict[str, Any]
+    mypy: dict[str, dict[str, str]]
+    # The literal module level assignments of docs/source/conf.py.
+    sphinx: dict[str, Any]
+    mkdocs: dict[str, Any]
+
+    @property
+    def sphinx_extensions(self) -> frozenset[str]:
+        return frozenset(self.sphinx.get("extensions", []))
+
+    @property
+    def mkdocs_plugins(self) -> frozenset[str]:
+        return _names(self.mkdocs.get("plugins"))
+
+    @property
+    def markdown_extensions(self) -> frozenset[str]:
+        return _names(self.mkdocs.get("markdown_extensions"))
+
+
+def _names(entries: Optional[list[Any]]) -> frozenset[str]:
+    # MkDocs entries are either a name, or a mapping of a name to its options.
+    names: set[str] = set()
+    for entry in entries or []:
+        names.update([entry] if isinstance(entry, str) else entry)
+    return frozenset(names)
+
+
+def _walk(path: Any, prefix: str = "") -> Iterator[str]:
+    for child in path.listdir():
+        relative = prefix + child.basename
+        yield relative
+        if child.isdir():
+            yield from _walk(child, relative + "/")
+
+
+def _literal(node: ast.expr) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return ast.unparse(node)
+
+
+def parse_setup(source: str) -> dict[str, Any]:
+    """Keyword arguments of the setup() call of a setup.py"""
+    for node in ast.walk(ast.parse(source)):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id == "setup"
+        ):
+            return {kw.arg: _literal(kw.value) for kw in node.keywords if kw.arg}
+    return {}
+
+
+def parse_assignments(source: str) -> dict[str, Any]:
+    """The module level assignments of a Python file whose values are literals"""
+    values: dict[str, Any] = {}
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Assign):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                continue
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    values[target.id] = value
+    return values
+
+
+def parse_ini(source: str) -> dict[str, dict[str, str]]:
+    """The sections of an ini file, such as mypy.ini, as dictionaries"""
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read_string(source)
+    return {section: dict(parser[section]) for section in parser.sections()}
+
+
+def index_project(project: Any) -> ProjectIndex:
+    """
+    Parse a baked project
+    :param project: The project directory, either a py.path.local or a
+        bakery.tree.MemoryPath.
+    """
+    files = frozenset(_walk(project))
+
+    def read(path: str) -> Optional[str]:
+        return project.join(*path.split("/")).read() if path in files else None
+
+    pipfile, pyproject, setup, mypy, conf, mkdocs = (
+        read(path)
+        for path in (
+            "Pipfile",
+            "pyproject.toml",
+            "setup.py",
+            "mypy.ini",
+            "docs/source/conf.py",
+            "docs/mkdocs.yml",
+        )
+    )
+    return ProjectIndex(
+        slug=project.basename,
+        files=files,
+        pipfile=tomllib.loads(pipfile) if pipfile else {},
+        pyproject=tomllib.loads(pyproject) if pyproject else {},
+        setup=parse_setup(setup) if setup else {},
+        mypy=parse_ini(mypy) if mypy else {},
+        sphinx=parse_assignments(conf) if conf else {},
+        mkdocs=yaml.safe_load(mkdocs) if mkdocs else {},
+    )
+
+
+class ProjectIndexes:
+    """
+    Index of the project of every context, baked and parsed the first time a
+    context is asked for and shared from then on
+    """
+
+    def __init__(self, renderer: Renderer, target: str = "memory") -> None:
+        """
+        :param renderer: bakery.generate.Renderer, rendering the template.
+        :param target: Where to bake into, "memory" or a tmpfs otherwise.
+        """
+        self._bake: Callable[..., ContextManager[Any]] = (
+            bake_in_memory if target == "memory" else bake_in_tmpfs
+        )
+        self._renderer = renderer
+        self._indexes: dict[str, ProjectIndex] = {}
+
+    def __call__(self, extra_context: Optional[dict[str, Any]] = None) -> ProjectIndex:
+        key = json.dumps(extra_context or {}, sort_keys=True)
+        if key not in self._indexes:
+            with self._bake(self._renderer, extra_context) as result:
+                if result.exception is not None:
+                    raise result.exception
+                self._indexes[key] = index_project(result.project)
+        return self._indexes[key]
@@ -0,0 +1,164 @@
+# coding: utf-8
+"""
+Run commands in many baked projects at once without touching the working
+directory of the test process: every command gets its own cwd, its output goes
+to its own log file, and asyncio keeps at most a given number of them running.
+"""
+
+import asyncio
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractAsyncContextManager, nullcontext
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class Command:
+    """A command line to run inside a project directory"""
+
+    command: str
+    cwd: str
+    log_path: str
+    env: Optional[dict[str, str]] = None
+    # Seconds after which the command and its children are killed.
+    timeout: Optional[float] = None
+    # Commands sharing a lock never run at the same time, e.g. because they
+    # install into the same virtual environment.
+    lock: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CommandResult:
+    """Outcome of a Command"""
+
+    command: Command
+    # None when the command was killed because of its timeout.
+    exit_code: Optional[int]
+    duration: float
+    # Peak resident set size in bytes of the command or any of its children,
+    # None where the platform cannot tell.
+    peak_rss: Optional[int]
+
+    @property
+    def timed_out(self) -> bool:
+        return self.exit_code is None
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0
+
+    def log(self) -> str:
+        with open(self.command.log_path, errors="replace") as log_file:
+            return log_file.read()
+
+    def __str__(self) -> str:
+        status = "timed out" if self.timed_out else f"exited with {self.exit_code}"
+        return (
+            f"`{self.command.command}` in {self.command.cwd} {status} after "
+            f"{self.duration:.1f}s, see {self.command.log_path}"
+        )
+
+
+def _wait(process: "subprocess.Popen[bytes]") -> tuple[int, Optional[int]]:
+    # Reaping the process ourselves is the only way to get its resource usage.
+    if not hasattr(os, "wait4"):
+        return process.wait(), None
+
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kibibytes, except on macOS where it is in bytes.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return process.returncode, usage.ru_maxrss * scale
+
+
+def _kill(process: "subprocess.Popen[bytes]") -> None:
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+class Runner:
+    """Runs Commands concurrently, at most max_concurrency at a time"""
+
+    def __init__(self, max_concurrency: Optional[int] = None) -> None:
+        """
+        :param max_concurrency: Number of commands running at once, defaults to
+            the CPU count.
+        """
+        self.max_concurrency: int = max_concurrency or os.cpu_count() or 1
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, command: Command) -> CommandResult:
+        """Run a single command, waiting for its turn"""
+        lock: AbstractAsyncContextManager[Any] = (
+            self._locks.setdefault(command.lock, asyncio.Lock())
+            if command.lock
+            else nullcontext()
+        )
+        async with lock, self._semaphore:
+            return await self._run(command)
+
+    async def _run(self, command: Command) -> CommandResult:
+        loop = asyncio.get_running_loop()
+        os.makedirs(os.path.dirname(os.path.abspath(command.log_path)), exist_ok=True)
+        with open(command.log_path, "wb") as log_file:
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                shlex.split(command.command),
+                cwd=command.cwd,
+                env=command.env,
+                stdin=subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                # A process group of its own, so a timeout kills its children.
+                start_new_session=True,
+            )
+
+        waiter = loop.run_in_executor(self._executor, _wait, process)
+        exit_code: Optional[int]
+        try:
+            exit_code, peak_rss = await asyncio.wait_for(
+                asyncio.shield(waiter), command.timeout
+            )
+        except asyncio.TimeoutError:
+            _kill(process)
+            _, peak_rss = await waiter
+            exit_code = None
+
+        return CommandResult(
+            command=command,
+            exit_code=exit_code,
+            duration=time.perf_counter() - start,
+            peak_rss=peak_rss,
+        )
+
+    async def run_all(self, commands: Sequence[Command]) -> list[CommandResult]:
+        """Run every command, returning the results in input order"""
+        # One waiting thread per running command.
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            self._executor = executor
+            return list(await asyncio.gather(*map(self.run, commands)))
+
+
+def run_commands(
+    commands: Sequence[Command], max_concurrency: Optional[int] = None
+) -> list[CommandResult]:
+    """
+    Run commands concurrently from synchronous code, see Runner
+    :param commands: The commands to run.
+    :param max_concurrency: Number of commands running at once, defaults to
+        the CPU count.
+    """
+    return asyncio.run(Runner(max_concurrency).run_all(commands))
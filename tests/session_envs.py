@@ -0,0 +1,188 @@
+# coding: utf-8
+"""
+Wheelhouse and virtual environments shared by the nox and tox runs of the slow
+tests, so every baked project installs its dependencies from local wheels into
+an environment an earlier project already populated instead of building a new
+one from the package index.
+"""
+
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+# Always needed: the environments are seeded with these. The build backend of
+# the project comes from its pyproject.toml, see build_system_requirements.
+BUILD_REQUIREMENTS: tuple[str, ...] = ("pip", "setuptools", "wheel")
+
+# Interpreters the sessions install into besides the one running the tests,
+# which nox and the other tox environments use: tox runs the py310 and docs
+# environments with python3.10. Wheels are built with each of them, for the
+# packages without a pure Python wheel to install offline everywhere.
+SESSION_PYTHONS: tuple[str, ...] = ("python3.10",)
+
+# The cookiecutter variables changing what the Pipfile, noxfile.py or tox.ini of
+# a project installs. Projects agreeing on all of them share environments.
+DEPENDENCY_OPTIONS: tuple[str, ...] = (
+    "test_automation_tool",
+    "documentation_framework",
+    "command_line_interface",
+    "have_tests",
+    "have_benchmarks",
+    "parallel_tests",
+)
+
+
+def pipfile_requirements(pipfile: dict[str, Any]) -> set[str]:
+    """The packages and dev-packages of a parsed Pipfile as requirement strings"""
+    requirements: set[str] = set()
+    for section in ("packages", "dev-packages"):
+        for name, version in pipfile.get(section, {}).items():
+            if isinstance(version, str):
+                requirements.add(name if version == "*" else name + version)
+    return requirements
+
+
+def build_system_requirements(pyproject: dict[str, Any]) -> set[str]:
+    """
+    The [build-system] requires of a parsed pyproject.toml, which tox installs
+    to build the project before installing it
+    """
+    return set(pyproject.get("build-system", {}).get("requires", []))
+
+
+def runs(python: str) -> bool:
+    """Whether an interpreter runs, which a pyenv shim of another version won't"""
+    try:
+        return subprocess.run([python, "-c", ""], capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+
+def session_pythons() -> list[str]:
+    """
+    Paths of the interpreters to build wheels with: the one running the tests,
+    and those of SESSION_PYTHONS installed, the others being skipped like tox
+    skips missing interpreters
+    """
+    found = (shutil.which(python) for python in SESSION_PYTHONS)
+    pythons = [sys.executable] + [python for python in found if python and runs(python)]
+    return list(dict.fromkeys(pythons))
+
+
+def build_wheelhouse(
+    directory: str, requirements: Iterable[str], pythons: Iterable[str] = ()
+) -> str:
+    """
+    Build wheels of the requirements and all their dependencies into a
+    directory, unless it already holds the wheels of the same requirements
+    :param directory: String, path of the wheelhouse.
+    :param requirements: The requirement strings to build wheels of.
+    :param pythons: Paths of the interpreters to build the wheels with, by
+        default session_pythons.
+    """
+    pythons = list(pythons) or session_pythons()
+    wanted = "\n".join(sorted(set(requirements).union(BUILD_REQUIREMENTS))) + "\n"
+    # The interpreters are part of the stamp, for a new one to get its wheels.
+    stamp_text = wanted + "".join(f"# {python}\n" for python in pythons)
+    stamp = os.path.join(directory, "requirements.txt")
+    try:
+        with open(stamp) as f:
+            if f.read() == stamp_text:
+                return directory
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(directory, exist_ok=True)
+    for python in pythons:
+        # Every interpreter builds the wheels matching its own ABI, and finds
+        # the pure Python ones the previous ones built already there.
+        subprocess.check_call(
+            [python, "-m", "pip", "wheel", "--quiet", "--wheel-dir", directory]
+            + ["--find-links", directory]
+            + wanted.split()
+        )
+    # Written last, so an interrupted build is retried by the next session.
+    with open(stamp, "w") as f:
+        f.write(stamp_text)
+    return directory
+
+
+@dataclass(frozen=True)
+class SessionEnvironments:
+    """
+    Runs nox and tox offline against a wheelhouse, reusing one set of
+    environments across every baked project with the same dependencies
+    """
+
+    wheelhouse: str
+    envs_dir: str
+    # The values of DEPENDENCY_OPTIONS in cookiecutter.json, for the contexts
+    # leaving some of them out.
+    defaults: dict[str, str]
+
+    @property
+    def environ(self) -> dict[str, str]:
+        """Environment variables making pip install from the wheelhouse only"""
+        return dict(
+            os.environ,
+            PIP_NO_INDEX="1",
+            PIP_FIND_LINKS=self.wheelhouse,
+            PIP_DISABLE_PIP_VERSION_CHECK="1",
+        )
+
+    def envs_dir_of(self, tool: str, context: dict[str, str]) -> str:
+        """
+        Directory of the environments nox or tox uses for a project. They are
+        shared between projects with the same values of DEPENDENCY_OPTIONS,
+        since each of them changes the packages some session installs.
+        """
+        values = [
+            context.get(option, self.defaults[option])
+            for option in DEPENDENCY_OPTIONS
+            if option != "test_automation_tool"
+        ]
+        return os.path.join(self.envs_dir, "-".join([tool.lower()] + values))
+
+    def command(self, tool: str, args: str, context: dict[str, str]) -> str:
+        """
+        Command line running nox or tox in one of the shared environments
+        :param tool: "Nox" or "Tox", the test_automation_tool of the project.
+        :param args: The arguments selecting the sessions or environments.
+        :param context: The context of the project, see envs_dir_of.
+        """
+        envs_dir = shlex.quote(self.envs_dir_of(tool, context))
+        if tool == "Nox":
+            options = f"--reuse-existing-virtualenvs --envdir {envs_dir}"
+        else:
+            options = f"--workdir {envs_dir}"
+        return f"{tool.lower()} {options} {args}"
+
+
+def session_environments(
+    root: str,
+    defaults: dict[str, str],
+    pipfiles: Iterable[dict[str, Any]],
+    pyprojects: Iterable[dict[str, Any]] = (),
+) -> SessionEnvironments:
+    """
+    Build the wheelhouse for the requirements of some parsed Pipfiles, and the
+    build requirements of some parsed pyproject.toml files
+    :param root: String, directory keeping the wheelhouse and environments.
+    :param defaults: The default value of every DEPENDENCY_OPTIONS.
+    :param pipfiles: The Pipfiles of the projects the sessions will run in.
+    :param pyprojects: The pyproject.toml files of the same projects.
+    """
+    requirements: set[str] = set()
+    for pipfile in pipfiles:
+        requirements |= pipfile_requirements(pipfile)
+    for pyproject in pyprojects:
+        requirements |= build_system_requirements(pyproject)
+    return SessionEnvironments(
+        wheelhouse=build_wheelhouse(os.path.join(root, "wheelhouse"), requirements),
+        envs_dir=os.path.join(root, "envs"),
+        defaults=defaults,
+    )
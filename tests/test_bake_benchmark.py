@@ -0,0 +1,77 @@
+# coding: utf-8
+import json
+import os
+from typing import Any, Optional
+
+from _pytest.capture import CaptureFixture
+from bake_benchmark import BakeStats, regressions, summarize, time_bakes
+from bake_matrix import get_choices
+from bakery.generate import Renderer
+from bakery.timing import Timings
+from helper_functions import get_all_possble_combinations
+from pytest import FixtureRequest, mark, skip
+
+DEFAULT_ROUNDS: int = 5
+
+
+def option_combinations(template: str) -> list[dict[str, Any]]:
+    """
+    Enough combinations of the choice and yes/no variables of cookiecutter.json
+    to cover every pair of their values. The full product doubles with every
+    yes/no variable.
+    """
+    with open(os.path.join(template, "cookiecutter.json"), 'r') as context_file:
+        defaults: dict[str, Any] = json.load(context_file)
+    axes: list[str] = [
+        key
+        for key, value in defaults.items()
+        if not key.startswith("_") and (isinstance(value, list) or value in ("y", "n"))
+    ]
+    return get_all_possble_combinations(get_choices(template, axes), strength=2)
+
+
+@mark.benchmark
+def test_bake_latency(
+    request: FixtureRequest, renderer: Renderer, capsys: CaptureFixture[str]
+) -> None:
+    options = request.config.option
+    if options.benchmark_rounds is None and not options.benchmark_save:
+        skip("a benchmark, run it with --benchmark-rounds or --benchmark-save")
+    rounds: int = options.benchmark_rounds or DEFAULT_ROUNDS
+    contexts: list[dict[str, Any]] = option_combinations(options.template)
+    timings: list[Timings] = time_bakes(renderer, contexts, rounds)
+    current: BakeStats = summarize(timings)
+
+    baseline: Optional[BakeStats] = None
+    if options.benchmark_save:
+        with open(options.benchmark_baseline, 'w') as baseline_file:
+            baseline_file.write(current.to_json())
+    elif os.path.exists(options.benchmark_baseline):
+        with open(options.benchmark_baseline, 'r') as baseline_file:
+            baseline = BakeStats.from_json(baseline_file.read())
+
+    with capsys.disabled():
+        print(f"\nBaked {len(contexts)} option combinations, {current}")
+        if baseline is not None:
+            print(f"Baseline {baseline}")
+
+    found: list[str] = regressions(current, baseline, options.benchmark_threshold)
+    assert not found, "\n".join(found)
+
+
+def test_regressions_compare_median_and_p95() -> None:
+    phases: dict[str, float] = {"render": 0.001}
+    baseline = BakeStats(bakes=10, median=0.010, p95=0.020, phases=phases)
+
+    assert regressions(baseline, None, 0.25) == []
+    assert (
+        regressions(
+            BakeStats(bakes=10, median=0.012, p95=0.024, phases=phases), baseline, 0.25
+        )
+        == []
+    )
+    (found,) = regressions(
+        BakeStats(bakes=10, median=0.011, p95=0.030, phases=phases), baseline, 0.25
+    )
+    assert found.startswith("p95 bake time regressed")
+    assert BakeStats.from_json(baseline.to_json()) == baseline
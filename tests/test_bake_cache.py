@@ -0,0 +1,46 @@
+# coding: utf-8
+import os
+from pathlib import Path
+
+import bake_cache
+from bake_cache import BakeCache
+from pytest import FixtureRequest, MonkeyPatch
+from pytest_cookies.plugin import Cookies
+
+
+def make_cache(request: FixtureRequest, root: Path) -> BakeCache:
+    return BakeCache(
+        root=str(root / "cache"),
+        template=request.config.option.template,
+        checkout_root=str(root),
+        max_bytes=64 * 1024 * 1024,
+    )
+
+
+def test_bake_cache_hits_are_copies(
+    request: FixtureRequest, cookies: Cookies, tmp_path: Path
+) -> None:
+    cache = make_cache(request, tmp_path)
+    cache.bake(cookies, {"project_name": "Cached"})
+    hit = cache.bake(cookies, {"project_name": "Cached"})
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    setup = hit.project_path / "setup.py"
+    os.chmod(setup, 0o644)
+    setup.write_text("edited\n")
+
+    again = cache.bake(cookies, {"project_name": "Cached"})
+    assert cache.hits == 2
+    assert (again.project_path / "setup.py").read_text() != "edited\n"
+
+
+def test_bake_cache_key_follows_the_template_commit(
+    request: FixtureRequest, tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    keys: set[str] = set()
+    for commit, dirty in (("a" * 40, False), ("b" * 40, False), ("b" * 40, True)):
+        monkeypatch.setattr(bake_cache, "template_commit", lambda _: commit)
+        monkeypatch.setattr(bake_cache, "template_dirty", lambda _: dirty)
+        keys.add(make_cache(request, tmp_path).key({}))
+
+    assert len(keys) == 3
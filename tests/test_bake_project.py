@@ -6,54 +6,82 @@ import subprocess
 import sys
 from contextlib import contextmanager
 from types import ModuleType
-from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from _pytest.capture import CaptureFixture
 
 # import yaml
 from click.testing import CliRunner
+from bake_matrix import MatrixResult, bake_matrix, get_choices, get_defaults
 from helper_functions import (
+    CoveringArray,
     bake_in_temp_dir,
     check_output_inside_dir,
     get_all_possble_combinations,
     get_cli,
-    project_info,
-    run_inside_dir,
+    get_covering_array,
 )
 from hypothesis import example, given
 from hypothesis import strategies as st
 from _pytest._py.path import LocalPath  # Decprecated(?): replace with pathlib later.
-from pytest import mark, raises
+from pytest import FixtureRequest, TempPathFactory, mark, raises
 from pytest_cookies.plugin import Cookies, Result
+from project_index import ProjectIndex, ProjectIndexes, index_project
+from runner import Command, CommandResult, run_commands
+from session_envs import (
+    DEPENDENCY_OPTIONS,
+    SessionEnvironments,
+    build_system_requirements,
+    pipfile_requirements,
+)
+
+# Tests that only read the rendered files bake through the bake fixture, which
+# renders into memory unless --bake-target says otherwise.
+Bake = Callable[..., ContextManager[Any]]
+
+
+def listdir(path: Any) -> list[str]:
+    """Names in a directory of a baked project, on disk or in memory"""
+    return [f.basename for f in path.listdir()]
 
 
-def test_year_compute_in_license_file(cookies: Cookies) -> None:
-    with bake_in_temp_dir(cookies) as result:
-        license_file_path: LocalPath = result.project.join("LICENSE")
+@mark.bake_context({})
+def test_year_compute_in_license_file(bake: Bake) -> None:
+    with bake() as result:
         now: datetime.datetime = datetime.datetime.now()
-        assert str(now.year) in license_file_path.read()  # type: ignore[no-untyped-call]
+        assert str(now.year) in result.project.join("LICENSE").read()
 
 
-def test_bake_with_defaults(cookies: Cookies) -> None:
-    with bake_in_temp_dir(cookies) as result:
+@mark.bake_context({})
+def test_bake_with_defaults(bake: Bake) -> None:
+    with bake() as result:
         assert result.project.isdir()
         assert result.exit_code == 0
         assert result.exception is None
 
-        found_toplevel_files = [f.basename for f in result.project.listdir()]
+        found_toplevel_files = listdir(result.project)
         assert "setup.py" in found_toplevel_files
         assert "noxfile.py" in found_toplevel_files
         assert "docs" in found_toplevel_files
         assert "src" in found_toplevel_files
         assert "tests" in found_toplevel_files
-        assert "my_python_package" in os.listdir(
-            os.path.join(str(result.project), "src")
-        )
+        assert "my_python_package" in listdir(result.project.join("src"))
 
 
-def test_bake_without_author_file(cookies: Cookies) -> None:
-    with bake_in_temp_dir(cookies, extra_context={"create_author_file": "n"}) as result:
-        found_toplevel_files = [f.basename for f in result.project.listdir()]
+@mark.bake_context({"create_author_file": "n"})
+def test_bake_without_author_file(bake: Bake) -> None:
+    with bake({"create_author_file": "n"}) as result:
+        found_toplevel_files = listdir(result.project)
         assert "AUTHORS.rst" not in found_toplevel_files
         # doc_files = [f.basename for f in result.project.join('docs').listdir()]
         # assert 'authors.rst' not in doc_files
@@ -84,25 +112,20 @@ def test_bake_without_author_file(cookies: Cookies) -> None:
         ("Apache 2.0 License", "Licensed under the Apache License, Version 2.0"),
     ],
 )
-def test_bake_selecting_license(
-    cookies: Cookies, license_info: Tuple[str, str]
-) -> None:
+def test_bake_selecting_license(bake: Bake, license_info: Tuple[str, str]) -> None:
     license: str
     target_string: str
-    result: Result
 
     license, target_string = license_info
-    with bake_in_temp_dir(cookies, extra_context={"license": license}) as result:
+    with bake({"license": license}) as result:
         assert target_string in result.project.join("LICENSE").read()
         assert license in result.project.join("setup.py").read()
 
 
-def test_bake_other_license(cookies: Cookies) -> None:
-    result: Result
-    with bake_in_temp_dir(cookies, extra_context={"license": "Other"}) as result:
-        found_toplevel_files: Iterable[str] = [
-            f.basename for f in result.project.listdir()
-        ]
+@mark.bake_context({"license": "Other"})
+def test_bake_other_license(bake: Bake) -> None:
+    with bake({"license": "Other"}) as result:
+        found_toplevel_files: Iterable[str] = listdir(result.project)
         assert "setup.py" in found_toplevel_files
         assert "LICENSE" not in found_toplevel_files
         assert "License" not in result.project.join("README.markdown").read()
@@ -113,22 +136,34 @@ def test_bake_other_license(cookies: Cookies) -> None:
     [
         ({"command_line_interface": "Click"}, True),
         ({"command_line_interface": "Argparse"}, True),
+        ({"command_line_interface": "Asyncio"}, True),
         ({"command_line_interface": "None"}, False),
     ],
 )
-def test_bake_cli(cookies: Cookies, args: Tuple[Dict[str, str], bool]) -> None:
+def test_bake_cli(
+    project_index: ProjectIndexes, args: Tuple[Dict[str, str], bool]
+) -> None:
     context: Dict[str, str]
     is_present: bool
     context, is_present = args
 
-    result: Result = cookies.bake(extra_context=context)
-    project_path, _, project_dir = project_info(result)
-    found_project_files: Iterable[str] = os.listdir(project_dir)
-    assert ("cli.py" in found_project_files) == is_present
-
-    setup_path: str = os.path.join(project_path, 'setup.py')
-    with open(setup_path, 'r') as setup_file:
-        assert ("entry_points" in setup_file.read()) == is_present
+    project: ProjectIndex = project_index(context)
+    assert (f"src/{project.slug}/cli.py" in project.files) == is_present
+    assert (f"src/{project.slug}/commands/echo.py" in project.files) == is_present
+    assert ("tests/test_cli.py" in project.files) == is_present
+    assert (f"src/{project.slug}/profiling.py" in project.files) == is_present
+    assert ("tests/test_profiling.py" in project.files) == is_present
+    assert (f"src/{project.slug}/streams.py" in project.files) == is_present
+    assert (f"src/{project.slug}/commands/stream.py" in project.files) == is_present
+    assert ("tests/test_streams.py" in project.files) == is_present
+    assert (f"src/{project.slug}/mapped.py" in project.files) == is_present
+    assert ("tests/test_mapped.py" in project.files) == is_present
+    assert ("entry_points" in project.setup) == is_present
+
+    is_async: bool = context["command_line_interface"] == "Asyncio"
+    assert (f"src/{project.slug}/tasks.py" in project.files) == is_async
+    assert (f"src/{project.slug}/commands/run.py" in project.files) == is_async
+    assert ("tests/test_tasks.py" in project.files) == is_async
 
 
 @mark.hypothesis
@@ -140,6 +175,10 @@ def test_run_click_cli(cookies: Cookies) -> None:
     help_result = runner.invoke(cli.main, ["--help"])
     assert help_result.exit_code == 0
     assert "Show this message" in help_result.output
+    # Listed from the registry, the command module is not even importable here.
+    assert "  echo    Print the arguments." in help_result.output
+    assert "  stream  Stream files or stdin to stdout." in help_result.output
+    assert "--profile FILE" in help_result.output
 
     # @given(st.lists(st.text(alphabet=st.from_regex("^[^-]{1,2}.*", fullmatch=True))))
     # @example([])
@@ -158,7 +197,11 @@ def test_run_argparse_cli(cookies: Cookies, capsys: CaptureFixture[str]) -> None
 
     with raises(SystemExit):
         cli.main(["--help"])
-    assert "show this help message" in capsys.readouterr().out
+    help_output = capsys.readouterr().out
+    assert "show this help message" in help_output
+    assert "Print the arguments." in help_output
+    assert "Stream files or stdin to stdout." in help_output
+    assert "--trace-malloc N" in help_output
 
     # # TODO: Figure out why this is not working
     # @given(st.lists(st.text(alphabet=st.from_regex("^[^-]{1,2}.*", fullmatch=True))))
@@ -171,229 +214,529 @@ def test_run_argparse_cli(cookies: Cookies, capsys: CaptureFixture[str]) -> None
     # helper_args_cli()
 
 
-def test_bake_sphinx(cookies: Cookies) -> None:
-    result: Result
+def test_run_asyncio_cli(cookies: Cookies, capsys: CaptureFixture[str]) -> None:
+    cli: ModuleType = get_cli(cookies, {"command_line_interface": "Asyncio"})
+
+    with raises(SystemExit):
+        cli.main(["--help"])
+    help_output = capsys.readouterr().out
+    assert "Print the arguments." in help_output
+    assert "Run commands concurrently." in help_output
+    assert "--trace-malloc N" in help_output
+
+
+@mark.parametrize("cli", ["Click", "Argparse", "Asyncio"])
+def test_startup_budget(cookies: Cookies, cli: str) -> None:
     with bake_in_temp_dir(
-        cookies, extra_context={"documentation_framework": "Sphinx"}
+        cookies, extra_context={"command_line_interface": cli}
     ) as result:
-        project_path: str = project_info(result)[0]
-        root_files: Iterable[str] = os.listdir(project_path)
+        project_path: str = str(result.project_path)
+        env: Dict[str, str] = dict(os.environ, PYTHONPATH="src")
+        command: str = f"{sys.executable} scripts/startup_budget.py"
+        pyproject = result.project_path / "pyproject.toml"
+        config: str = pyproject.read_text()
+        assert "budget_ms = 150" in config
+        assert "runs = 10" in config
+
+        # Budgets nothing could miss, or meet, so the machine makes no difference.
+        def run_with_budget(budget_ms: str) -> "subprocess.CompletedProcess[str]":
+            pyproject.write_text(
+                config.replace("budget_ms = 150", f"budget_ms = {budget_ms}")
+                .replace("runs = 10", "runs = 1")
+                .replace("top = 15", "top = 1000")
+            )
+            return subprocess.run(
+                shlex.split(command),
+                cwd=project_path,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
 
-        assert "Pipfile" in root_files
-        with open(os.path.join(project_path, "Pipfile"), 'r') as pipfile:
-            lines: Iterable[str] = pipfile.read().splitlines()
-            assert 'mkdocs = "*"' not in lines
+        within_budget = run_with_budget("1e9")
+        assert within_budget.returncode == 0, within_budget.stderr
+        report: list[str] = within_budget.stdout.splitlines()
+        assert report[0].startswith("Median import time over 1 runs")
+        modules: list[str] = [line.split()[-1] for line in report[2:-1]]
+        assert f"{result.project_path.name}.cli" in modules
+        # The commands are only imported once they run, not for --help.
+        assert not [module for module in modules if ".commands." in module]
+        assert report[-1].endswith("ms of a 1000000000.000ms budget")
 
-            assert 'sphinx = ">=3.0"' in lines
-            assert 'sphinx-rtd-theme = "*"' in lines
+        over_budget = run_with_budget("0.001")
+        assert over_budget.returncode == 1
+        assert "Over budget" in over_budget.stderr
 
-        assert "docs" in root_files
-        assert "source" in os.listdir(os.path.join(project_path, "docs"))
-        docs_source_dir_name: str = os.path.join(project_path, "docs", "source")
-        docs_source_dir: Iterable[str] = os.listdir(docs_source_dir_name)
 
-        assert "index.rst" in docs_source_dir
-        assert "index.markdown" not in docs_source_dir
+@mark.bake_context({"documentation_framework": "Sphinx"})
+def test_bake_sphinx(project_index: ProjectIndexes) -> None:
+    project: ProjectIndex = project_index({"documentation_framework": "Sphinx"})
 
-        assert "conf.py" in docs_source_dir
-        with open(os.path.join(docs_source_dir_name, "conf.py"), 'r') as docs_setup:
-            lines = docs_setup.read().splitlines()
+    assert "Pipfile" in project.files
+    dev_packages: Dict[str, Any] = project.pipfile["dev-packages"]
+    assert "mkdocs" not in dev_packages
 
-            for extension in ["autodoc", "coverage", "viewcode", "napoleon"]:
-                assert next((s for s in lines if extension in s), None)
+    assert dev_packages["sphinx"] == ">=3.0"
+    assert dev_packages["sphinx-rtd-theme"] == "*"
 
-            rtd_theme_init_line: Optional[str] = next(
-                (s for s in lines if "sphinx_rtd_theme" in s), None
-            )
-            assert rtd_theme_init_line is not None
+    assert "docs/source" in project.files
+    assert "docs/source/index.rst" in project.files
+    assert "docs/source/index.markdown" not in project.files
 
-            rtd_theme_set_line: str = 'html_theme = "sphinx_rtd_theme"'
-            assert rtd_theme_init_line != rtd_theme_set_line
-            assert rtd_theme_set_line in lines
+    assert "docs/source/conf.py" in project.files
+    for extension in ["autodoc", "coverage", "viewcode", "napoleon"]:
+        assert f"sphinx.ext.{extension}" in project.sphinx_extensions
 
+    assert "sphinx_rtd_theme" in project.sphinx_extensions
+    assert project.sphinx["html_theme"] == "sphinx_rtd_theme"
 
-def test_bake_mkdocs(cookies: Cookies) -> None:
-    result: Result
-    with bake_in_temp_dir(
-        cookies, extra_context={"documentation_framework": "MkDocs"}
-    ) as result:
-        project_path: str = project_info(result)[0]
-        root_files: Iterable[str] = os.listdir(project_path)
 
-        assert "Pipfile" in root_files
-        with open(os.path.join(project_path, "Pipfile"), 'r') as pipfile:
-            lines: Iterable[str] = pipfile.read().splitlines()
+@mark.bake_context({"documentation_framework": "MkDocs"})
+def test_bake_mkdocs(project_index: ProjectIndexes) -> None:
+    project: ProjectIndex = project_index({"documentation_framework": "MkDocs"})
 
-            assert 'sphinx = ">=3.0"' not in lines
+    assert "Pipfile" in project.files
+    dev_packages: Dict[str, Any] = project.pipfile["dev-packages"]
 
-            assert 'mkdocs-awesome-pages-plugin = "*"' in lines
-            assert 'mkdocs = "*"' in lines
-            assert 'mkdocs-material = "*"' in lines
-            assert 'mkdocs-minify-plugin = "*"' in lines
-            assert 'Pygments = "*"' in lines
+    assert "sphinx" not in dev_packages
 
-        assert "docs" in root_files
+    assert dev_packages["mkdocs-awesome-pages-plugin"] == "*"
+    assert dev_packages["mkdocs"] == "*"
+    assert dev_packages["mkdocs-material"] == "*"
+    assert dev_packages["mkdocs-minify-plugin"] == "*"
+    assert dev_packages["Pygments"] == "*"
 
-        docs_dir_name: str = os.path.join(project_path, "docs")
-        docs_dir: Iterable[str] = os.listdir(docs_dir_name)
+    assert "docs/mkdocs.yml" in project.files
+    for plugin in ["search", "minify", "awesome-pages"]:
+        assert plugin in project.mkdocs_plugins
+    assert "codehilite" in project.markdown_extensions
 
-        assert "mkdocs.yml" in docs_dir
-        with open(os.path.join(docs_dir_name, "mkdocs.yml"), 'r') as docs_setup:
-            lines = docs_setup.read().splitlines()
+    assert "docs/source" in project.files
+    assert "docs/source/conf.py" not in project.files
+    assert "docs/source/index.rst" not in project.files
+    assert "docs/source/index.markdown" in project.files
 
-            for plugin in ["search", "minify", "awesome-pages", "codehilite"]:
-                assert next((s for s in lines if plugin in s), None)
 
-        assert "source" in docs_dir
-        docs_source_dir: Iterable[str] = os.listdir(
-            os.path.join(docs_dir_name, "source")
-        )
+@mark.bake_context({"documentation_framework": "None"})
+def test_bake_no_docs(project_index: ProjectIndexes) -> None:
+    project: ProjectIndex = project_index({"documentation_framework": "None"})
 
-        assert "conf.py" not in docs_source_dir
-        assert "index.rst" not in docs_source_dir
-        assert "index.markdown" in docs_source_dir
+    assert "Pipfile" in project.files
+    dev_packages: Dict[str, Any] = project.pipfile["dev-packages"]
+    assert "mkdocs" not in dev_packages
+    assert "sphinx" not in dev_packages
 
+    assert "docs" not in project.files
 
-def test_bake_no_docs(cookies: Cookies) -> None:
-    result: Result
-    with bake_in_temp_dir(
-        cookies, extra_context={"documentation_framework": "None"}
-    ) as result:
-        project_path: str = project_info(result)[0]
-        root_files: Iterable[str] = os.listdir(project_path)
 
-        assert "Pipfile" in root_files
-        with open(os.path.join(project_path, "Pipfile"), 'r') as pipfile:
-            lines: Iterable[str] = pipfile.read().splitlines()
-            assert 'mkdocs = "*"' not in lines
-            assert 'sphinx = "*"' not in lines
+# Building the docs and running the tests is expensive, so the slow tests only
+# bake enough contexts to cover every pair of option values.
+DOCS_MATRIX: CoveringArray = get_covering_array(
+    {
+        # "full_name": ['name "quote" name', "O'connor"],
+        "documentation_framework": ["Sphinx", "MkDocs"],
+        "test_automation_tool": ["Nox", "Tox"],
+        "command_line_interface": ["Click", "Argparse", "Asyncio", "None"],
+        "license": ["MIT License", "Apache 2.0 License", "Other"],
+    }
+)
+TESTS_MATRIX: CoveringArray = get_covering_array(
+    {
+        "test_automation_tool": ["Nox", "Tox"],
+        "parallel_tests": ["y", "n"],
+        "have_parallel_map": ["y", "n"],
+        "have_cache": ["y", "n"],
+        "documentation_framework": ["Sphinx", "MkDocs", "None"],
+        "command_line_interface": ["Click", "Argparse", "Asyncio", "None"],
+        "license": ["MIT License", "Apache 2.0 License", "Other"],
+    }
+)
 
-        assert "docs" not in root_files
 
+@mark.parametrize("matrix", [DOCS_MATRIX, TESTS_MATRIX])
+def test_slow_matrices_cover_every_pair(matrix: CoveringArray) -> None:
+    assert matrix.strength == 2
+    assert matrix.coverage == 1.0, str(matrix)
 
-@mark.slow
-@mark.parametrize(
-    "context",
-    get_all_possble_combinations(
+    all_contexts = get_all_possble_combinations(
         {
-            # "full_name": ['name "quote" name', "O'connor"],
-            "documentation_framework": ["Sphinx", "MkDocs"],
-            "test_automation_tool": ["Nox", "Tox"],
+            key: sorted({c[key] for c in matrix.combinations})
+            for key in matrix.combinations[0]
         }
-    ),
-)
-def test_bake_and_generate_docs(cookies: Cookies, context: Dict[str, str]) -> None:
-    with bake_in_temp_dir(cookies, extra_context=context) as result:
-        assert result.project.isdir()
-        test_file_path = result.project.join("tests/test_my_python_package.py")
-        assert "import pytest" in test_file_path.read()
+    )
+    assert len(matrix.combinations) < len(all_contexts)
+
+
+def automation_command(
+    session_envs: Optional[SessionEnvironments],
+    context: Dict[str, str],
+    args: str,
+    project_path: str,
+    log_path: str,
+    timeout: Optional[float],
+) -> Command:
+    """Command running nox or tox, whichever the project uses"""
+    tool: str = context["test_automation_tool"]
+    if session_envs is None:
+        return Command(
+            f"{tool.lower()} {args}", project_path, log_path, timeout=timeout
+        )
+    return Command(
+        session_envs.command(tool, args, context),
+        project_path,
+        log_path,
+        env=session_envs.environ,
+        timeout=timeout,
+        # Projects sharing an environment must not install into it at once.
+        lock=session_envs.envs_dir_of(tool, context),
+    )
+
+
+@mark.bake_context({})
+def test_session_envs_build_the_project_offline(project_index: ProjectIndexes) -> None:
+    # tox builds the project with its own backend, so it needs the wheel of it.
+    project: ProjectIndex = project_index({})
+    backend: str = project.pyproject["build-system"]["build-backend"]
+    assert backend.startswith("poetry.core")
+    assert "poetry-core" in build_system_requirements(project.pyproject)
+
+
+@mark.bake_context({"parallel_tests": "y"}, {})
+def test_session_envs_split_on_dependencies(
+    request: FixtureRequest, project_index: ProjectIndexes
+) -> None:
+    # pytest-xdist is only installed with parallel_tests, so such projects must
+    # neither miss its wheel nor share environments with the others.
+    parallel: ProjectIndex = project_index({"parallel_tests": "y"})
+    assert "pytest-xdist" in pipfile_requirements(parallel.pipfile)
+    assert "pytest-xdist" not in pipfile_requirements(project_index({}).pipfile)
+
+    session_envs = SessionEnvironments(
+        wheelhouse="wheelhouse",
+        envs_dir="envs",
+        defaults=get_defaults(request.config.option.template, DEPENDENCY_OPTIONS),
+    )
+    assert session_envs.envs_dir_of("Nox", {}) == session_envs.envs_dir_of(
+        "Nox", {"parallel_tests": "n", "license": "Other"}
+    )
+    assert session_envs.envs_dir_of("Nox", {}) != session_envs.envs_dir_of(
+        "Nox", {"parallel_tests": "y"}
+    )
+    assert session_envs.envs_dir_of("Nox", {}) != session_envs.envs_dir_of("Tox", {})
+
+
+def assert_all_ok(results: Iterable[CommandResult]) -> None:
+    failures: list[str] = [str(result) for result in results if not result.ok]
+    assert not failures, "\n".join(failures)
+
 
-        assert (
-            run_inside_dir(
-                f"{context['test_automation_tool'].lower()} -e docs",
-                str(result.project),
+@mark.slow
+@mark.bake_context(*DOCS_MATRIX.combinations)
+def test_bake_and_generate_docs(
+    request: FixtureRequest,
+    tmp_path_factory: TempPathFactory,
+    session_envs: Optional[SessionEnvironments],
+    affected_contexts: Callable[[Sequence[Dict[str, Any]]], list[Dict[str, Any]]],
+) -> None:
+    output_root = tmp_path_factory.mktemp("docs_matrix")
+    results: list[MatrixResult] = bake_matrix(
+        request.config.option.template,
+        affected_contexts(DOCS_MATRIX.combinations),
+        str(output_root),
+    )
+
+    commands: list[Command] = []
+    for index, result in enumerate(results):
+        assert result.exit_code == 0, result
+        assert result.project_path is not None
+        test_file_path = os.path.join(
+            result.project_path, "tests", "test_my_python_package.py"
+        )
+        with open(test_file_path, 'r') as test_file:
+            assert "import pytest" in test_file.read()
+
+        commands.append(
+            automation_command(
+                session_envs,
+                result.context,
+                "-e docs",
+                result.project_path,
+                str(output_root / f"docs{index}.log"),
+                request.config.option.session_timeout,
             )
-            == 0
         )
 
+    assert_all_ok(run_commands(commands, request.config.option.session_jobs))
 
-def test_bake_no_test_framework(cookies: Cookies) -> None:
-    result: Result
-    with bake_in_temp_dir(cookies, extra_context={"have_tests": "n"}) as result:
-        project_path: str = project_info(result)[0]
-        root_files: Iterable[str] = set(os.listdir(project_path))
 
-        assert "pytest.ini" not in root_files
+@mark.bake_context({"have_tests": "n"})
+def test_bake_no_test_framework(project_index: ProjectIndexes) -> None:
+    project: ProjectIndex = project_index({"have_tests": "n"})
 
-        assert "tests" not in root_files
+    assert "pytest.ini" not in project.files
 
-        assert "src" in root_files
-        assert "conftest.py" not in os.listdir(os.path.join(project_path, "src"))
+    assert "tests" not in project.files
 
-        assert "mypy.ini" in root_files
-        with open(os.path.join(project_path, "mypy.ini"), 'r') as mypy_config:
-            assert not next(
-                (s for s in mypy_config.read().splitlines() if "mypy-pytest" in s), None
-            )
+    assert "src" in project.files
+    assert "src/conftest.py" not in project.files
 
-        assert "setup.py" in root_files
-        with open(os.path.join(project_path, "setup.py"), 'r') as setup_config:
-            assert not next(
-                (
-                    s
-                    for s in setup_config.read().splitlines()
-                    if 'test_suite="tests"' in s
-                ),
-                None,
-            )
+    assert "mypy.ini" in project.files
+    assert "mypy-pytest.*" not in project.mypy
 
-        assert "Pipfile" in root_files
-        with open(os.path.join(project_path, "Pipfile"), 'r') as pipfile:
-            lines: Iterable[str] = set(pipfile.read().splitlines())
-            assert 'pytest = "*"' not in lines
-            assert 'hypothesis = "*"' not in lines
-            assert 'pytest-cov = "*"' not in lines
+    assert "setup.py" in project.files
+    assert "test_suite" not in project.setup
+
+    assert "Pipfile" in project.files
+    dev_packages: Dict[str, Any] = project.pipfile["dev-packages"]
+    assert "pytest" not in dev_packages
+    assert "hypothesis" not in dev_packages
+    assert "pytest-cov" not in dev_packages
 
 
-@mark.slow
 @mark.parametrize(
     "context",
-    get_all_possble_combinations(
-        {
-            "test_automation_tool": ["Nox", "Tox"],
-        }
-    ),
+    [
+        {"have_benchmarks": "y", "have_tests": "n", "test_automation_tool": "Nox"},
+        {"have_benchmarks": "y", "have_tests": "y", "test_automation_tool": "Tox"},
+        {"have_benchmarks": "n", "test_automation_tool": "Nox"},
+        {"have_benchmarks": "n", "test_automation_tool": "Tox"},
+    ],
 )
-def test_bake_and_run_tests(cookies: Cookies, context: Dict[str, str]) -> None:
-    def assert_testable(result: Result) -> None:
-        project_path: str = project_info(result)[0]
-        root_files: Iterable[str] = set(os.listdir(project_path))
+def test_bake_benchmarks(
+    bake: Bake, project_index: ProjectIndexes, context: Dict[str, str]
+) -> None:
+    have_benchmarks: bool = context["have_benchmarks"] == "y"
+    project: ProjectIndex = project_index(context)
+
+    assert (f"benchmarks/test_bench_{project.slug}.py" in project.files) == (
+        have_benchmarks
+    )
+    assert ("benchmarks/conftest.py" in project.files) == have_benchmarks
+    dev_packages: Dict[str, Any] = project.pipfile["dev-packages"]
+    assert ("pytest-benchmark" in dev_packages) == have_benchmarks
+    assert "pytest" in dev_packages or not have_benchmarks
+
+    with bake(context) as result:
+        if context["test_automation_tool"] == "Nox":
+            session = "def bench(session: Session):"
+            config: str = result.project.join("noxfile.py").read()
+        else:
+            session = "[testenv:bench]"
+            config = result.project.join("tox.ini").read()
+        assert (session in config) == have_benchmarks
+        assert ("--benchmark-compare-fail=median:" in config) == have_benchmarks
 
-        assert "pytest.ini" in root_files
 
-        assert "tests" in root_files
-        assert "test_my_python_package.py" in os.listdir(
-            os.path.join(project_path, "tests")
-        )
+@mark.parametrize(
+    "context",
+    [
+        {"parallel_tests": "y", "test_automation_tool": "Nox"},
+        {"parallel_tests": "y", "test_automation_tool": "Tox"},
+        {"parallel_tests": "n", "test_automation_tool": "Nox"},
+        {"parallel_tests": "n", "test_automation_tool": "Tox"},
+    ],
+)
+def test_bake_parallel_tests(bake: Bake, context: Dict[str, str]) -> None:
+    parallel: bool = context["parallel_tests"] == "y"
+    with bake(context) as result:
+        pytest_ini: str = result.project.join("pytest.ini").read()
+        assert ("-n auto" in pytest_ini) == parallel
+        # Only the coverage session renders the HTML report then.
+        assert ("--cov-report html" in pytest_ini) != parallel
+        assert ("pytest-xdist" in result.project.join("Pipfile").read()) == parallel
+
+        if context["test_automation_tool"] == "Nox":
+            config: str = result.project.join("noxfile.py").read()
+            assert ("def coverage(session: Session):" in config) == parallel
+            assert ("'COVERAGE_FILE'" in config) == parallel
+            assert ("session.run('coverage', 'combine')" in config) == parallel
+        else:
+            config = result.project.join("tox.ini").read()
+            assert ("[testenv:coverage]" in config) == parallel
+            assert ("COVERAGE_FILE = {toxinidir}/.coverage.{envname}" in config) == (
+                parallel
+            )
+            assert ("coverage combine" in config) == parallel
 
-        assert "src" in root_files
-        assert "conftest.py" in os.listdir(os.path.join(project_path, "src"))
 
-        assert "mypy.ini" in root_files
-        with open(os.path.join(project_path, "mypy.ini"), 'r') as mypy_config:
-            assert next(
-                (s for s in mypy_config.read().splitlines() if "mypy-pytest" in s), None
-            )
+@mark.parametrize(
+    "context",
+    [
+        {"have_parallel_map": "y", "command_line_interface": "Click"},
+        {"have_parallel_map": "y", "command_line_interface": "None"},
+        {"have_parallel_map": "n", "command_line_interface": "Argparse"},
+    ],
+)
+def test_bake_parallel_map(
+    bake: Bake, project_index: ProjectIndexes, context: Dict[str, str]
+) -> None:
+    have_parallel_map: bool = context["have_parallel_map"] == "y"
+    have_cli: bool = context["command_line_interface"] != "None"
+    context = dict(context, have_benchmarks="y")
+    project: ProjectIndex = project_index(context)
+
+    assert (f"src/{project.slug}/parallel.py" in project.files) == have_parallel_map
+    assert ("tests/test_parallel.py" in project.files) == have_parallel_map
+    assert ("benchmarks/test_bench_parallel.py" in project.files) == have_parallel_map
+    assert (f"src/{project.slug}/commands/digest.py" in project.files) == (
+        have_parallel_map and have_cli
+    )
+    # multiprocessing.shared_memory and math.prod are new in Python 3.8.
+    assert project.setup["python_requires"] == (
+        ">=3.8" if have_parallel_map else ">=3.6"
+    )
+    assert project.pyproject["tool"]["poetry"]["dependencies"]["python"] == (
+        ">=3.8,<4.0" if have_parallel_map else ">=3.7,<4.0"
+    )
+    if have_cli:
+        with bake(context) as result:
+            cli: str = result.project.join("src", project.slug, "cli.py").read()
+            assert ("'--jobs'" in cli) == have_parallel_map
+            assert ("'digest'" in cli) == have_parallel_map
 
-        assert "setup.py" in root_files
-        with open(os.path.join(project_path, "setup.py"), 'r') as setup_config:
-            assert next(
-                (
-                    s
-                    for s in setup_config.read().splitlines()
-                    if 'test_suite="tests"' in s
-                ),
-                None,
-            )
 
-        assert "Pipfile" in root_files
-        with open(os.path.join(project_path, "Pipfile"), 'r') as pipfile:
-            lines: Iterable[str] = set(pipfile.read().splitlines())
-            assert 'pytest = "*"' in lines
-            assert 'hypothesis = "*"' in lines
-            assert 'pytest-cov = "*"' in lines
+@mark.parametrize(
+    "context",
+    [
+        {"have_cache": "y", "command_line_interface": "Asyncio"},
+        {
+            "have_cache": "y",
+            "command_line_interface": "Click",
+            "have_parallel_map": "y",
+        },
+        {"have_cache": "y", "command_line_interface": "None"},
+        {
+            "have_cache": "n",
+            "command_line_interface": "Click",
+            "have_parallel_map": "y",
+        },
+    ],
+)
+def test_bake_cache(
+    bake: Bake, project_index: ProjectIndexes, context: Dict[str, str]
+) -> None:
+    have_cache: bool = context["have_cache"] == "y"
+    have_cli: bool = context["command_line_interface"] != "None"
+    have_digest: bool = have_cli and context.get("have_parallel_map") == "y"
+    project: ProjectIndex = project_index(context)
+
+    assert (f"src/{project.slug}/cache.py" in project.files) == have_cache
+    assert ("tests/test_cache.py" in project.files) == have_cache
+    if have_cli:
+        with bake(context) as result:
+            src = result.project.join("src", project.slug)
+            cli: str = src.join("cli.py").read()
+            # The options only exist for the digest command to cache with.
+            assert ("'--no-cache'" in cli) == (have_cache and have_digest)
+            assert ("'--cache-dir'" in cli) == (have_cache and have_digest)
+            if have_digest:
+                digest: str = src.join("commands", "digest.py").read()
+                assert ("@persist()" in digest) == have_cache
 
-    with bake_in_temp_dir(cookies, extra_context=context) as result:
-        assert_testable(result)
 
-        if context["test_automation_tool"] == "Tox":
-            tox_envs: str = ','.join(
+@mark.slow
+def test_bake_full_matrix(
+    request: FixtureRequest, tmp_path_factory: TempPathFactory
+) -> None:
+    template: str = request.config.option.template
+    contexts = get_all_possble_combinations(
+        get_choices(
+            template,
+            [
+                "documentation_framework",
+                "command_line_interface",
+                "test_automation_tool",
+                "license",
+                "have_tests",
+            ],
+        )
+    )
+    results: list[MatrixResult] = bake_matrix(
+        template, contexts, str(tmp_path_factory.mktemp("matrix"))
+    )
+
+    assert [result.context for result in results] == contexts
+    for result in results:
+        assert result.exit_code == 0, result
+        assert result.exception is None, result
+
+        context: Dict[str, str] = result.context
+        tree: Iterable[str] = set(result.tree)
+        assert "setup.py" in tree
+        assert ("tox.ini" in tree) == (context["test_automation_tool"] == "Tox")
+        assert ("noxfile.py" in tree) == (context["test_automation_tool"] == "Nox")
+        assert ("LICENSE" in tree) == (context["license"] != "Other")
+        assert ("tests" in tree) == (context["have_tests"] == "y")
+        assert ("docs" in tree) == (context["documentation_framework"] != "None")
+        assert (os.path.join("src", "my_python_package", "cli.py") in tree) == (
+            context["command_line_interface"] != "None"
+        )
+        assert (os.path.join("src", "my_python_package", "tasks.py") in tree) == (
+            context["command_line_interface"] == "Asyncio"
+        )
+
+
+@mark.slow
+@mark.bake_context(*TESTS_MATRIX.combinations)
+def test_bake_and_run_tests(
+    request: FixtureRequest,
+    tmp_path_factory: TempPathFactory,
+    session_envs: Optional[SessionEnvironments],
+    affected_contexts: Callable[[Sequence[Dict[str, Any]]], list[Dict[str, Any]]],
+) -> None:
+    def assert_testable(project: ProjectIndex) -> None:
+        assert "pytest.ini" in project.files
+
+        assert "tests" in project.files
+        assert f"tests/test_{project.slug}.py" in project.files
+
+        assert "src" in project.files
+        assert "src/conftest.py" in project.files
+
+        assert "mypy.ini" in project.files
+        assert "mypy-pytest.*" in project.mypy
+
+        assert "setup.py" in project.files
+        assert project.setup["test_suite"] == "tests"
+
+        assert "Pipfile" in project.files
+        dev_packages: Dict[str, Any] = project.pipfile["dev-packages"]
+        assert dev_packages["pytest"] == "*"
+        assert dev_packages["hypothesis"] == "*"
+        assert dev_packages["pytest-cov"] == "*"
+
+    output_root = tmp_path_factory.mktemp("tests_matrix")
+    results: list[MatrixResult] = bake_matrix(
+        request.config.option.template,
+        affected_contexts(TESTS_MATRIX.combinations),
+        str(output_root),
+    )
+
+    commands: list[Command] = []
+    for index, result in enumerate(results):
+        assert result.exit_code == 0, result
+        assert result.project_path is not None
+        project = LocalPath(result.project_path)  # type: ignore[no-untyped-call]
+        assert_testable(index_project(project))
+
+        args: str = "--sessions test"
+        if result.context["test_automation_tool"] == "Tox":
+            args = "-e " + ','.join(
                 env
                 for env in check_output_inside_dir(
-                    "tox --listenvs", str(result.project)
+                    "tox --listenvs", result.project_path
                 ).split()
                 if env.startswith("py3")
             )
-            assert run_inside_dir("tox -e " + tox_envs, str(result.project)) == 0
-        elif context["test_automation_tool"] == "Nox":
-            assert run_inside_dir("nox --sessions test", str(result.project)) == 0
+        commands.append(
+            automation_command(
+                session_envs,
+                result.context,
+                args,
+                result.project_path,
+                str(output_root / f"tests{index}.log"),
+                request.config.option.session_timeout,
+            )
+        )
+
+    assert_all_ok(run_commands(commands, request.config.option.session_jobs))
@@ -0,0 +1,528 @@
+# coding: utf-8
+import io
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+from _pytest.capture import CaptureFixture
+from bakery import PROJECT_TEMPLATE, TEMPLATE_DIR
+from bakery.bulk import BulkRecord, generate_bulk, read_contexts
+from bakery.bytecode_cache import SourceHashBytecodeCache
+from bakery.cli import main
+from bakery.generate import (
+    InvalidContextException,
+    Renderer,
+    generate_project,
+    resolve_context,
+)
+from bakery.impact import ALL, impact_of, referenced_variables
+from bakery.trace import Trace, slowest_files, write_trace
+from bakery.tree import MemoryTree
+from bakery.update import RECORD_FILE, UpdateRecord, render_base, update_bulk
+from bakery.validate import ContextValidator
+from helper_functions import bake_in_temp_dir, get_all_possble_combinations
+from pytest import mark, raises
+from pytest_cookies.plugin import Cookies
+
+
+def read_tree(root: str) -> Dict[str, bytes]:
+    tree: Dict[str, bytes] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        relative_dir = os.path.relpath(dirpath, root)
+        for name in dirnames:
+            tree[os.path.normpath(os.path.join(relative_dir, name))] = b""
+        for name in filenames:
+            with open(os.path.join(dirpath, name), 'rb') as f:
+                tree[os.path.normpath(os.path.join(relative_dir, name))] = f.read()
+    return tree
+
+
+@mark.parametrize(
+    "context",
+    get_all_possble_combinations(
+        {
+            "full_name": ["Pratik Bhusal", 'name "quote" name'],
+            "documentation_framework": ["Sphinx", "MkDocs", "None"],
+            "command_line_interface": ["Click", "Argparse", "Asyncio", "None"],
+            "test_automation_tool": ["Nox", "Tox"],
+            "license": ["MIT License", "Apache 2.0 License", "Other"],
+            "have_tests": ["y", "n"],
+        },
+        strength=2,
+    ),
+)
+def test_generate_matches_cookiecutter(
+    cookies: Cookies, tmp_path: Path, context: Dict[str, str]
+) -> None:
+    project_dir: str = generate_project(context, output_dir=str(tmp_path))
+
+    with bake_in_temp_dir(cookies, extra_context=context) as result:
+        assert result.exit_code == 0
+        assert read_tree(project_dir) == read_tree(str(result.project_path))
+
+
+def test_generate_skips_excluded_paths(tmp_path: Path) -> None:
+    project_dir: str = generate_project(
+        {"documentation_framework": "None", "have_tests": "n"},
+        output_dir=str(tmp_path),
+        accept_hooks=False,
+    )
+
+    root_files = os.listdir(project_dir)
+    assert "docs" not in root_files
+    assert "tests" not in root_files
+    assert "pytest.ini" not in root_files
+    assert "tox.ini" not in root_files
+    assert "noxfile.py" in root_files
+
+
+@mark.parametrize(
+    "context",
+    [{}, {"documentation_framework": "MkDocs", "command_line_interface": "Argparse"}],
+)
+def test_memory_tree_matches_disk(
+    renderer: Renderer, tmp_path: Path, context: Dict[str, str]
+) -> None:
+    project_dir: str = renderer.generate(context, output_dir=str(tmp_path))
+
+    tree = MemoryTree()
+    memory_project_dir: str = renderer.generate(context, output_dir="/", tree=tree)
+    files: Dict[str, bytes] = {
+        os.path.relpath(path, memory_project_dir): data
+        for path, data in tree.files.items()
+    }
+    assert files == {
+        path: data
+        for path, data in read_tree(project_dir).items()
+        if not os.path.isdir(os.path.join(project_dir, path))
+    }
+    assert tree.modes[os.path.join(memory_project_dir, "setup.py")] == (
+        os.stat(os.path.join(project_dir, "setup.py")).st_mode & 0o7777
+    )
+
+
+def test_invalid_slug_cancels_project(cookies: Cookies, tmp_path: Path) -> None:
+    context: Dict[str, str] = {"project_slug": "my-python-package"}
+
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    with raises(InvalidContextException, match="not a valid Python module name"):
+        generate_project(context, output_dir=str(output_dir))
+    assert os.listdir(output_dir) == []
+
+    result = cookies.bake(extra_context=context)
+    assert result.exit_code != 0
+    assert result.exception is not None
+
+
+def test_pre_gen_hook_reports_values_breaking_string_literals(
+    cookies: Cookies, capfd: CaptureFixture[str]
+) -> None:
+    version = "0.1'''\"\\"
+    result = cookies.bake(extra_context={"version": version})
+    assert result.exit_code != 0
+
+    out, err = capfd.readouterr()
+    assert f"ERROR: The version ({version}) is not a PEP 440 version" in out
+    assert "SyntaxError" not in err
+
+
+@mark.parametrize("jobs", [1, 2])
+def test_generate_bulk(tmp_path: Path, jobs: int) -> None:
+    stream = io.StringIO(
+        "\n".join(
+            [
+                json.dumps({"project_name": "First One"}),
+                "",
+                json.dumps({"project_name": "Second", "have_tests": "n"}),
+                "not json",
+                json.dumps({"project_slug": "not-a-module"}),
+                json.dumps(["not", "an", "object"]),
+            ]
+        )
+    )
+    records: List[BulkRecord] = sorted(
+        generate_bulk(read_contexts(stream), output_dir=str(tmp_path), jobs=jobs),
+        key=lambda record: record.index,
+    )
+
+    assert [record.ok for record in records] == [True, True, False, False, False]
+    assert records[0].project_dir == str(tmp_path / "first_one")
+    assert "tests" not in os.listdir(str(tmp_path / "second"))
+    assert records[2].error is not None and "line 4" in records[2].error
+    assert records[3].error is not None and "not-a-module" in records[3].error
+    assert records[3].error.startswith("InvalidContextException: ")
+    assert sorted(os.listdir(tmp_path)) == ["first_one", "second"]
+
+
+def test_bulk_cli_reads_csv(tmp_path: Path, capsys: CaptureFixture[str]) -> None:
+    contexts_file = tmp_path / "contexts.csv"
+    contexts_file.write_text(
+        "project_name,test_automation_tool\nFirst One,Tox\nSecond,\n"
+    )
+    output_dir = tmp_path / "out"
+
+    assert main(["generate", str(contexts_file), "-o", str(output_dir), "-j", "1"]) == 0
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["error"] for record in records] == [None, None]
+    assert "tox.ini" in os.listdir(output_dir / "first_one")
+    assert "noxfile.py" in os.listdir(output_dir / "second")
+
+
+@mark.parametrize(
+    "context",
+    [{}, {"project_name": "Other Name", "full_name": "A B", "license": "Other"}],
+)
+def test_context_validator_resolves_like_cookiecutter(context: Dict[str, str]) -> None:
+    cookiecutter, errors = ContextValidator().resolve(context)
+
+    resolved = resolve_context(context)["cookiecutter"]
+    assert errors == []
+    assert cookiecutter == {key: resolved[key] for key in cookiecutter}
+
+
+def test_context_validator_reports_every_error() -> None:
+    validator = ContextValidator()
+    found = validator.validate_all(
+        [
+            {"project_name": "Fine"},
+            {
+                "project_slug": "not-a-module",
+                "version": "one",
+                "license": "GPL",
+                "full_name": "O'Brien \"Bob\"",
+            },
+            {"documentation_framework": "MkDocs", "full_name": "Ann: B"},
+            {"documentation_framework": "None", "full_name": "Ann: B \\o/"},
+        ]
+    )
+
+    assert sorted(found) == [1, 2]
+    assert [error.split(" (")[0] for error in found[1]] == [
+        "The license",
+        "The project slug",
+        "The version",
+        "The full name",
+    ]
+    assert "docs/source/conf.py" in found[1][-1]
+    assert "docs/mkdocs.yml" in found[2][0]
+
+
+def test_validate_cli(tmp_path: Path, capsys: CaptureFixture[str]) -> None:
+    contexts_file = tmp_path / "contexts.jsonl"
+    contexts_file.write_text(
+        "\n".join(
+            [
+                json.dumps({"project_name": "Fine"}),
+                json.dumps({"version": "1.0-beta", "test_automation_tool": "make"}),
+                "not json",
+            ]
+        )
+    )
+
+    assert main(["validate", str(contexts_file)]) == 1
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [record["index"] for record in records] == [1, 2]
+    assert len(records[0]["errors"]) == 2
+    assert os.listdir(tmp_path) == ["contexts.jsonl"]
+
+
+def test_trace_records_files_and_hooks(renderer: Renderer) -> None:
+    trace = Trace()
+    tree = MemoryTree()
+    project_dir: str = renderer.generate({}, output_dir="/", tree=tree, timings=trace)
+
+    files: Dict[str, int] = {
+        event.name: event.size for event in trace.events if event.category == "file"
+    }
+    assert files["setup.py"] == len(tree.files[os.path.join(project_dir, "setup.py")])
+    assert len(files) == len(tree.files)
+    assert {e.name for e in trace.events if e.category == "hook"} == {
+        "pre_gen",
+        "post_gen",
+    }
+    assert trace.phases["render"] >= sum(
+        e.duration for e in trace.events if e.category == "file"
+    )
+
+    top = slowest_files(trace.events, top=3)
+    assert len(top) == 3
+    assert top[0].total >= top[1].total >= top[2].total
+
+    stream = io.StringIO()
+    write_trace(stream, [(project_dir, trace.events)])
+    trace_events = json.loads(stream.getvalue())["traceEvents"]
+    assert trace_events[0]["args"] == {"name": project_dir}
+    assert len(trace_events) == len(trace.events) + 1
+
+
+def test_bulk_cli_writes_trace(tmp_path: Path, capsys: CaptureFixture[str]) -> None:
+    contexts_file = tmp_path / "contexts.jsonl"
+    contexts_file.write_text('{}\n{"project_name": "Second"}\n')
+    trace_file = tmp_path / "trace.json"
+
+    arguments: List[str] = ["generate", str(contexts_file), "-o", str(tmp_path)]
+    assert main(arguments + ["--trace", str(trace_file), "--top", "2"]) == 0
+
+    err: str = capsys.readouterr().err
+    assert "Slowest 2 template files:" in err
+    assert len(err.strip().splitlines()) == 3
+
+    trace_events = json.loads(trace_file.read_text())["traceEvents"]
+    assert {event["tid"] for event in trace_events} == {1, 2}
+    assert {event.get("cat") for event in trace_events} == {None, "file", "hook"}
+
+
+def test_bytecode_cache_is_invalidated_by_changes(tmp_path: Path) -> None:
+    template_dir = tmp_path / "template"
+    shutil.copytree(TEMPLATE_DIR / PROJECT_TEMPLATE, template_dir / PROJECT_TEMPLATE)
+    shutil.copy(TEMPLATE_DIR / "cookiecutter.json", template_dir)
+
+    def render(output_dir: str) -> SourceHashBytecodeCache:
+        renderer = Renderer(str(template_dir))
+        cache = SourceHashBytecodeCache(str(tmp_path / "bytecode"))
+        renderer.environment.bytecode_cache = cache
+        renderer.generate(output_dir=str(tmp_path / output_dir))
+        return cache
+
+    first = render("first")
+    assert first.hits == 0
+    assert first.misses > 0
+
+    second = render("second")
+    assert second.hits == first.misses
+    assert second.misses == 0
+
+    setup_file = template_dir / PROJECT_TEMPLATE / "setup.py"
+    setup_file.write_text(setup_file.read_text() + "# changed\n")
+    third = render("third")
+    assert third.misses == 1
+    assert (
+        (tmp_path / "third" / "my_python_package" / "setup.py")
+        .read_text()
+        .endswith("# changed\n")
+    )
+
+
+def test_referenced_variables(renderer: Renderer) -> None:
+    environment = renderer.environment
+    assert referenced_variables(
+        "{{ cookiecutter.full_name }} {% if cookiecutter['license'] == 'x' %}{% endif %}",
+        environment,
+    ) == {"full_name", "license"}
+    assert referenced_variables("{{ cookiecutter | jsonify }}", environment) == {ALL}
+    assert referenced_variables("no variables", environment) == set()
+
+
+def test_impact_of_a_template_change(renderer: Renderer) -> None:
+    impact = impact_of(
+        ["README.markdown", PROJECT_TEMPLATE + "/docs/mkdocs.yml"], renderer.environment
+    )
+    assert not impact.everything
+    assert "documentation_framework" in impact.variables
+
+    contexts = [
+        resolve_context(context)["cookiecutter"]
+        for context in get_all_possble_combinations(
+            {
+                "documentation_framework": ["Sphinx", "MkDocs", "None"],
+                "test_automation_tool": ["Nox", "Tox"],
+            }
+        )
+    ]
+    (selected,) = impact.select(contexts)
+    assert selected["documentation_framework"] == "MkDocs"
+
+    assert impact_of(["cookiecutter.json"], renderer.environment).everything
+
+
+def copy_template(
+    destination: Path, names: tuple[str, ...] = (PROJECT_TEMPLATE,)
+) -> Path:
+    """Copy cookiecutter.json and some directories of the template"""
+    for name in names:
+        shutil.copytree(
+            TEMPLATE_DIR / name,
+            destination / name,
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
+    shutil.copy(TEMPLATE_DIR / "cookiecutter.json", destination)
+    return destination
+
+
+def commit_all(repository: Path, message: str) -> str:
+    """Commit every file of a directory, made a git repository if need be"""
+    git = ["git", "-c", "user.name=bakery", "-c", "user.email=bakery@localhost"]
+    subprocess.check_call(git + ["init", "-q"], cwd=repository)
+    subprocess.check_call(git + ["add", "-A"], cwd=repository)
+    subprocess.check_call(git + ["commit", "-q", "-m", message], cwd=repository)
+    return subprocess.check_output(
+        ["git", "rev-parse", "HEAD"], cwd=repository, text=True
+    ).strip()
+
+
+def test_update_merges_template_changes(tmp_path: Path) -> None:
+    template_dir = copy_template(tmp_path / "template")
+
+    def commit(message: str) -> str:
+        return commit_all(template_dir, message)
+
+    first_commit = commit("first")
+    project_dir = Path(
+        generate_project(
+            {"project_name": "Old Project"},
+            output_dir=str(tmp_path / "fleet"),
+            template_dir=str(template_dir),
+        )
+    )
+    assert json.loads((project_dir / RECORD_FILE).read_text())["_commit"] == (
+        first_commit
+    )
+
+    # The project changes the top of its README and its mypy.ini, the template
+    # the bottom of the README, the same line of mypy.ini and its pytest.ini.
+    readme = project_dir / "README.markdown"
+    readme.write_text("Project notes\n" + readme.read_text())
+    mypy_ini = project_dir / "mypy.ini"
+    mypy_ini.write_text(mypy_ini.read_text().replace("pretty = True", "pretty = False"))
+    untouched = project_dir / "setup.py"
+    untouched_mtime = untouched.stat().st_mtime_ns
+
+    template = template_dir / PROJECT_TEMPLATE
+    for name, old, new in [
+        ("README.markdown", None, "Template notes\n"),
+        ("mypy.ini", "pretty = True", "pretty = 1"),
+        ("pytest.ini", None, "# new option\n"),
+    ]:
+        path = template / name
+        text = path.read_text()
+        path.write_text(text + new if old is None else text.replace(old, new))
+    second_commit = commit("second")
+
+    (dry_run,) = update_bulk(
+        [str(project_dir)], jobs=1, template_dir=str(template_dir), dry_run=True
+    )
+    assert not (project_dir / "pytest.ini").read_text().endswith("# new option\n")
+
+    (record,) = update_bulk([str(project_dir)], jobs=1, template_dir=str(template_dir))
+    assert isinstance(record, UpdateRecord)
+    assert record.ok, record.error
+    assert record.written == [RECORD_FILE, "README.markdown", "mypy.ini", "pytest.ini"]
+    assert record.conflicts == ["mypy.ini"]
+    assert record.deleted == []
+    assert dry_run.written == record.written
+
+    assert readme.read_text().startswith("Project notes\n")
+    assert readme.read_text().endswith("Template notes\n")
+    assert (project_dir / "pytest.ini").read_text().endswith("# new option\n")
+    assert "<<<<<<< project" in mypy_ini.read_text()
+    assert untouched.stat().st_mtime_ns == untouched_mtime
+    assert json.loads((project_dir / RECORD_FILE).read_text())["_commit"] == (
+        second_commit
+    )
+
+
+def test_update_leaves_an_up_to_date_project_alone(tmp_path: Path) -> None:
+    template_dir = copy_template(
+        tmp_path / "template", (PROJECT_TEMPLATE, "bakery", "hooks")
+    )
+    commit_all(template_dir, "first")
+    project_dir = Path(
+        generate_project(
+            {"project_name": "Old Project"},
+            output_dir=str(tmp_path / "fleet"),
+            template_dir=str(template_dir),
+        )
+    )
+    # Files git archive would leave out of the base, or convert the newlines of.
+    for name in (".gitignore", ".gitattributes", "docs/make.bat"):
+        path = project_dir / name
+        path.write_bytes(path.read_bytes() + b"project line\n")
+    before = read_tree(str(project_dir))
+
+    (record,) = update_bulk([str(project_dir)], jobs=1, template_dir=str(template_dir))
+
+    assert record.ok, record.error
+    assert (record.written, record.deleted, record.conflicts) == ([], [], [])
+    assert read_tree(str(project_dir)) == before
+
+
+def test_update_refuses_projects_of_a_dirty_template(tmp_path: Path) -> None:
+    template_dir = copy_template(tmp_path / "template")
+    commit = commit_all(template_dir, "first")
+    readme = template_dir / PROJECT_TEMPLATE / "README.markdown"
+    readme.write_text(readme.read_text() + "Uncommitted notes\n")
+    project_dir = Path(
+        generate_project(
+            {"project_name": "Old Project"},
+            output_dir=str(tmp_path / "fleet"),
+            template_dir=str(template_dir),
+        )
+    )
+    record = json.loads((project_dir / RECORD_FILE).read_text())
+    assert (record["_commit"], record["_dirty"]) == (commit, True)
+
+    (update,) = update_bulk([str(project_dir)], jobs=1, template_dir=str(template_dir))
+
+    assert update.error is not None
+    assert "uncommitted changes" in update.error
+
+
+def test_update_takes_the_context_of_legacy_projects(tmp_path: Path) -> None:
+    template_dir = copy_template(tmp_path / "template")
+    first_commit = commit_all(template_dir, "first")
+    project_dir = Path(
+        generate_project(
+            {"project_name": "Old Project", "license": "Other"},
+            output_dir=str(tmp_path / "fleet"),
+            template_dir=str(template_dir),
+        )
+    )
+    # As generated before the template recorded anything.
+    (project_dir / RECORD_FILE).unlink()
+    readme = template_dir / PROJECT_TEMPLATE / "README.markdown"
+    readme.write_text(readme.read_text() + "Template notes\n")
+    second_commit = commit_all(template_dir, "second")
+
+    (missing,) = update_bulk([str(project_dir)], jobs=1, template_dir=str(template_dir))
+    assert missing.error is not None
+    assert "give its context" in missing.error
+
+    (record,) = update_bulk(
+        [str(project_dir)],
+        jobs=1,
+        template_dir=str(template_dir),
+        base_commit=first_commit,
+        contexts={
+            str(project_dir): {"project_name": "Old Project", "license": "Other"}
+        },
+    )
+
+    assert record.ok, record.error
+    assert record.written == [RECORD_FILE, "README.markdown"]
+    assert record.conflicts == []
+    assert (project_dir / "README.markdown").read_text().endswith("Template notes\n")
+    recorded = json.loads((project_dir / RECORD_FILE).read_text())
+    assert (recorded["_commit"], recorded["license"]) == (second_commit, "Other")
+
+
+def test_base_renders_with_the_bakery_of_the_checkout(tmp_path: Path) -> None:
+    checkout = copy_template(tmp_path / "template", (PROJECT_TEMPLATE, "bakery"))
+    manifest = checkout / "bakery" / "manifest.py"
+    manifest.write_text(
+        manifest.read_text().replace(
+            '"pytest.ini": {"have_tests": ["y"]}', '"pytest.ini": {"have_tests": []}'
+        )
+    )
+
+    ((files, error),) = render_base(str(checkout), [{"project_name": "Old Project"}])
+
+    assert error is None
+    assert files is not None
+    assert "setup.py" in files
+    assert "pytest.ini" not in files
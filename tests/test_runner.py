@@ -0,0 +1,84 @@
+# coding: utf-8
+import os
+import shlex
+import sys
+from pathlib import Path
+
+from runner import Command, CommandResult, run_commands
+
+PYTHON: str = shlex.quote(sys.executable)
+
+
+def python(code: str) -> str:
+    return f"{PYTHON} -c {shlex.quote(code)}"
+
+
+def test_commands_run_concurrently_in_their_own_directory(tmp_path: Path) -> None:
+    directories: list[Path] = [tmp_path / f"project{i}" for i in range(3)]
+    for directory in directories:
+        directory.mkdir()
+
+    cwd: str = os.getcwd()
+    results: list[CommandResult] = run_commands(
+        [
+            Command(
+                python(
+                    "import os, time; print(os.getcwd()); print(time.time()); "
+                    "time.sleep(1); print(time.time())"
+                ),
+                str(directory),
+                str(tmp_path / "logs" / f"{directory.name}.log"),
+            )
+            for directory in directories
+        ],
+        max_concurrency=3,
+    )
+    assert os.getcwd() == cwd
+
+    intervals: list[tuple[float, float]] = []
+    for directory, result in zip(directories, results):
+        assert result.ok, result
+        logged_cwd, started, ended = result.log().splitlines()
+        assert logged_cwd == str(directory)
+        intervals.append((float(started), float(ended)))
+        assert result.duration >= 1
+        assert result.peak_rss is None or result.peak_rss > 0
+    # All of them were running at once, however loaded the machine is.
+    assert max(start for start, _ in intervals) < min(end for _, end in intervals)
+
+
+def test_timeout_kills_the_command(tmp_path: Path) -> None:
+    (result,) = run_commands(
+        [
+            Command(
+                python("import time; print('started', flush=True); time.sleep(60)"),
+                str(tmp_path),
+                str(tmp_path / "sleep.log"),
+                timeout=1,
+            )
+        ]
+    )
+    assert result.timed_out
+    assert not result.ok
+    assert result.duration < 30
+    assert "started" in result.log()
+
+
+def test_commands_sharing_a_lock_run_one_at_a_time(tmp_path: Path) -> None:
+    results: list[CommandResult] = run_commands(
+        [
+            Command(
+                python(
+                    "import time; print(time.time()); time.sleep(0.5); print(time.time())"
+                ),
+                str(tmp_path),
+                str(tmp_path / f"{i}.log"),
+                lock="environment",
+            )
+            for i in range(2)
+        ],
+        max_concurrency=2,
+    )
+    intervals = sorted(tuple(map(float, result.log().split())) for result in results)
+    assert intervals[0][1] <= intervals[1][0]
+    assert all(result.ok for result in results)
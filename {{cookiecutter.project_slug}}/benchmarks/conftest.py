@@ -0,0 +1,17 @@
+# vim: set fileencoding=utf-8 :
+"""
+Lets the bench session always ask to compare against the last saved run, which
+pytest-benchmark refuses to do before the first run has been saved.
+"""
+import pathlib
+
+import pytest
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config: pytest.Config) -> None:
+    storage = str(config.getoption('benchmark_storage'))
+    storage = storage[len('file://') :] if storage.startswith('file://') else storage
+    if not any(pathlib.Path(storage).glob('*/*.json')):
+        config.option.benchmark_compare = None
+        config.option.benchmark_compare_fail = None
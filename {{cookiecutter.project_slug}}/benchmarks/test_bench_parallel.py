@@ -0,0 +1,31 @@
+# vim: set fileencoding=utf-8 :
+"""
+Scaling of parallel_map: the same CPU bound work with more and more workers,
+grouped together so that pytest-benchmark reports them side by side.
+"""
+import os
+from typing import List
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from {{cookiecutter.project_slug}}.parallel import parallel_map
+
+ITEMS: List[int] = [20000] * 256
+
+
+def burn(n: int) -> int:
+    """CPU bound work, about a millisecond of it"""
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+@pytest.mark.benchmark(group='parallel_map scaling')
+@pytest.mark.parametrize('jobs', sorted({1, 2, 4, os.cpu_count() or 1}))
+def test_parallel_map_scaling(benchmark: BenchmarkFixture, jobs: int) -> None:
+    results = benchmark.pedantic(
+        lambda: list(parallel_map(burn, ITEMS, jobs=jobs)), rounds=3
+    )
+    assert len(results) == len(ITEMS)
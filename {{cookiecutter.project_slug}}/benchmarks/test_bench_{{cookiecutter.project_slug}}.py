@@ -0,0 +1,40 @@
+# vim: set fileencoding=utf-8 :
+"""
+Benchmarks run by the bench session, which compares every run against the last
+saved one. Time a call with the ``benchmark`` fixture of pytest-benchmark.
+"""
+{%- if cookiecutter.command_line_interface == 'Click' %}
+
+from click.testing import CliRunner
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from {{cookiecutter.project_slug}}.cli import main
+
+
+def test_echo(benchmark: BenchmarkFixture) -> None:
+    runner = CliRunner()
+    result = benchmark(runner.invoke, main, ['echo', 'a', 'b'])
+    assert result.exit_code == 0
+{%- elif cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] %}
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from {{cookiecutter.project_slug}}.cli import main
+
+
+def test_echo(
+    benchmark: BenchmarkFixture, capsys: pytest.CaptureFixture[str]
+) -> None:
+    benchmark(main, ['echo', 'a', 'b'])
+    assert capsys.readouterr().out.startswith(repr(['a', 'b']))
+{%- else %}
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+
+def test_example(benchmark: BenchmarkFixture) -> None:
+    # Replace with benchmarks of the package.
+    result = benchmark(sorted, range(1000, 0, -1))
+    assert result[0] == 1
+{%- endif %}
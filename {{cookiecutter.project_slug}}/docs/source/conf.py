@@ -18,7 +18,11 @@
 # -- Project information -----------------------------------------------------
 
 project = "{{cookiecutter.project_name}}"
+{%- if '"' in cookiecutter.full_name %}
+author: str = '{{cookiecutter.full_name}}'
+{%- else %}
 author: str = "{{cookiecutter.full_name}}"
+{%- endif %}
 copyright = "{% now 'local', '%Y' %}, " + author
 
 # The full version, including alpha/beta/rc tags
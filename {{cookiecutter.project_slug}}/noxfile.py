@@ -1,8 +1,15 @@
 {%- if cookiecutter.test_automation_tool == "Nox" %}import nox
 from nox.sessions import Session
+{%- if cookiecutter.have_benchmarks == "y" %}
+import os
+{%- endif %}
 import pathlib
 
+{% if cookiecutter.have_tests == "y" and cookiecutter.parallel_tests == "y" -%}
+nox.options.sessions = ["test", "coverage", "docs"]
+{% else -%}
 nox.options.sessions = ["test", "docs"]
+{% endif -%}
 # nox.options.sessions = ["lint", "test"]
 
 nox.options.envdir = ".nox" if nox.options.envdir is None else nox.options.envdir
@@ -12,7 +19,64 @@ def test(session: Session):
     session.install('pytest')
     session.install('pytest-cov')
     session.install('hypothesis')
+{%- if cookiecutter.parallel_tests == "y" %}
+    session.install('pytest-xdist')
+{%- endif %}
+{%- if cookiecutter.command_line_interface == 'Click' %}
+    session.install('click')
+{%- endif %}
+{%- if cookiecutter.parallel_tests == "y" %}
+    # A data file per session, for the coverage session to combine.
+    session.run('pytest', env={'COVERAGE_FILE': f'.coverage.{session.name}'})
+{%- else %}
     session.run('pytest')
+{%- endif %}
+{%- if cookiecutter.have_tests == "y" and cookiecutter.parallel_tests == "y" %}
+
+@nox.session
+def coverage(session: Session):
+    session.install('coverage')
+    session.run('coverage', 'combine')
+    session.run('coverage', 'report')
+    session.run('coverage', 'html')
+{%- endif %}
+
+{%- if cookiecutter.command_line_interface != "None" %}
+
+@nox.session
+def startup(session: Session):
+    session.install('tomli; python_version < "3.11"')
+{%- if cookiecutter.command_line_interface == 'Click' %}
+    session.install('click')
+{%- endif %}
+    session.run('python', 'scripts/startup_budget.py', env={'PYTHONPATH': 'src'})
+{%- endif %}
+
+{%- if cookiecutter.have_benchmarks == "y" %}
+
+@nox.session
+def bench(session: Session):
+    session.install('pytest')
+    session.install('pytest-benchmark')
+{%- if cookiecutter.command_line_interface == 'Click' %}
+    session.install('click')
+{%- endif %}
+
+    # Every run is saved, and fails when its median time regresses more than
+    # the threshold against the last saved run.
+    storage = pathlib.Path(session.invoked_from) / nox.options.envdir / "benchmarks"
+    threshold = os.environ.get('BENCH_THRESHOLD', '10%')
+    session.run(
+        'pytest',
+        '-o', 'addopts=',
+        '-o', 'pythonpath=src',
+        'benchmarks',
+        f'--benchmark-storage={storage}',
+        '--benchmark-autosave',
+        '--benchmark-compare',
+        f'--benchmark-compare-fail=median:{threshold}',
+    )
+{%- endif %}
 
 @nox.session
 def docs(session: Session):
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+"""
+Measure how long the command line app takes to import its modules, running
+``python -X importtime -m {{cookiecutter.project_slug}} --help`` repeatedly, and
+fail when the median total exceeds the budget in pyproject.toml:
+
+    [tool.startup]
+    budget_ms = 150
+    runs = 10
+    top = 15
+
+The cumulative import time of the ``top`` slowest modules gets reported too.
+"""
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+COMMAND: List[str] = [
+    sys.executable,
+    '-X',
+    'importtime',
+    '-m',
+    '{{cookiecutter.project_slug}}',
+    '--help',
+]
+
+
+def parse_importtime(output: str) -> Tuple[Dict[str, int], int]:
+    """
+    Parse the output of -X importtime, returning the cumulative import time of
+    every module and the total, in microseconds
+    :param output: What the interpreter wrote to stderr.
+    """
+    cumulative: Dict[str, int] = {}
+    total = 0
+    for line in output.splitlines():
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        _, cumulative_us, name = line[len('import time:') :].split('|')
+        module = name.strip()
+        cumulative[module] = cumulative.get(module, 0) + int(cumulative_us)
+        # Nested imports are indented below the module importing them.
+        if not name[1:].startswith(' '):
+            total += int(cumulative_us)
+    return cumulative, total
+
+
+def measure(runs: int) -> Tuple[Dict[str, float], float]:
+    """
+    Import the app in fresh interpreters, returning the median cumulative
+    import time of every module and of the total, in milliseconds
+    :param runs: How many times to start the app, after a run warming up the
+        bytecode caches.
+    """
+    samples: List[Tuple[Dict[str, int], int]] = []
+    for run in range(runs + 1):
+        process = subprocess.run(
+            COMMAND,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        if run > 0:
+            samples.append(parse_importtime(process.stderr))
+
+    modules = {module for cumulative, _ in samples for module in cumulative}
+    medians = {
+        module: statistics.median(c.get(module, 0) for c, _ in samples) / 1000
+        for module in modules
+    }
+    return medians, statistics.median(total for _, total in samples) / 1000
+
+
+def main() -> int:
+    with open('pyproject.toml', 'rb') as pyproject:
+        config = tomllib.load(pyproject).get('tool', {}).get('startup', {})
+    budget = float(config.get('budget_ms', 150))
+    runs = int(config.get('runs', 10))
+    top = int(config.get('top', 15))
+
+    medians, total = measure(runs)
+    print(f"Median import time over {runs} runs of: {' '.join(COMMAND[1:])}")
+    print(f"{'cumulative':>12}  module")
+    for module, cumulative in sorted(
+        medians.items(), key=lambda item: item[1], reverse=True
+    )[:top]:
+        print(f"{cumulative:10.3f}ms  {module}")
+    print(f"Total {total:.3f}ms of a {budget:.3f}ms budget")
+
+    if total > budget:
+        print(f"Over budget by {total - budget:.3f}ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
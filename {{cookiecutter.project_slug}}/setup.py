@@ -14,6 +14,8 @@
     "MIT License": "License :: OSI Approved :: MIT License",
     "Apache 2.0 License": "License :: OSI Approved :: Apache Software License",
 } %}
+{#- parallel.py needs multiprocessing.shared_memory and math.prod, new in 3.8. #}
+{%- set min_minor = 8 if cookiecutter.have_parallel_map == "y" else 6 %}
 
 setup(
     classifiers=[
@@ -24,9 +26,9 @@
     {%- endif %}
         "Natural Language :: English",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
+    {%- for minor in range(min_minor, 9) %}
+        "Programming Language :: Python :: 3.{{ minor }}",
+    {%- endfor %}
     ],
 {%- if cookiecutter.license in license_classifiers %}
     license="{{ cookiecutter.license }}",
@@ -55,7 +57,7 @@
     package_dir={"": "src"},
     packages=find_packages("src"),
     py_modules=[splitext(basename(path))[0] for path in iglob("src/*.py")],
-    python_requires=">=3.6",
+    python_requires=">=3.{{ min_minor }}",
     url="",
     version="0.0.0",
     zip_safe=False,
@@ -0,0 +1,331 @@
+# vim: set fileencoding=utf-8 :
+"""
+Memoization, in memory for the length of a run and on disk across runs.
+
+memoize keeps the latest results of a function in memory, for a limited time
+if need be. persist keeps them in a DiskCache, a SQLite database keyed by a
+hash of the arguments and of the function's code, so that editing the function
+invalidates its results. The database evicts the least recently used results
+past a size limit.
+{%- if cookiecutter.command_line_interface != 'None' and cookiecutter.have_parallel_map == 'y' %}
+The digest command of the command line app keeps its digests there, and the
+--no-cache and --cache-dir options of the app bypass or move the default
+database.
+{%- endif %}
+"""
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from types import CodeType
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+#: Environment variable with the directory of the default DiskCache, which the
+#: --cache-dir option of the command line app sets.
+CACHE_DIR_ENV: str = '{{cookiecutter.project_slug|upper}}_CACHE_DIR'
+
+#: Environment variable bypassing the default DiskCache when set, which the
+#: --no-cache option of the command line app sets.
+NO_CACHE_ENV: str = '{{cookiecutter.project_slug|upper}}_NO_CACHE'
+
+#: Size limit of the default DiskCache, in bytes of pickled results.
+DEFAULT_MAX_BYTES: int = 256 * 1024 * 1024
+
+R = TypeVar('R')
+
+# Functions of any arguments: only the type of their result matters here.
+Function = Callable[..., R]  # type: ignore[explicit-any]
+
+
+class CacheInfo(NamedTuple):
+    """Counters of a cache since it got created, or cleared"""
+
+    hits: int
+    misses: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class Memoized(Generic[R]):
+    """A function keeping its latest results in memory, see memoize"""
+
+    def __init__(
+        self, func: Function[R], maxsize: Optional[int], ttl: Optional[float]
+    ) -> None:
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._results: 'OrderedDict[Hashable, Tuple[float, R]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = 0
+
+    def __call__(self, *args: Hashable, **kwargs: Hashable) -> R:
+        key = (args, tuple((name, kwargs[name]) for name in sorted(kwargs)))
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and (
+                self._ttl is None or time.monotonic() - cached[0] < self._ttl
+            ):
+                self._results.move_to_end(key)
+                self._hits += 1
+                return cached[1]
+            self._misses += 1
+
+        # Computed without the lock, for the function to call itself.
+        result = self._func(*args, **kwargs)
+        with self._lock:
+            self._results[key] = (time.monotonic(), result)
+            self._results.move_to_end(key)
+            while self._maxsize is not None and len(self._results) > self._maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        """The hits and misses, and the number of results kept"""
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._maxsize, len(self._results)
+            )
+
+    def cache_clear(self) -> None:
+        """Forget the results, and reset the counters"""
+        with self._lock:
+            self._results.clear()
+            self._hits = self._misses = 0
+
+
+def memoize(
+    maxsize: Optional[int] = 128, ttl: Optional[float] = None
+) -> Callable[[Function[R]], Memoized[R]]:
+    """
+    Decorator keeping the results of a function in memory, as
+    functools.lru_cache does, optionally for a limited time
+    :param maxsize: Results kept, evicting the least recently used first. None
+        keeps them all.
+    :param ttl: Seconds a result stays valid for, None for ever.
+    """
+
+    def decorator(func: Function[R]) -> Memoized[R]:
+        return Memoized(func, maxsize, ttl)
+
+    return decorator
+
+
+# Results by key, with their size and the order they were last used in.
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+'''
+
+
+class DiskCache:
+    """
+    Store of pickled results in a SQLite database, which processes can share
+    :param path: The database file, created along with its directory if need be.
+    :param max_bytes: Size of the results kept, evicting the least recently
+        used ones past it.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = self._misses = 0
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # Readers do not block the writer, nor the writer the readers.
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        self._connection.executescript(_SCHEMA)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """The result stored under a key, None if there is none"""
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                'SELECT value FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._connection.execute(
+                'UPDATE results SET used = (SELECT MAX(used) + 1 FROM results) '
+                'WHERE key = ?',
+                (key,),
+            )
+        value: bytes = row[0]
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store a result under a key, unless it is larger than max_bytes"""
+        if len(value) > self.max_bytes:
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO results (key, value, size, used) '
+                'VALUES (?, ?, ?, (SELECT COALESCE(MAX(used), 0) + 1 FROM results))',
+                (key, value, len(value)),
+            )
+            # The most recently used results that fit, and none of the others.
+            self._connection.execute(
+                '''
+                DELETE FROM results WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY used DESC) AS kept
+                        FROM results
+                    ) WHERE kept > ?
+                )
+                ''',
+                (self.max_bytes,),
+            )
+
+    def delete(self, key: str) -> None:
+        """Forget the result stored under a key, if any"""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM results WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        """Forget every result, and reset the counters"""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM results')
+            self._hits = self._misses = 0
+
+    def cache_info(self) -> CacheInfo:
+        """The hits and misses of this process, and the bytes stored"""
+        with self._lock:
+            (size,) = self._connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM results'
+            ).fetchone()
+            return CacheInfo(self._hits, self._misses, self.max_bytes, size)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def cache_dir() -> str:
+    """The directory of the default DiskCache: CACHE_DIR_ENV if set, the user's
+    cache directory if not"""
+    directory = os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        directory = os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+            '{{cookiecutter.project_slug}}',
+        )
+    return directory
+
+
+def cache_enabled() -> bool:
+    """Tell whether persisted functions use the cache, see NO_CACHE_ENV"""
+    return os.environ.get(NO_CACHE_ENV, '').lower() in ('', '0', 'false', 'no')
+
+
+#: The default DiskCache of every directory used so far, see default_cache.
+_caches: Dict[str, DiskCache] = {}
+
+
+def default_cache() -> DiskCache:
+    """The DiskCache in cache_dir, opened on first use"""
+    path = os.path.join(cache_dir(), 'results.sqlite3')
+    cache = _caches.get(path)
+    if cache is None:
+        cache = _caches[path] = DiskCache(path)
+    return cache
+
+
+def _code_parts(code: CodeType) -> Iterator[bytes]:
+    yield code.co_code
+    yield repr(code.co_names).encode()
+    for constant in code.co_consts:
+        if isinstance(constant, CodeType):
+            # Its repr holds its address, which changes from run to run.
+            yield from _code_parts(constant)
+        elif isinstance(constant, frozenset):
+            # Its order changes from run to run too, with the hash seed.
+            yield repr(sorted(map(repr, constant))).encode()
+        else:
+            yield repr(constant).encode()
+
+
+def code_version(func: Function[R]) -> str:
+    """
+    Hash of the bytecode of a function, nested functions included, changing
+    when its code does. Changes to the functions it calls are not seen.
+    """
+    digest = hashlib.sha256()
+    for part in _code_parts(func.__code__):
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class Persisted(Generic[R]):
+    """A function keeping its results on disk, see persist"""
+
+    def __init__(
+        self, func: Function[R], version: Optional[str], cache: Optional[DiskCache]
+    ) -> None:
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._cache = cache
+        self.version = version or code_version(func)
+
+    def key(self, *args: object, **kwargs: object) -> str:
+        """The key of the result of a call in the DiskCache"""
+        digest = hashlib.sha256(
+            f'{self._func.__module__}.{self._func.__qualname__}\0{self.version}\0'.encode()
+        )
+        arguments = (args, [(name, kwargs[name]) for name in sorted(kwargs)])
+        # A fixed protocol, for the same arguments to give the same key later.
+        digest.update(pickle.dumps(arguments, protocol=4))
+        return digest.hexdigest()
+
+    def __call__(self, *args: object, **kwargs: object) -> R:
+        if not cache_enabled():
+            return self._func(*args, **kwargs)
+        cache = self._cache or default_cache()
+        key = self.key(*args, **kwargs)
+        stored = cache.get(key)
+        if stored is not None:
+            cached: R = pickle.loads(stored)
+            return cached
+        result = self._func(*args, **kwargs)
+        cache.set(key, pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        return result
+
+
+def persist(
+    version: Optional[str] = None, cache: Optional[DiskCache] = None
+) -> Callable[[Function[R]], Persisted[R]]:
+    """
+    Decorator keeping the results of a function on disk, from one run to the
+    next. The arguments and results must pickle, the arguments to the same
+    bytes every time they are equal: strings, numbers, tuples of them...
+    :param version: Version of the function's results, invalidating the stored
+        ones when it changes. By default the hash of its code, see code_version.
+    :param cache: The DiskCache to keep them in, by default default_cache at the
+        time of the call.
+    """
+
+    def decorator(func: Function[R]) -> Persisted[R]:
+        return Persisted(func, version, cache)
+
+    return decorator
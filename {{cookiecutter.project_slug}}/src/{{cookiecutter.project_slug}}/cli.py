@@ -16,38 +16,330 @@
 
   Also see (1) from http://click.pocoo.org/5/setuptools/#setuptools-integration
 """
+{#- The cache options only have an effect on the digest command, which caches
+    the digests it computes. #}
+{%- set cached_commands = cookiecutter.have_cache == 'y' and cookiecutter.have_parallel_map == 'y' %}
 {%- if cookiecutter.command_line_interface == 'Click' %}
-from typing import Tuple
+import importlib
+{%- if cookiecutter.have_parallel_map == 'y' %}
+import os
+{%- endif %}
+from typing import Dict, List, Optional, Tuple
 
 import click
+from click.shell_completion import CompletionItem
 {%- elif cookiecutter.command_line_interface == 'Argparse' %}
 import argparse
-from typing import Optional, Sequence
+import importlib
+import os
+from typing import Callable, Dict, Optional, Sequence, Tuple
+{%- elif cookiecutter.command_line_interface == 'Asyncio' %}
+import argparse
+import importlib
+import os
+import sys
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+{%- endif %}
+
+#: The subcommands by name, as the module defining the command in its ``main``
+#: and its short help. A module only gets imported when its command runs, so
+#: ``--help`` and shell completion do not pay for importing every command.
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    'echo': ('{{cookiecutter.project_slug}}.commands.echo', 'Print the arguments.'),
+    'stream': (
+        '{{cookiecutter.project_slug}}.commands.stream',
+        'Stream files or stdin to stdout.',
+    ),
+{%- if cookiecutter.command_line_interface == 'Asyncio' %}
+    'run': ('{{cookiecutter.project_slug}}.commands.run', 'Run commands concurrently.'),
 {%- endif %}
+{%- if cookiecutter.have_parallel_map == 'y' %}
+    'digest': (
+        '{{cookiecutter.project_slug}}.commands.digest',
+        'Print the SHA-256 digests of files.',
+    ),
+{%- endif %}
+}
 
 
 {%- if cookiecutter.command_line_interface == 'Click' %}
 
 
-@click.command()
-@click.argument('args', nargs=-1)
-def main(args: Tuple[str]) -> None:
-    click.echo(repr(args))
-{%- elif cookiecutter.command_line_interface == 'Argparse' %}
+class LazyGroup(click.Group):
+    """Group resolving its subcommands from COMMANDS once they are invoked"""
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted(COMMANDS)
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in COMMANDS:
+            return None
+        module_name, _ = COMMANDS[cmd_name]
+        command: click.Command = importlib.import_module(module_name).main
+        return command
+
+    def format_commands(
+        self, ctx: click.Context, formatter: click.HelpFormatter
+    ) -> None:
+        with formatter.section('Commands'):
+            formatter.write_dl(
+                [(name, COMMANDS[name][1]) for name in self.list_commands(ctx)]
+            )
+
+    # CompletionItem counts as explicit Any, for its __getattr__.
+    def shell_complete(  # type: ignore[explicit-any]
+        self, ctx: click.Context, incomplete: str
+    ) -> List[CompletionItem]:
+        items = [
+            CompletionItem(name, help=short_help)
+            for name, (_, short_help) in sorted(COMMANDS.items())
+            if name.startswith(incomplete)
+        ]
+        items.extend(click.Command.shell_complete(self, ctx, incomplete))
+        return items
+
+
+@click.group(cls=LazyGroup)
+@click.option(
+    '--profile',
+    metavar='FILE',
+    envvar='{{cookiecutter.project_slug|upper}}_PROFILE',
+    help='Profile the run with cProfile, writing the stats to FILE.',
+)
+@click.option(
+    '--trace-malloc',
+    metavar='N',
+    type=int,
+    default=0,
+    envvar='{{cookiecutter.project_slug|upper}}_TRACE_MALLOC',
+    help='Trace the memory allocations, printing the top N sites.',
+)
+@click.option(
+    '--sample',
+    metavar='FILE',
+    envvar='{{cookiecutter.project_slug|upper}}_SAMPLE',
+    help='Sample the stack, writing collapsed stacks for flame graphs to FILE.',
+)
+{%- if cookiecutter.have_parallel_map == 'y' %}
+@click.option(
+    '--jobs',
+    metavar='N',
+    type=click.IntRange(min=1),
+    envvar='{{cookiecutter.project_slug|upper}}_JOBS',
+    help='Worker processes of the parallel commands, by default the CPU count.',
+)
+{%- endif %}
+{%- if cached_commands %}
+@click.option(
+    '--no-cache',
+    is_flag=True,
+    envvar='{{cookiecutter.project_slug|upper}}_NO_CACHE',
+    help='Recompute the results cached on disk rather than reuse them.',
+)
+@click.option(
+    '--cache-dir',
+    metavar='DIR',
+    envvar='{{cookiecutter.project_slug|upper}}_CACHE_DIR',
+    help='Directory of the cache on disk, by default in ~/.cache.',
+)
+{%- endif %}
+@click.pass_context
+def main(
+    ctx: click.Context,
+    profile: Optional[str],
+    trace_malloc: int,
+    sample: Optional[str],
+{%- if cookiecutter.have_parallel_map == 'y' %}
+    jobs: Optional[int],
+{%- endif %}
+{%- if cached_commands %}
+    no_cache: bool,
+    cache_dir: Optional[str],
+{%- endif %}
+) -> None:
+    """My python package."""
+{%- if cookiecutter.have_parallel_map == 'y' %}
+    if jobs:
+        # Where parallel_map looks for it, read by commands and workers alike.
+        os.environ['{{cookiecutter.project_slug|upper}}_JOBS'] = str(jobs)
+{%- endif %}
+{%- if cached_commands %}
+    # Where the persisted functions look for them, see cache.default_cache.
+    if no_cache:
+        os.environ['{{cookiecutter.project_slug|upper}}_NO_CACHE'] = '1'
+    if cache_dir:
+        os.environ['{{cookiecutter.project_slug|upper}}_CACHE_DIR'] = cache_dir
+{%- endif %}
+    if profile or trace_malloc or sample:
+        # Imported only when asked for, so other runs do not pay for it.
+        from {{cookiecutter.project_slug}}.profiling import profiled
+
+        ctx.with_resource(profiled(profile, trace_malloc, sample))
+{%- elif cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] %}
+
+
+def _non_negative_int(value: str) -> int:
+    """An integer of at least 0, for the type of an argument"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(f'{value!r} is not a non-negative integer')
+    return number
+{%- if cookiecutter.have_parallel_map == 'y' %}
+
+
+def _positive_int(value: str) -> int:
+    """An integer of at least 1, for the type of an argument"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'{value!r} is not a positive integer')
+    return number
+{%- endif %}
+
 
 def _construct_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(description='My python package.')
+    parser = argparse.ArgumentParser(
+        description='My python package.',
+        epilog='commands:\n'
+        + ''.join(
+            f'  {name:<10}{short_help}\n'
+            for name, (_, short_help) in sorted(COMMANDS.items())
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
     parser.add_argument(
-        'args',
-        metavar='Arguments',
-        nargs=argparse.ZERO_OR_MORE,
-        help="Command line Arguments.",
+        '--profile',
+        metavar='FILE',
+        default=os.environ.get('{{cookiecutter.project_slug|upper}}_PROFILE'),
+        help='Profile the run with cProfile, writing the stats to FILE.',
+    )
+    parser.add_argument(
+        '--trace-malloc',
+        metavar='N',
+        type=_non_negative_int,
+        # A string, which argparse converts and reports the errors of.
+        default=os.environ.get('{{cookiecutter.project_slug|upper}}_TRACE_MALLOC', '0'),
+        help='Trace the memory allocations, printing the top N sites.',
+    )
+    parser.add_argument(
+        '--sample',
+        metavar='FILE',
+        default=os.environ.get('{{cookiecutter.project_slug|upper}}_SAMPLE'),
+        help='Sample the stack, writing collapsed stacks for flame graphs to FILE.',
+    )
+{%- if cookiecutter.have_parallel_map == 'y' %}
+    parser.add_argument(
+        '--jobs',
+        metavar='N',
+        type=_positive_int,
+        help='Worker processes of the parallel commands, by default '
+        '{{cookiecutter.project_slug|upper}}_JOBS or the CPU count.',
+    )
+{%- endif %}
+{%- if cached_commands %}
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Recompute the results cached on disk rather than reuse them.',
+    )
+    parser.add_argument(
+        '--cache-dir',
+        metavar='DIR',
+        help='Directory of the cache on disk, by default '
+        '{{cookiecutter.project_slug|upper}}_CACHE_DIR or in ~/.cache.',
+    )
+{%- endif %}
+    parser.add_argument(
+        'command', metavar='COMMAND', choices=sorted(COMMANDS), help='See below.'
+    )
+    # Everything after the command is the command's to parse, options included,
+    # while unknown options before it are errors.
+    parser.add_argument(
+        'args', metavar='ARGS', nargs=argparse.REMAINDER, help='See COMMAND --help.'
     )
     return parser
+{%- endif %}
+{%- if cookiecutter.command_line_interface == 'Argparse' %}
 
 
 def main(args: Optional[Sequence[str]] = None) -> None:
-    print(_construct_parser().parse_args(args=args).args)
+    parser = _construct_parser()
+    options = parser.parse_args(args=args)
+{%- if cookiecutter.have_parallel_map == 'y' %}
+    if options.jobs:
+        # Where parallel_map looks for it, read by commands and workers alike.
+        os.environ['{{cookiecutter.project_slug|upper}}_JOBS'] = str(options.jobs)
+{%- endif %}
+{%- if cached_commands %}
+    # Where the persisted functions look for them, see cache.default_cache.
+    if options.no_cache:
+        os.environ['{{cookiecutter.project_slug|upper}}_NO_CACHE'] = '1'
+    if options.cache_dir:
+        os.environ['{{cookiecutter.project_slug|upper}}_CACHE_DIR'] = options.cache_dir
+{%- endif %}
+    module_name, _ = COMMANDS[options.command]
+    command: Callable[[Sequence[str], str], None] = importlib.import_module(
+        module_name
+    ).main
+    if options.profile or options.trace_malloc or options.sample:
+        # Imported only when asked for, so other runs do not pay for it.
+        from {{cookiecutter.project_slug}}.profiling import profiled
+
+        with profiled(options.profile, options.trace_malloc, options.sample):
+            command(options.args, f'{parser.prog} {options.command}')
+    else:
+        command(options.args, f'{parser.prog} {options.command}')
+{%- elif cookiecutter.command_line_interface == 'Asyncio' %}
+
+
+#: The main of a command: a coroutine function, or a plain function for the
+#: commands with nothing to await.
+Command = Callable[[Sequence[str], str], Optional[Awaitable[None]]]
+
+
+def _invoke(command: Command, args: Sequence[str], prog: str) -> None:
+    awaitable = command(args, prog)
+    if awaitable is not None:
+        from {{cookiecutter.project_slug}}.tasks import run
+
+        run(awaitable)
+
+
+def main(args: Optional[Sequence[str]] = None) -> None:
+    parser = _construct_parser()
+    options = parser.parse_args(args=args)
+{%- if cookiecutter.have_parallel_map == 'y' %}
+    if options.jobs:
+        # Where parallel_map looks for it, read by commands and workers alike.
+        os.environ['{{cookiecutter.project_slug|upper}}_JOBS'] = str(options.jobs)
+{%- endif %}
+{%- if cached_commands %}
+    # Where the persisted functions look for them, see cache.default_cache.
+    if options.no_cache:
+        os.environ['{{cookiecutter.project_slug|upper}}_NO_CACHE'] = '1'
+    if options.cache_dir:
+        os.environ['{{cookiecutter.project_slug|upper}}_CACHE_DIR'] = options.cache_dir
+{%- endif %}
+    module_name, _ = COMMANDS[options.command]
+    command: Command = importlib.import_module(module_name).main
+    prog = f'{parser.prog} {options.command}'
+    try:
+        if options.profile or options.trace_malloc or options.sample:
+            # Imported only when asked for, so other runs do not pay for it.
+            from {{cookiecutter.project_slug}}.profiling import profiled
+
+            with profiled(options.profile, options.trace_malloc, options.sample):
+                _invoke(command, options.args, prog)
+        else:
+            _invoke(command, options.args, prog)
+    except KeyboardInterrupt:
+        # The command got cancelled and cleaned up, see tasks.run.
+        sys.exit(130)
 {%- endif %}
 
 
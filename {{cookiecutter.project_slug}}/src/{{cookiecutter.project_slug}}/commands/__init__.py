@@ -0,0 +1,7 @@
+"""
+The subcommands of the command line app, one module per command.
+
+A command module defines the command in its ``main`` and gets registered in
+``COMMANDS`` of the cli module, which only imports it once the command runs.
+Keep heavy imports in the command modules rather than in the cli module.
+"""
@@ -0,0 +1,95 @@
+# vim: set fileencoding=utf-8 :
+"""
+The ``digest`` command, printing the SHA-256 digests of files hashed in
+parallel by :mod:`{{cookiecutter.project_slug}}.parallel`, the starting point
+for commands spreading CPU bound work over the cores.
+{%- if cookiecutter.have_cache == 'y' %}
+
+The digests are kept in the cache of :mod:`{{cookiecutter.project_slug}}.cache`
+and reused while the files keep their size and modification time, which the
+--no-cache and --cache-dir options of the app control.
+{%- endif %}
+"""
+{%- if cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] %}
+import argparse
+{%- endif %}
+import hashlib
+{%- if cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] or cookiecutter.have_cache == 'y' %}
+import os
+{%- endif %}
+{%- if cookiecutter.command_line_interface == 'Click' %}
+from typing import Tuple
+
+import click
+{%- else %}
+from typing import Optional, Sequence
+{%- endif %}
+
+{% if cookiecutter.have_cache == 'y' -%}
+from {{cookiecutter.project_slug}}.cache import persist
+{% endif -%}
+from {{cookiecutter.project_slug}}.mapped import map_stream
+from {{cookiecutter.project_slug}}.parallel import parallel_map
+from {{cookiecutter.project_slug}}.streams import read_chunks
+
+
+def file_digest(path: str) -> str:
+    """The SHA-256 digest of a file, hashed straight from its mapping"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stream, map_stream(stream) as mapping:
+        if mapping is not None:
+            digest.update(mapping)
+        else:
+            for chunk in read_chunks(stream):
+                digest.update(chunk)
+    return digest.hexdigest()
+{%- if cookiecutter.have_cache == 'y' %}
+
+
+@persist()
+def _stat_digest(path: str, size: int, mtime_ns: int) -> str:
+    # The size and modification time are only there for the key to change
+    # along with the file.
+    return file_digest(path)
+
+
+def cached_file_digest(path: str) -> str:
+    """file_digest, reused from the cache while the file stays the same"""
+    stat = os.stat(path)
+    return _stat_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+{%- set digest_of = 'cached_file_digest' %}
+{%- else %}
+{%- set digest_of = 'file_digest' %}
+{%- endif %}
+{%- if cookiecutter.command_line_interface == 'Click' %}
+
+
+@click.command()
+@click.argument('paths', nargs=-1, type=click.Path(exists=True, dir_okay=False))
+def main(paths: Tuple[str, ...]) -> None:
+    """Print the SHA-256 digests of files, hashed in parallel."""
+    for path, digest in zip(paths, parallel_map({{ digest_of }}, paths)):
+        click.echo(f'{digest}  {path}')
+{%- else %}
+
+
+def _construct_parser(prog: Optional[str] = None) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog=prog, description='Print the SHA-256 digests of files, hashed in parallel.'
+    )
+    parser.add_argument(
+        'paths', metavar='PATH', nargs=argparse.ZERO_OR_MORE, help='Files to hash.'
+    )
+    return parser
+
+
+def main(args: Optional[Sequence[str]] = None, prog: Optional[str] = None) -> None:
+    parser = _construct_parser(prog)
+    paths = parser.parse_args(args=args).paths
+    # Checked up front, as click.Path does: a worker would only fail later.
+    for path in paths:
+        if not os.path.isfile(path):
+            parser.error(f'argument PATH: {path!r} is not a file')
+    for path, digest in zip(paths, parallel_map({{ digest_of }}, paths)):
+        print(f'{digest}  {path}')
+{%- endif %}
@@ -0,0 +1,34 @@
+# vim: set fileencoding=utf-8 :
+"""
+The ``echo`` command, printing its arguments.
+"""
+{%- if cookiecutter.command_line_interface == 'Click' %}
+from typing import Tuple
+
+import click
+
+
+@click.command()
+@click.argument('args', nargs=-1)
+def main(args: Tuple[str, ...]) -> None:
+    """Print the arguments."""
+    click.echo(repr(args))
+{%- elif cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] %}
+import argparse
+from typing import Optional, Sequence
+
+
+def _construct_parser(prog: Optional[str] = None) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog=prog, description='Print the arguments.')
+    parser.add_argument(
+        'args',
+        metavar='Arguments',
+        nargs=argparse.ZERO_OR_MORE,
+        help="Command line Arguments.",
+    )
+    return parser
+
+
+def main(args: Optional[Sequence[str]] = None, prog: Optional[str] = None) -> None:
+    print(_construct_parser(prog).parse_args(args=args).args)
+{%- endif %}
@@ -0,0 +1,68 @@
+# vim: set fileencoding=utf-8 :
+"""
+The ``run`` command, running shell commands concurrently through
+:mod:`{{cookiecutter.project_slug}}.tasks` and reporting how each one exited,
+the starting point for commands fanning out I/O bound work.
+"""
+import argparse
+import asyncio
+import sys
+from functools import partial
+from typing import Optional, Sequence
+
+from {{cookiecutter.project_slug}}.tasks import DEFAULT_LIMIT, gather_bounded
+
+
+async def run_shell(command: str) -> int:
+    """Run a shell command, killing it when cancelled, and return its status"""
+    process = await asyncio.create_subprocess_shell(command)
+    try:
+        return await process.wait()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+
+def _construct_parser(prog: Optional[str] = None) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog=prog, description='Run shell commands concurrently.'
+    )
+    parser.add_argument(
+        'commands', metavar='COMMAND', nargs=argparse.ONE_OR_MORE, help='Commands.'
+    )
+    parser.add_argument(
+        '--jobs',
+        metavar='N',
+        type=int,
+        default=DEFAULT_LIMIT,
+        help='Commands to run at the same time (default: %(default)s).',
+    )
+    parser.add_argument(
+        '--timeout',
+        metavar='SECONDS',
+        type=float,
+        help='Kill the commands still running after SECONDS.',
+    )
+    return parser
+
+
+async def main(
+    args: Optional[Sequence[str]] = None, prog: Optional[str] = None
+) -> None:
+    options = _construct_parser(prog).parse_args(args=args)
+    statuses = await gather_bounded(
+        [partial(run_shell, command) for command in options.commands],
+        limit=options.jobs,
+        timeout=options.timeout,
+    )
+    for command, status in zip(options.commands, statuses):
+        if isinstance(status, asyncio.TimeoutError):
+            print(f'timeout\t{command}')
+        elif isinstance(status, Exception):
+            print(f'{type(status).__name__}: {status}\t{command}')
+        else:
+            print(f'{status}\t{command}')
+    if any(status != 0 for status in statuses):
+        sys.exit(1)
@@ -0,0 +1,138 @@
+# vim: set fileencoding=utf-8 :
+"""
+The ``stream`` command, reading files or stdin through the input pipeline of
+:mod:`{{cookiecutter.project_slug}}.streams` and writing them to stdout. Memory
+use stays flat however large the inputs, and files are memory-mapped rather
+than copied, making it the starting point for commands processing them:
+replace ``process``.
+"""
+{%- if cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] %}
+import argparse
+{%- endif %}
+import sys
+{%- if cookiecutter.command_line_interface == 'Click' %}
+from typing import Iterable, Iterator, Tuple
+
+import click
+{%- elif cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] %}
+from typing import Iterable, Iterator, Optional, Sequence
+{%- endif %}
+
+from {{cookiecutter.project_slug}}.streams import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_DEPTH,
+    Buffer,
+    read_inputs,
+)
+
+
+def process(items: Iterable[Buffer]) -> Iterator[Buffer]:
+    """The processing stage of the pipeline, passing every chunk or line on"""
+    yield from items
+{%- if cookiecutter.command_line_interface == 'Click' %}
+
+
+@click.command()
+@click.argument('inputs', metavar='[PATH|-]...', nargs=-1)
+@click.option(
+    '--lines', is_flag=True, help='Read the inputs line by line, not in chunks.'
+)
+@click.option(
+    '--chunk-size',
+    type=click.IntRange(min=1),
+    default=DEFAULT_CHUNK_SIZE,
+    show_default=True,
+    help='Bytes to read at a time, and the longest line.',
+)
+@click.option(
+    '--buffer',
+    'depth',
+    type=click.IntRange(min=0),
+    default=DEFAULT_DEPTH,
+    show_default=True,
+    help='Chunks to read ahead of the processing, 0 to not read ahead.',
+)
+@click.option(
+    '--no-mmap',
+    is_flag=True,
+    help='Read files like stdin rather than memory-mapping them.',
+)
+def main(
+    inputs: Tuple[str, ...], lines: bool, chunk_size: int, depth: int, no_mmap: bool
+) -> None:
+    """Stream files, or stdin for - or no file, to stdout."""
+    output = sys.stdout.buffer
+    items = read_inputs(inputs, lines, chunk_size, depth, use_mmap=not no_mmap)
+    for item in process(items):
+        output.write(item)
+    output.flush()
+{%- elif cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] %}
+
+
+def _non_negative(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f'{value} is negative')
+    return number
+
+
+def _positive(value: str) -> int:
+    number = _non_negative(value)
+    if number == 0:
+        raise argparse.ArgumentTypeError(f'{value} is not positive')
+    return number
+
+
+def _construct_parser(prog: Optional[str] = None) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog=prog, description='Stream files, or stdin for - or no file, to stdout.'
+    )
+    parser.add_argument(
+        'inputs',
+        metavar='PATH|-',
+        nargs=argparse.ZERO_OR_MORE,
+        help='Files to read, - for stdin.',
+    )
+    parser.add_argument(
+        '--lines',
+        action='store_true',
+        help='Read the inputs line by line, not in chunks.',
+    )
+    parser.add_argument(
+        '--chunk-size',
+        metavar='BYTES',
+        type=_positive,
+        default=DEFAULT_CHUNK_SIZE,
+        help='Bytes to read at a time, and the longest line (default: %(default)s).',
+    )
+    parser.add_argument(
+        '--buffer',
+        dest='depth',
+        metavar='N',
+        type=_non_negative,
+        default=DEFAULT_DEPTH,
+        help='Chunks to read ahead of the processing, 0 to not read ahead '
+        '(default: %(default)s).',
+    )
+    parser.add_argument(
+        '--no-mmap',
+        action='store_true',
+        help='Read files like stdin rather than memory-mapping them.',
+    )
+    return parser
+
+
+def main(args: Optional[Sequence[str]] = None, prog: Optional[str] = None) -> None:
+    options = _construct_parser(prog).parse_args(args=args)
+    output = sys.stdout.buffer
+    items = read_inputs(
+        options.inputs,
+        options.lines,
+        options.chunk_size,
+        options.depth,
+        use_mmap=not options.no_mmap,
+    )
+    for item in process(items):
+        output.write(item)
+    output.flush()
+{%- endif %}
@@ -0,0 +1,74 @@
+# vim: set fileencoding=utf-8 :
+"""
+Zero-copy input of the command line app: regular files get memory-mapped and
+handed out as memoryview slices of the mapping, so reading them copies
+nothing, the pages being loaded by the OS as they are accessed.
+
+Pipes, stdin and other streams cannot be mapped, map_stream tells them apart
+so that they can be streamed with :mod:`{{cookiecutter.project_slug}}.streams`
+instead.
+"""
+import mmap
+import os
+import stat
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+#: Bytes per slice, and the longest record.
+DEFAULT_SLICE_SIZE: int = 1024 * 1024
+
+
+@contextmanager
+def map_stream(stream: BinaryIO) -> Iterator[Optional[mmap.mmap]]:
+    """
+    Map an open file read only, None when it is not a regular file or is empty,
+    neither of which can be mapped. Views of the mapping still held when the
+    block exits keep it open until they are gone.
+    """
+    try:
+        info = os.fstat(stream.fileno())
+    except (AttributeError, OSError, ValueError):
+        # Streams without a file descriptor, e.g. io.BytesIO.
+        info = None
+    if info is None or not stat.S_ISREG(info.st_mode) or info.st_size == 0:
+        yield None
+        return
+
+    mapping = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield mapping
+    finally:
+        try:
+            mapping.close()
+        except BufferError:
+            pass  # Closed by the garbage collector once the views are gone.
+
+
+def iter_slices(
+    mapping: mmap.mmap, size: int = DEFAULT_SLICE_SIZE
+) -> Iterator[memoryview]:
+    """Slice a mapping into views of at most size bytes, without copying"""
+    with memoryview(mapping) as view:
+        for start in range(0, len(view), size):
+            yield view[start : start + size]
+
+
+def iter_records(
+    mapping: mmap.mmap,
+    separator: bytes = b'\n',
+    max_length: int = DEFAULT_SLICE_SIZE,
+) -> Iterator[memoryview]:
+    """
+    Split a mapping into records ending with the separator, as views of at
+    most max_length bytes: longer records come in pieces
+    :param mapping: The mapping, see map_stream.
+    :param separator: The bytes ending every record, kept in the views.
+    :param max_length: The longest view, at least as long as the separator.
+    """
+    with memoryview(mapping) as view:
+        start, size = 0, len(view)
+        while start < size:
+            end = mapping.find(separator, start, start + max_length)
+            end = start + max_length if end < 0 else end + len(separator)
+            yield view[start:end]
+            start = end
@@ -0,0 +1,169 @@
+# vim: set fileencoding=utf-8 :
+"""
+Parallel map over a pool of worker processes, for CPU bound work.
+
+parallel_map sends the items to the workers in chunks, streams the results
+back, in order or as they come, and raises a worker's error in the caller
+with the worker's traceback. Large array-like payloads should not be pickled
+along with every item: share copies them into shared memory once, and the
+workers read them through the handle it returns.
+"""
+import math
+import multiprocessing
+import os
+import struct
+import traceback
+from contextlib import contextmanager
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+if TYPE_CHECKING:
+    from _typeshed import ReadableBuffer
+
+#: Environment variable with the default number of worker processes, which
+#: the --jobs option of the command line app sets.
+JOBS_ENV: str = '{{cookiecutter.project_slug|upper}}_JOBS'
+
+#: Items per chunk when the number of items is not known in advance.
+DEFAULT_CHUNKSIZE: int = 32
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class ParallelError(Exception):
+    """An item failed in a worker, the message ending with its traceback"""
+
+
+def default_jobs() -> int:
+    """The number of worker processes: JOBS_ENV if set, the CPU count if not"""
+    return int(os.environ.get(JOBS_ENV) or 0) or os.cpu_count() or 1
+
+
+def _guarded(func: Callable[[T], R], item: T) -> Tuple[Optional[R], Optional[str]]:
+    # Errors travel back as text: not every exception survives pickling.
+    try:
+        return func(item), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def _failed(func: Callable[[T], R], error: str) -> ParallelError:
+    return ParallelError(f'{func.__name__} failed in a worker:\n{error}')
+
+
+def parallel_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    jobs: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    ordered: bool = True,
+    initializer: Optional[Callable[[], None]] = None,
+) -> Generator[R, None, None]:
+    """
+    Apply func to every item in worker processes, yielding the results as
+    they are ready. Stopping early, or an error, terminates the workers.
+    :param func: Function of an item, picklable: defined at a module's top level.
+    :param items: The items, picklable too. They are all sent to the workers
+        up front, only the results are streamed.
+    :param jobs: Number of worker processes, see default_jobs. With a single
+        job everything runs in the calling process.
+    :param chunksize: Items sent to a worker at a time, by default a quarter
+        of the items per worker when they can be counted.
+    :param ordered: Yield the results in the order of the items, rather than
+        as soon as they are ready.
+    :param initializer: Function every worker calls once when it starts, e.g.
+        to load what every item needs. Bind it its arguments with
+        functools.partial.
+    :raises ParallelError: When func raises, for the first failed item, with a
+        single job too.
+    """
+    jobs = jobs or default_jobs()
+    if jobs == 1:
+        if initializer is not None:
+            initializer()
+        for item in items:
+            result, error = _guarded(func, item)
+            if error is not None:
+                raise _failed(func, error)
+            yield result  # type: ignore[misc]
+        return
+
+    if chunksize is None:
+        if isinstance(items, Sequence):
+            chunksize = max(1, math.ceil(len(items) / (jobs * 4)))
+        else:
+            chunksize = DEFAULT_CHUNKSIZE
+
+    with multiprocessing.Pool(jobs, initializer) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for result, error in imap(partial(_guarded, func), items, chunksize):
+            if error is not None:
+                raise _failed(func, error)
+            yield result  # type: ignore[misc]
+
+
+#: Segments attached in this process, kept open for their views to stay valid.
+_attached: Dict[str, SharedMemory] = {}
+
+
+def _buffer(memory: SharedMemory) -> memoryview:
+    assert memory.buf is not None, 'closed'
+    return memory.buf
+
+
+class SharedArray(NamedTuple):
+    """Picklable handle of an array shared with the workers, see share"""
+
+    name: str
+    format: str
+    shape: Tuple[int, ...]
+
+    def view(self) -> memoryview:
+        """The array, without copying it, shaped and typed as it was shared"""
+        memory = _attached.get(self.name)
+        if memory is None:
+            memory = _attached[self.name] = SharedMemory(self.name)
+        size = struct.calcsize(self.format) * math.prod(self.shape)
+        # Typeshed only knows of formats given as literals.
+        view: memoryview = _buffer(memory)[:size].cast(  # type: ignore[call-overload]
+            self.format, self.shape
+        )
+        return view
+
+
+@contextmanager
+def share(data: 'ReadableBuffer') -> Iterator[SharedArray]:
+    """
+    Copy an array-like payload into shared memory for the workers, freeing it
+    when the block exits
+    :param data: Any C-contiguous buffer of a native format: bytes, an
+        array.array, a numpy array...
+    """
+    source = memoryview(data)
+    memory = SharedMemory(create=True, size=max(source.nbytes, 1))
+    try:
+        _buffer(memory)[: source.nbytes] = source.cast('B')
+        yield SharedArray(memory.name, source.format, source.shape or ())
+    finally:
+        attached = _attached.pop(memory.name, None)
+        for segment in (attached, memory):
+            try:
+                if segment is not None:
+                    segment.close()
+            except BufferError:
+                pass  # Closed by the garbage collector once the views are gone.
+        memory.unlink()
@@ -0,0 +1,134 @@
+# vim: set fileencoding=utf-8 :
+"""
+Ways to see where a run of the command line app spends its time or memory,
+enabled through its --profile, --trace-malloc and --sample options.
+
+The cli module only imports this module when one of them is given, so runs
+without them pay nothing for it.
+"""
+import cProfile
+import collections
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from types import FrameType
+from typing import Counter, Iterator, List, Optional, TextIO
+
+
+@contextmanager
+def cprofiled(path: str) -> Iterator[None]:
+    """Profile the block with cProfile, writing the stats to a .pstats file"""
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+        print(f"Profile written to {path}, see python -m pstats {path}", file=sys.stderr)
+
+
+@contextmanager
+def malloc_traced(top: int, stream: TextIO = sys.stderr) -> Iterator[None]:
+    """Trace the memory allocations of the block, reporting the top sites"""
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        tracemalloc.stop()
+        print(f"Top {top} allocation sites:", file=stream)
+        for statistic in snapshot.statistics('lineno')[:top]:
+            print(f"  {statistic}", file=stream)
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the stack of a thread from a background thread, counting how
+    often each stack is seen, as collapsed stacks for flame graph tools
+    """
+
+    def __init__(
+        self, interval: float = 0.001, thread_id: Optional[int] = None
+    ) -> None:
+        """
+        :param interval: Seconds between two samples.
+        :param thread_id: The thread to sample, the current one by default.
+        """
+        self.interval = interval
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.stacks: Counter[str] = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame: Optional[FrameType] = sys._current_frames().get(self.thread_id)
+            names: List[str] = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def write(self, stream: TextIO) -> None:
+        """Write the stacks in the collapsed format, one ``stack count`` a line"""
+        for stack, count in sorted(self.stacks.items()):
+            stream.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def sampled(path: str, interval: float = 0.001) -> Iterator[None]:
+    """Sample the stack during the block, writing collapsed stacks to a file"""
+    sampler = StackSampler(interval)
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        with open(path, 'w', encoding='utf-8') as stream:
+            sampler.write(stream)
+        print(
+            f"{sum(sampler.stacks.values())} stack samples written to {path}, "
+            "see flamegraph.pl or https://www.speedscope.app",
+            file=sys.stderr,
+        )
+
+
+@contextmanager
+def profiled(
+    profile: Optional[str] = None,
+    trace_malloc: int = 0,
+    sample: Optional[str] = None,
+) -> Iterator[None]:
+    """
+    Run the block under every profiler asked for
+    :param profile: Path of the .pstats file to write a cProfile profile to.
+    :param trace_malloc: How many of the top allocation sites to report.
+    :param sample: Path of the file to write sampled collapsed stacks to.
+    """
+    with ExitStack() as stack:
+        # Innermost last, so each one's own work stays out of the next.
+        if sample:
+            stack.enter_context(sampled(sample))
+        if profile:
+            stack.enter_context(cprofiled(profile))
+        if trace_malloc:
+            stack.enter_context(malloc_traced(trace_malloc))
+        yield
@@ -0,0 +1,173 @@
+# vim: set fileencoding=utf-8 :
+"""
+Input pipeline of the command line app, reading files or stdin in chunks of a
+fixed size, or line by line, so memory use stays flat however large the inputs.
+
+Every stage is a generator pulling from the one before it, so nothing gets
+read before the next stage asks for it. prefetch lets reading overlap with
+processing, holding no more than a fixed number of chunks read ahead.
+
+Regular files are not read at all but memory-mapped, see
+:mod:`{{cookiecutter.project_slug}}.mapped`, leaving the streaming to pipes and
+stdin.
+"""
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from typing import (
+    BinaryIO,
+    Generator,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from {{cookiecutter.project_slug}}.mapped import iter_records, iter_slices, map_stream
+
+#: Stands for stdin among the input paths.
+STDIN: str = '-'
+
+#: Bytes read at a time, and the longest line read in one piece.
+DEFAULT_CHUNK_SIZE: int = 64 * 1024
+
+#: Chunks read ahead of the processing.
+DEFAULT_DEPTH: int = 4
+
+#: Seconds closing a prefetch waits for its thread to stop. A thread blocked on
+#: a read that never returns, such as that of a stalled stdin, is left behind.
+STOP_TIMEOUT: float = 1.0
+
+T = TypeVar('T')
+
+#: What the pipeline hands out: views of mapped files, or bytes read.
+Buffer = Union[bytes, memoryview]
+
+
+@contextmanager
+def open_input(path: str) -> Iterator[BinaryIO]:
+    """Open an input path for reading bytes, - for stdin, which stays open"""
+    if path == STDIN:
+        yield sys.stdin.buffer
+        return
+    with open(path, 'rb') as stream:
+        yield stream
+
+
+def read_chunks(
+    stream: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Read a stream in chunks of at most chunk_size bytes"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def split_lines(
+    chunks: Iterable[bytes], max_line: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Split chunks of a stream into lines, keeping their line endings. Lines
+    longer than max_line come in pieces of max_line bytes, so an input without
+    line endings cannot pile up in memory.
+    """
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + b'\n'
+        while len(pending) >= max_line:
+            yield pending[:max_line]
+            pending = pending[max_line:]
+    if pending:
+        yield pending
+
+
+def prefetch(
+    items: Iterable[T], depth: int = DEFAULT_DEPTH
+) -> Generator[T, None, None]:
+    """
+    Pull the items from a background thread, at most depth of them ahead of
+    the consumer. Exceptions get raised in the consumer, and closing the
+    generator stops the thread, or gives up on it after STOP_TIMEOUT seconds
+    when it is stuck reading: it is a daemon, which does not hold the exit.
+    :param items: The items, e.g. the chunks of read_chunks.
+    :param depth: How many items to hold ahead, 0 to not read ahead at all.
+    """
+    if depth <= 0:
+        yield from items
+        return
+
+    buffer: 'queue.Queue[Tuple[bool, Optional[T], Optional[BaseException]]]'
+    buffer = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(done: bool, item: Optional[T], error: Optional[BaseException]) -> bool:
+        # Blocks while the buffer is full, which is what holds reading back.
+        while not stopped.is_set():
+            try:
+                buffer.put((done, item, error), timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(False, item, None):
+                    return
+        except BaseException as error:
+            put(True, None, error)
+        else:
+            put(True, None, None)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            done, item, error = buffer.get()
+            if error is not None:
+                raise error
+            if done:
+                return
+            yield item  # type: ignore[misc]
+    finally:
+        stopped.set()
+        producer.join(STOP_TIMEOUT)
+
+
+def read_inputs(
+    paths: Sequence[str],
+    lines: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    depth: int = DEFAULT_DEPTH,
+    use_mmap: bool = True,
+) -> Iterator[Buffer]:
+    """
+    Read every input in turn, in chunks or line by line
+    :param paths: The input paths, - for stdin, which is also read when there
+        are none.
+    :param lines: Yield lines rather than chunks of chunk_size bytes.
+    :param chunk_size: Bytes to read at a time, and the longest line.
+    :param depth: Chunks to read ahead of the consumer, see prefetch.
+    :param use_mmap: Map regular files, yielding views of them instead of
+        copies of their content.
+    """
+    for path in paths or [STDIN]:
+        with open_input(path) as stream, map_stream(stream) as mapping:
+            if use_mmap and mapping is not None:
+                if lines:
+                    yield from iter_records(mapping, max_length=chunk_size)
+                else:
+                    yield from iter_slices(mapping, chunk_size)
+                continue
+            chunks = prefetch(read_chunks(stream, chunk_size), depth)
+            yield from split_lines(chunks, chunk_size) if lines else chunks
@@ -0,0 +1,106 @@
+# vim: set fileencoding=utf-8 :
+"""
+Asyncio runtime of the command line app: run runs a command in an event loop,
+cancelling it on SIGINT so that it gets to clean up, and gather_bounded runs
+many tasks concurrently, a bounded number at a time, each with a timeout.
+"""
+import asyncio
+import signal
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+#: Tasks run at the same time by default.
+DEFAULT_LIMIT: int = 16
+
+T = TypeVar('T')
+
+
+async def gather_bounded(
+    factories: Iterable[Callable[[], Awaitable[T]]],
+    limit: int = DEFAULT_LIMIT,
+    timeout: Optional[float] = None,
+) -> List[Union[T, Exception]]:
+    """
+    Like ``asyncio.gather(..., return_exceptions=True)``, with at most limit
+    tasks running at a time. The tasks are only created when they start, so
+    there may be any number of them.
+    :param factories: Callables creating the tasks, e.g. coroutine functions.
+    :param limit: How many tasks run at the same time.
+    :param timeout: Seconds after which a task is cancelled, its result then
+        being an asyncio.TimeoutError.
+    :return: The result of every task, or the exception it raised, in order.
+    """
+    pending = iter(enumerate(factories))
+    results: Dict[int, Union[T, Exception]] = {}
+
+    async def worker() -> None:
+        # The workers share the iterator, each taking the next task when it
+        # is done with its last.
+        for index, factory in pending:
+            try:
+                results[index] = await asyncio.wait_for(factory(), timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                results[index] = error
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(limit, 1))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        # Cancelled: let the tasks running handle their cancellation first.
+        for running in workers:
+            running.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+    return [results[index] for index in range(len(results))]
+
+
+def run(main: Awaitable[T]) -> T:
+    """
+    Run an awaitable in a new event loop, and return its result. SIGINT
+    cancels it, for it to clean up before KeyboardInterrupt is raised; a
+    second SIGINT interrupts it right away.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    task = asyncio.ensure_future(main, loop=loop)
+    interrupted = False
+
+    def interrupt() -> None:
+        nonlocal interrupted
+        interrupted = True
+        loop.remove_signal_handler(signal.SIGINT)
+        task.cancel()
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, interrupt)
+    except (NotImplementedError, RuntimeError):
+        pass  # Windows, or outside the main thread: SIGINT stays abrupt.
+    try:
+        return loop.run_until_complete(task)
+    except asyncio.CancelledError:
+        if interrupted:
+            raise KeyboardInterrupt from None
+        raise
+    finally:
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            pass
+        leftovers = [t for t in asyncio.all_tasks(loop) if not t.done()]
+        if leftovers:
+            for leftover in leftovers:
+                leftover.cancel()
+            loop.run_until_complete(asyncio.gather(*leftovers, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        asyncio.set_event_loop(None)
+        loop.close()
@@ -0,0 +1,261 @@
+# vim: set fileencoding=utf-8 :
+
+import os
+import pathlib
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import pytest
+{%- if cookiecutter.command_line_interface == 'Click' and cookiecutter.have_parallel_map == 'y' %}
+from click.testing import CliRunner
+{%- endif %}
+
+from {{cookiecutter.project_slug}}.cache import (
+    CACHE_DIR_ENV,
+    NO_CACHE_ENV,
+    CacheInfo,
+    DiskCache,
+    Function,
+    code_version,
+    default_cache,
+    memoize,
+    persist,
+)
+{%- if cookiecutter.command_line_interface != 'None' and cookiecutter.have_parallel_map == 'y' %}
+from {{cookiecutter.project_slug}}.cli import main
+from {{cookiecutter.project_slug}}.commands import digest
+from {{cookiecutter.project_slug}}.parallel import JOBS_ENV
+{%- endif %}
+
+
+def define(source: str) -> Function[int]:
+    """The function compute defined by source, as if it was edited in place"""
+    namespace: Dict[str, Function[int]] = {}
+    exec(source, namespace)
+    return namespace['compute']
+
+
+@pytest.fixture
+def store(tmp_path: pathlib.Path) -> DiskCache:
+    return DiskCache(str(tmp_path / 'results.sqlite3'))
+
+
+def test_memoize_counts_hits_and_misses() -> None:
+    calls: List[int] = []
+
+    @memoize(maxsize=2)
+    def double(n: int) -> int:
+        calls.append(n)
+        return n * 2
+
+    assert [double(1), double(1), double(2), double(1)] == [2, 2, 4, 2]
+    assert calls == [1, 2]
+    assert double.cache_info() == CacheInfo(hits=2, misses=2, maxsize=2, currsize=2)
+
+    double.cache_clear()
+    assert double.cache_info() == CacheInfo(hits=0, misses=0, maxsize=2, currsize=0)
+
+
+def test_memoize_evicts_least_recently_used() -> None:
+    calls: List[int] = []
+
+    @memoize(maxsize=2)
+    def double(n: int) -> int:
+        calls.append(n)
+        return n * 2
+
+    double(1)
+    double(2)
+    double(1)
+    double(3)  # Evicts 2, used less recently than 1.
+    double(1)
+    double(2)
+
+    assert calls == [1, 2, 3, 2]
+
+
+def test_memoize_expires_results() -> None:
+    calls: List[int] = []
+
+    @memoize(ttl=0.05)
+    def double(n: int) -> int:
+        calls.append(n)
+        return n * 2
+
+    double(1)
+    double(1)
+    time.sleep(0.1)
+    double(1)
+
+    assert calls == [1, 1]
+
+
+def test_disk_cache_persists(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / 'cache' / 'results.sqlite3')
+    first = DiskCache(path)
+    assert first.get('key') is None
+    first.set('key', b'value')
+    first.close()
+
+    second = DiskCache(path)
+    assert second.get('key') == b'value'
+    assert second.cache_info() == CacheInfo(
+        hits=1, misses=0, maxsize=second.max_bytes, currsize=5
+    )
+
+    second.delete('key')
+    assert second.get('key') is None
+
+
+def test_disk_cache_evicts_least_recently_used(store: DiskCache) -> None:
+    store.max_bytes = 30
+    store.set('a', b'a' * 10)
+    store.set('b', b'b' * 10)
+    store.set('c', b'c' * 10)
+    assert store.get('a') is not None
+    store.set('d', b'd' * 10)  # Evicts b, used less recently than a.
+    store.set('e', b'e' * 40)  # Larger than the whole cache, not kept.
+
+    assert [key for key in 'abcde' if store.get(key) is not None] == ['a', 'c', 'd']
+    assert store.cache_info().currsize == 30
+
+
+def test_persist_reuses_results(store: DiskCache) -> None:
+    calls: List[int] = []
+
+    @persist(cache=store)
+    def double(n: int, factor: int = 2) -> int:
+        calls.append(n)
+        return n * factor
+
+    assert double(1) == 2
+    assert double(1) == 2
+    assert double(1, factor=3) == 3
+    assert calls == [1, 1]
+    assert store.cache_info()[:2] == (1, 2)
+
+
+def test_persist_invalidates_on_code_change(store: DiskCache) -> None:
+    before = persist(cache=store)(define('def compute(n):\n    return n + 1\n'))
+    unchanged = persist(cache=store)(define('def compute(n):\n    return n + 1\n'))
+    after = persist(cache=store)(define('def compute(n):\n    return n + 2\n'))
+
+    assert before(1) == 2
+    assert unchanged.key(1) == before.key(1)
+    assert after.key(1) != before.key(1)
+    assert after(1) == 3
+
+
+def test_persist_invalidates_on_version_change(store: DiskCache) -> None:
+    compute = define('def compute(n):\n    return n + 1\n')
+
+    assert persist('1', cache=store)(compute).key(1) == (
+        persist('1', cache=store)(compute).key(1)
+    )
+    assert persist('2', cache=store)(compute).key(1) != (
+        persist('1', cache=store)(compute).key(1)
+    )
+
+
+def test_code_version_ignores_hash_seed() -> None:
+    source = 'def compute(n):\n    return n in {"a", "b", "c"}\n'
+    script = (
+        'from {{cookiecutter.project_slug}}.cache import code_version\n'
+        f'namespace = dict()\nexec({source!r}, namespace)\n'
+        "print(code_version(namespace['compute']))\n"
+    )
+    versions = {
+        subprocess.run(
+            [sys.executable, '-c', script],
+            env=dict(
+                os.environ, PYTHONHASHSEED=seed, PYTHONPATH=os.pathsep.join(sys.path)
+            ),
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout.strip()
+        for seed in ('1', '2')
+    }
+
+    assert versions == {code_version(define(source))}
+
+
+def test_default_cache_follows_environment(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: List[int] = []
+
+    @persist()
+    def double(n: int) -> int:
+        calls.append(n)
+        return n * 2
+
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.delenv(NO_CACHE_ENV, raising=False)
+    double(1)
+    double(1)
+    assert default_cache().path == str(tmp_path / 'results.sqlite3')
+
+    monkeypatch.setenv(NO_CACHE_ENV, '1')
+    double(1)
+
+    assert calls == [1, 1]
+{%- if cookiecutter.command_line_interface != 'None' and cookiecutter.have_parallel_map == 'y' %}
+
+
+def test_cli_configures_cache(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Set first, for monkeypatch to restore them after main changes them.
+    monkeypatch.setenv(CACHE_DIR_ENV, '')
+    monkeypatch.setenv(NO_CACHE_ENV, '')
+    args = ['--no-cache', '--cache-dir', str(tmp_path), 'echo']
+{%- if cookiecutter.command_line_interface == 'Click' %}
+
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+{%- else %}
+
+    main(args)
+{%- endif %}
+
+    assert os.environ[CACHE_DIR_ENV] == str(tmp_path)
+    assert os.environ[NO_CACHE_ENV] == '1'
+
+
+def test_digest_command_reuses_cached_digests(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+{%- if cookiecutter.command_line_interface != 'Click' %}
+    capsys: pytest.CaptureFixture[str],
+{%- endif %}
+) -> None:
+    monkeypatch.setenv(CACHE_DIR_ENV, '')
+    monkeypatch.setenv(NO_CACHE_ENV, '')
+    monkeypatch.setenv(JOBS_ENV, '')
+    path = tmp_path / 'data'
+    path.write_bytes(b'data\n')
+    # A single job, for the digests to be computed in this process.
+    args = ['--jobs', '1', '--cache-dir', str(tmp_path), 'digest', str(path)]
+
+    def digest_output() -> str:
+{%- if cookiecutter.command_line_interface == 'Click' %}
+        result = CliRunner().invoke(main, args)
+        assert result.exit_code == 0, result.output
+        return result.output
+{%- else %}
+        main(args)
+        return capsys.readouterr().out
+{%- endif %}
+
+    computed = digest_output()
+
+    def uncomputable(path: str) -> str:
+        raise AssertionError(f'{path} hashed again')
+
+    monkeypatch.setattr(digest, 'file_digest', uncomputable)
+    assert digest_output() == computed
+    assert DiskCache(str(tmp_path / 'results.sqlite3')).cache_info().currsize > 0
+{%- endif %}
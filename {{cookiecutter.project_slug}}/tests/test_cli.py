@@ -0,0 +1,87 @@
+# vim: set fileencoding=utf-8 :
+
+import sys
+from typing import List
+
+import pytest
+{%- if cookiecutter.command_line_interface == 'Click' %}
+from click.testing import CliRunner
+{%- endif %}
+
+from {{cookiecutter.project_slug}}.cli import COMMANDS, main
+
+
+@pytest.fixture
+def command_modules(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    """The modules of the commands, none of them imported yet"""
+    modules = [module for module, _ in COMMANDS.values()]
+    for module in modules:
+        monkeypatch.delitem(sys.modules, module, raising=False)
+    return modules
+
+{% if cookiecutter.command_line_interface == 'Click' %}
+def test_help_does_not_import_commands(command_modules: List[str]) -> None:
+    result = CliRunner().invoke(main, ['--help'])
+
+    assert result.exit_code == 0
+    for name, (_, short_help) in COMMANDS.items():
+        assert name in result.output
+        assert short_help in result.output
+    assert [module for module in command_modules if module in sys.modules] == []
+
+
+def test_completion_does_not_import_commands(command_modules: List[str]) -> None:
+    with main.make_context('main', [], resilient_parsing=True) as ctx:
+        items = main.shell_complete(ctx, 'ec')
+
+    assert [item.value for item in items] == ['echo']
+    assert [module for module in command_modules if module in sys.modules] == []
+
+
+def test_command_is_imported_when_invoked(command_modules: List[str]) -> None:
+    result = CliRunner().invoke(main, ['echo', 'a', 'b'])
+
+    assert result.exit_code == 0
+    assert result.output.strip() == repr(('a', 'b'))
+    assert '{{cookiecutter.project_slug}}.commands.echo' in sys.modules
+{%- elif cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] %}
+def test_help_does_not_import_commands(
+    command_modules: List[str], capsys: pytest.CaptureFixture[str]
+) -> None:
+    with pytest.raises(SystemExit):
+        main(['--help'])
+
+    output = capsys.readouterr().out
+    for name, (_, short_help) in COMMANDS.items():
+        assert name in output
+        assert short_help in output
+    assert [module for module in command_modules if module in sys.modules] == []
+
+
+def test_command_is_imported_when_invoked(
+    command_modules: List[str], capsys: pytest.CaptureFixture[str]
+) -> None:
+    main(['echo', 'a', 'b'])
+
+    assert capsys.readouterr().out.strip() == repr(['a', 'b'])
+    assert '{{cookiecutter.project_slug}}.commands.echo' in sys.modules
+
+
+def test_command_parses_its_own_arguments(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    with pytest.raises(SystemExit):
+        main(['echo', '--help'])
+
+    assert 'Print the arguments.' in capsys.readouterr().out
+
+
+def test_unknown_global_options_are_rejected(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--profle', 'echo', 'a'])
+
+    assert exit_info.value.code == 2
+    assert 'unrecognized arguments: --profle' in capsys.readouterr().err
+{%- endif %}
@@ -0,0 +1,75 @@
+# vim: set fileencoding=utf-8 :
+
+import io
+import os
+import pathlib
+from typing import BinaryIO, Iterator
+
+import pytest
+
+from {{cookiecutter.project_slug}}.mapped import iter_records, iter_slices, map_stream
+from {{cookiecutter.project_slug}}.streams import read_inputs
+
+
+@pytest.fixture
+def regular(tmp_path: pathlib.Path) -> Iterator[BinaryIO]:
+    path = tmp_path / 'input'
+    path.write_bytes(b'ab\ncdefgh\n\nij')
+    with open(path, 'rb') as stream:
+        yield stream
+
+
+def test_map_stream_maps_regular_files(regular: BinaryIO) -> None:
+    with map_stream(regular) as mapping:
+        assert mapping is not None
+        assert mapping[:] == b'ab\ncdefgh\n\nij'
+
+
+def test_map_stream_does_not_map_other_streams(tmp_path: pathlib.Path) -> None:
+    (tmp_path / 'empty').write_bytes(b'')
+    read_end, write_end = os.pipe()
+    with open(read_end, 'rb') as pipe, open(tmp_path / 'empty', 'rb') as empty:
+        os.close(write_end)
+        for stream in (io.BytesIO(b'data'), pipe, empty):
+            with map_stream(stream) as mapping:
+                assert mapping is None
+
+
+def test_slices_are_views_of_the_mapping(regular: BinaryIO) -> None:
+    with map_stream(regular) as mapping:
+        assert mapping is not None
+        slices = list(iter_slices(mapping, 4))
+
+        assert [bytes(view) for view in slices] == [b'ab\nc', b'defg', b'h\n\ni', b'j']
+        assert all(view.obj is mapping for view in slices)
+
+
+def test_records_split_long_ones(regular: BinaryIO) -> None:
+    with map_stream(regular) as mapping:
+        assert mapping is not None
+        records = [bytes(view) for view in iter_records(mapping, max_length=4)]
+
+    assert records == [b'ab\n', b'cdef', b'gh\n', b'\n', b'ij']
+
+
+def test_views_may_outlive_the_mapping(regular: BinaryIO) -> None:
+    with map_stream(regular) as mapping:
+        assert mapping is not None
+        first = next(iter_slices(mapping, 2))
+
+    assert first == b'ab'
+
+
+def test_read_inputs_maps_files_only(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / 'input'
+    path.write_bytes(b'a\nb\n')
+    monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(b'c\n')))
+
+    items = list(read_inputs([str(path), '-'], lines=True))
+
+    assert items == [b'a\n', b'b\n', b'c\n']
+    assert [type(item) for item in items] == [memoryview, memoryview, bytes]
+    unmapped = list(read_inputs([str(path)], use_mmap=False))
+    assert [type(item) for item in unmapped] == [bytes]
@@ -0,0 +1,200 @@
+# vim: set fileencoding=utf-8 :
+
+import array
+{%- if cookiecutter.command_line_interface != 'None' %}
+import hashlib
+{%- endif %}
+import os
+{%- if cookiecutter.command_line_interface != 'None' %}
+import pathlib
+{%- endif %}
+from functools import partial
+from typing import Optional, Tuple
+
+import pytest
+{%- if cookiecutter.command_line_interface == 'Click' %}
+from click.testing import CliRunner
+{%- endif %}
+
+{% if cookiecutter.command_line_interface != 'None' -%}
+from {{cookiecutter.project_slug}}.cli import main
+{% endif -%}
+from {{cookiecutter.project_slug}}.parallel import (
+    JOBS_ENV,
+    ParallelError,
+    SharedArray,
+    default_jobs,
+    parallel_map,
+    share,
+)
+
+# Workers import these from this module, they have to be at its top level.
+_offset: Optional[int] = None
+
+
+def square(n: int) -> int:
+    return n * n
+
+
+def fail_on_three(n: int) -> int:
+    if n == 3:
+        raise ValueError('three')
+    return n
+
+
+def set_offset(offset: int) -> None:
+    global _offset
+    _offset = offset
+
+
+def add_offset(n: int) -> int:
+    assert _offset is not None
+    return n + _offset
+
+
+def pid(_: int) -> int:
+    return os.getpid()
+
+
+def sum_slice(job: Tuple[SharedArray, int, int]) -> float:
+    shared, start, stop = job
+    return sum(shared.view()[start:stop])
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_parallel_map_keeps_order(jobs: int) -> None:
+    assert list(parallel_map(square, range(100), jobs=jobs)) == [
+        n * n for n in range(100)
+    ]
+
+
+def test_parallel_map_unordered_yields_every_result() -> None:
+    results = parallel_map(square, list(range(100)), jobs=2, ordered=False)
+
+    assert sorted(results) == [n * n for n in range(100)]
+
+
+def test_parallel_map_uses_workers() -> None:
+    pids = set(parallel_map(pid, range(100), jobs=2, chunksize=1))
+
+    assert os.getpid() not in pids
+
+
+def test_parallel_map_streams_results() -> None:
+    results = parallel_map(square, iter(range(1000000)), jobs=2)
+
+    assert next(results) == 0
+    assert next(results) == 1
+    results.close()  # Terminates the workers rather than squaring them all.
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_parallel_map_runs_initializer(jobs: int) -> None:
+    results = parallel_map(
+        add_offset, range(10), jobs=jobs, initializer=partial(set_offset, 100)
+    )
+
+    assert list(results) == list(range(100, 110))
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_parallel_map_raises_worker_errors(jobs: int) -> None:
+    with pytest.raises(ParallelError) as error_info:
+        list(parallel_map(fail_on_three, range(10), jobs=jobs))
+
+    message = str(error_info.value)
+    assert message.startswith('fail_on_three failed in a worker')
+    assert "ValueError: three" in message
+    assert 'in fail_on_three' in message
+
+
+def test_shared_array_is_not_copied_per_item() -> None:
+    data = array.array('d', range(100000))
+
+    with share(data) as shared:
+        assert shared.view().tolist() == data.tolist()
+        jobs = [(shared, start, start + 10000) for start in range(0, 100000, 10000)]
+        sums = list(parallel_map(sum_slice, jobs, jobs=2))
+
+    assert sum(sums) == sum(data)
+
+
+def test_default_jobs(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(JOBS_ENV, raising=False)
+    assert default_jobs() == (os.cpu_count() or 1)
+
+    monkeypatch.setenv(JOBS_ENV, '3')
+    assert default_jobs() == 3
+{%- if cookiecutter.command_line_interface != 'None' %}
+
+
+def test_digest_command(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+{%- if cookiecutter.command_line_interface != 'Click' %}
+    capsys: pytest.CaptureFixture[str],
+{%- endif %}
+) -> None:
+    monkeypatch.setenv(JOBS_ENV, '1')
+    paths = []
+    for name, content in (('a', b'a\n'), ('b', b'b' * 100000), ('empty', b'')):
+        path = tmp_path / name
+        path.write_bytes(content)
+        paths.append(str(path))
+{%- if cookiecutter.command_line_interface == 'Click' %}
+
+    result = CliRunner().invoke(main, ['--jobs', '2', 'digest', *paths])
+    assert result.exit_code == 0, result.output
+    output = result.output
+{%- else %}
+
+    main(['--jobs', '2', 'digest', *paths])
+    output = capsys.readouterr().out
+{%- endif %}
+
+    assert os.environ[JOBS_ENV] == '2'
+    assert output.splitlines() == [
+        f'{hashlib.sha256(pathlib.Path(path).read_bytes()).hexdigest()}  {path}'
+        for path in paths
+    ]
+
+
+def test_digest_command_rejects_missing_paths(
+    tmp_path: pathlib.Path,
+{%- if cookiecutter.command_line_interface != 'Click' %}
+    capsys: pytest.CaptureFixture[str],
+{%- endif %}
+) -> None:
+    missing = str(tmp_path / 'missing')
+{%- if cookiecutter.command_line_interface == 'Click' %}
+
+    result = CliRunner().invoke(main, ['digest', missing])
+    assert result.exit_code == 2
+    assert 'does not exist' in result.output
+{%- else %}
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(['digest', missing])
+    assert exit_info.value.code == 2
+    assert 'is not a file' in capsys.readouterr().err
+{%- endif %}
+
+
+@pytest.mark.parametrize('jobs', ['0', '-1', 'many'])
+def test_jobs_must_be_positive(
+    jobs: str,
+{%- if cookiecutter.command_line_interface != 'Click' %}
+    capsys: pytest.CaptureFixture[str],
+{%- endif %}
+) -> None:
+{%- if cookiecutter.command_line_interface == 'Click' %}
+    result = CliRunner().invoke(main, ['--jobs', jobs, 'digest'])
+    assert result.exit_code == 2
+    assert "Invalid value for '--jobs'" in result.output
+{%- else %}
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--jobs', jobs, 'digest'])
+    assert exit_info.value.code == 2
+    assert 'argument --jobs' in capsys.readouterr().err
+{%- endif %}
+{%- endif %}
@@ -0,0 +1,114 @@
+# vim: set fileencoding=utf-8 :
+
+import io
+import pathlib
+import pstats
+import sys
+import time
+from typing import List
+
+import pytest
+{%- if cookiecutter.command_line_interface == 'Click' %}
+from click.testing import CliRunner
+{%- endif %}
+
+from {{cookiecutter.project_slug}}.cli import main
+from {{cookiecutter.project_slug}}.profiling import StackSampler, malloc_traced
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampler_collapses_stacks() -> None:
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    busy(0.05)
+    sampler.stop()
+
+    output = io.StringIO()
+    sampler.write(output)
+    lines = output.getvalue().splitlines()
+    assert lines
+    assert any('busy (test_profiling.py' in line for line in lines)
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == sum(
+        sampler.stacks.values()
+    )
+
+
+def test_malloc_traced_reports_top_sites() -> None:
+    report = io.StringIO()
+    with malloc_traced(3, report):
+        blocks = [bytearray(1024) for _ in range(100)]
+
+    assert len(blocks) == 100
+    lines = report.getvalue().splitlines()
+    assert lines[0] == 'Top 3 allocation sites:'
+    assert 1 < len(lines) <= 4
+    assert 'test_profiling.py' in lines[1]
+
+
+def run(args: List[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Run the app, the profiling module not imported beforehand"""
+    monkeypatch.delitem(
+        sys.modules, '{{cookiecutter.project_slug}}.profiling', raising=False
+    )
+{%- if cookiecutter.command_line_interface == 'Click' %}
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+{%- else %}
+    main(args)
+{%- endif %}
+
+
+def test_profiling_is_not_imported_unless_asked_for(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    run(['echo', 'a'], monkeypatch)
+
+    assert '{{cookiecutter.project_slug}}.profiling' not in sys.modules
+
+
+def test_profile_writes_pstats(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / 'run.pstats'
+    run(['--profile', str(path), 'echo', 'a'], monkeypatch)
+
+    output = io.StringIO()
+    pstats.Stats(str(path), stream=output).print_stats()
+    assert 'function calls' in output.getvalue()
+
+
+def test_sample_from_environment(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / 'run.stacks'
+    monkeypatch.setenv('{{cookiecutter.project_slug|upper}}_SAMPLE', str(path))
+    run(['echo', 'a'], monkeypatch)
+
+    # The run may well be too short to be sampled at all.
+    assert path.exists()
+
+
+def test_invalid_trace_malloc_from_environment(
+    monkeypatch: pytest.MonkeyPatch,
+{%- if cookiecutter.command_line_interface != 'Click' %}
+    capsys: pytest.CaptureFixture[str],
+{%- endif %}
+) -> None:
+    monkeypatch.setenv('{{cookiecutter.project_slug|upper}}_TRACE_MALLOC', 'lots')
+{%- if cookiecutter.command_line_interface == 'Click' %}
+
+    result = CliRunner().invoke(main, ['echo', 'a'])
+    assert result.exit_code == 2
+    assert '--trace-malloc' in result.output
+{%- else %}
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(['echo', 'a'])
+    assert exit_info.value.code == 2
+    assert 'argument --trace-malloc' in capsys.readouterr().err
+{%- endif %}
@@ -0,0 +1,192 @@
+# vim: set fileencoding=utf-8 :
+
+import io
+import pathlib
+import threading
+import time
+import tracemalloc
+from typing import Iterator, List
+
+import pytest
+{%- if cookiecutter.command_line_interface == 'Click' %}
+from click.testing import CliRunner
+{%- endif %}
+
+from {{cookiecutter.project_slug}}.cli import main
+from {{cookiecutter.project_slug}}.streams import (
+    STOP_TIMEOUT,
+    prefetch,
+    read_chunks,
+    read_inputs,
+    split_lines,
+)
+
+#: Size of the large input, well above what the pipeline may hold in memory.
+LARGE_SIZE = 32 * 1024 * 1024
+
+
+@pytest.fixture(scope='module')
+def large_input(tmp_path_factory: pytest.TempPathFactory) -> pathlib.Path:
+    """A file of LARGE_SIZE bytes, in lines of 100 bytes"""
+    path = tmp_path_factory.mktemp('streams') / 'large.txt'
+    block = (b'x' * 99 + b'\n') * 10000
+    with open(path, 'wb') as f:
+        for _ in range(LARGE_SIZE // len(block)):
+            f.write(block)
+        f.write(block[: LARGE_SIZE % len(block)])
+    return path
+
+
+def test_read_chunks_are_bounded() -> None:
+    chunks = list(read_chunks(io.BytesIO(b'x' * 10), 4))
+
+    assert chunks == [b'xxxx', b'xxxx', b'xx']
+
+
+def test_split_lines_splits_long_lines() -> None:
+    chunks = [b'ab\ncd', b'ef\n', b'x' * 10, b'\ny']
+
+    lines = list(split_lines(chunks, 4))
+
+    assert lines == [b'ab\n', b'cdef\n', b'xxxx', b'xxxx', b'xx\n', b'y']
+
+
+def test_lines_do_not_span_inputs(tmp_path: pathlib.Path) -> None:
+    first, second = tmp_path / 'first', tmp_path / 'second'
+    first.write_bytes(b'a\nb')
+    second.write_bytes(b'c\n')
+
+    lines = list(read_inputs([str(first), str(second)], lines=True))
+
+    assert lines == [b'a\n', b'b', b'c\n']
+
+
+def test_dash_reads_stdin(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(b'a\nb\n')))
+
+    assert list(read_inputs(['-'], lines=True)) == [b'a\n', b'b\n']
+
+
+def test_prefetch_holds_at_most_depth_items() -> None:
+    produced = 0
+
+    def items() -> Iterator[int]:
+        nonlocal produced
+        for item in range(50):
+            produced += 1
+            yield item
+
+    ahead: List[int] = []
+    for consumed, _ in enumerate(prefetch(items(), depth=3), 1):
+        time.sleep(0.001)
+        ahead.append(produced - consumed)
+
+    # The queue, plus the item the producer waits to put.
+    assert max(ahead) <= 3 + 1
+    assert produced == 50
+
+
+def test_prefetch_raises_in_the_consumer() -> None:
+    def items() -> Iterator[int]:
+        yield 1
+        raise ValueError('unreadable')
+
+    with pytest.raises(ValueError, match='unreadable'):
+        list(prefetch(items()))
+
+
+def test_prefetch_stops_when_closed() -> None:
+    def forever() -> Iterator[int]:
+        while True:
+            yield 0
+
+    threads = threading.active_count()
+    items = prefetch(forever(), depth=2)
+    assert next(items) == 0
+    items.close()
+
+    assert threading.active_count() == threads
+
+
+def test_prefetch_closes_while_reading_stalls() -> None:
+    unblock = threading.Event()
+
+    def stalled() -> Iterator[int]:
+        yield 0
+        # Like a read of stdin nothing gets written to.
+        unblock.wait()
+        yield 1
+
+    items = prefetch(stalled(), depth=2)
+    assert next(items) == 0
+    started = time.monotonic()
+    items.close()
+    assert time.monotonic() - started < STOP_TIMEOUT + 1
+    unblock.set()
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+@pytest.mark.parametrize('lines', [False, True])
+def test_memory_stays_bounded(
+    large_input: pathlib.Path, lines: bool, use_mmap: bool
+) -> None:
+    chunk_size = 64 * 1024
+    items = read_inputs([str(large_input)], lines, chunk_size, 4, use_mmap)
+    tracemalloc.start()
+    try:
+        size = sum(len(item) for item in items)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert size == LARGE_SIZE
+    # Read ahead chunks, the chunk being split and its lines: far from the
+    # size of the input.
+    assert peak < 32 * chunk_size
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+@pytest.mark.parametrize('lines, min_rate', [(False, 100), (True, 10)])
+def test_throughput_is_reasonable(
+    large_input: pathlib.Path, lines: bool, min_rate: int, use_mmap: bool
+) -> None:
+    items = read_inputs([str(large_input)], lines, use_mmap=use_mmap)
+    start = time.perf_counter()
+    size = sum(len(item) for item in items)
+    rate = size / (time.perf_counter() - start) / 1024 / 1024
+
+    assert rate > min_rate, f'{rate:.0f} MiB/s'
+{%- if cookiecutter.command_line_interface == 'Click' %}
+
+
+@pytest.mark.parametrize('options', [[], ['--no-mmap']])
+def test_stream_command(tmp_path: pathlib.Path, options: List[str]) -> None:
+    path = tmp_path / 'input'
+    path.write_bytes(b'a\nb\n')
+
+    result = CliRunner().invoke(
+        main,
+        ['stream', '--lines', '--chunk-size', '2', *options, str(path), '-'],
+        input=b'c',
+    )
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout_bytes == b'a\nb\nc'
+{%- elif cookiecutter.command_line_interface in ['Argparse', 'Asyncio'] %}
+
+
+@pytest.mark.parametrize('options', [[], ['--no-mmap']])
+def test_stream_command(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsysbinary: pytest.CaptureFixture[bytes],
+    options: List[str],
+) -> None:
+    path = tmp_path / 'input'
+    path.write_bytes(b'a\nb\n')
+    monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(b'c')))
+
+    main(['stream', '--lines', '--chunk-size', '2', *options, str(path), '-'])
+
+    assert capsysbinary.readouterr().out == b'a\nb\nc'
+{%- endif %}
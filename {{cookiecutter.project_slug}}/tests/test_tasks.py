@@ -0,0 +1,99 @@
+# vim: set fileencoding=utf-8 :
+
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from functools import partial
+from typing import List
+
+import pytest
+
+from {{cookiecutter.project_slug}}.cli import main
+from {{cookiecutter.project_slug}}.tasks import gather_bounded, run
+
+unix_only = pytest.mark.skipif(sys.platform == 'win32', reason='Unix signals')
+
+
+def interrupt_after(seconds: float) -> None:
+    """Send SIGINT to this process after some seconds, as Ctrl+C does"""
+    threading.Timer(seconds, os.kill, (os.getpid(), signal.SIGINT)).start()
+
+
+def test_gather_bounded_limits_concurrency() -> None:
+    running = most = 0
+
+    async def task(value: int) -> int:
+        nonlocal running, most
+        running += 1
+        most = max(most, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return value
+
+    results = run(gather_bounded([partial(task, n) for n in range(20)], limit=3))
+
+    assert results == list(range(20))
+    assert most == 3
+
+
+def test_gather_bounded_returns_errors_and_timeouts() -> None:
+    async def fail() -> int:
+        raise ValueError('failed')
+
+    async def hang() -> int:
+        await asyncio.sleep(10)
+        return 0
+
+    async def succeed() -> int:
+        return 1
+
+    start = time.perf_counter()
+    results = run(gather_bounded([fail, hang, succeed], timeout=0.05))
+
+    assert time.perf_counter() - start < 5
+    assert isinstance(results[0], ValueError)
+    assert isinstance(results[1], asyncio.TimeoutError)
+    assert results[2] == 1
+
+
+@unix_only
+def test_run_cancels_on_sigint() -> None:
+    cleaned_up: List[bool] = []
+
+    async def work() -> None:
+        try:
+            await asyncio.sleep(10)
+        finally:
+            cleaned_up.append(True)
+
+    interrupt_after(0.1)
+    with pytest.raises(KeyboardInterrupt):
+        run(work())
+
+    assert cleaned_up == [True]
+
+
+def test_run_command_reports_statuses(capsys: pytest.CaptureFixture[str]) -> None:
+    with pytest.raises(SystemExit) as exit_info:
+        main(['run', '--timeout', '2', 'exit 0', 'exit 3', 'sleep 10'])
+
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().out.splitlines() == [
+        '0\texit 0',
+        '3\texit 3',
+        'timeout\tsleep 10',
+    ]
+
+
+@unix_only
+def test_run_command_exits_on_sigint() -> None:
+    interrupt_after(0.2)
+    start = time.perf_counter()
+    with pytest.raises(SystemExit) as exit_info:
+        main(['run', 'sleep 10'])
+
+    assert exit_info.value.code == 130
+    assert time.perf_counter() - start < 5